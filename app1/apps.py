@@ -0,0 +1,21 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def _ensure_search_index(sender, using, **kwargs):
+    # Migrations that rebuild the Metrics table drop its FTS triggers
+    from django.db import connections
+
+    from . import search
+
+    search.ensure_installed(connections[using])
+
+
+class App1Config(AppConfig):
+    name = 'app1'
+
+    def ready(self):
+        # Connect model signal handlers (cache invalidation etc.)
+        from . import signals  # noqa: F401
+
+        post_migrate.connect(_ensure_search_index, sender=self)
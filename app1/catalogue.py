@@ -0,0 +1,169 @@
+# app1/catalogue.py
+"""
+Versioned snapshot of the intervention catalogue.
+
+The catalogue rarely changes, so every view that needs the whole
+`Interventions` table reads a pre-built snapshot instead: rows, rows
+grouped by theme and by class alias, and the JSON blobs the pages embed.
+
+Snapshots live in Django's cache framework under a version key (see
+versioning.py), so a file or database cache shares them between workers;
+with the local-memory backend each worker builds its own, but the version
+is kept in the database, so an edit made in one worker reaches the others
+within VERSION_POLL_SECONDS. Model signals bump the version (see
+signals.py); each process also keeps the last snapshot it used in memory
+so a warm request costs at most one cache read.
+"""
+import json
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from django.core.cache import cache
+
+from . import telemetry, versioning
+from .classes import CLASS_ALIASES, CLASS_ALIASES_REVERSE, class_keys_for
+from .models import Interventions
+
+VERSION_KEY = "catalogue:version"
+SNAPSHOT_KEY = "catalogue:snapshot:{version}"
+SNAPSHOT_TIMEOUT = 60 * 60 * 24  # old versions simply age out
+
+_lock = threading.Lock()
+_local: Optional[Tuple[int, "CatalogueSnapshot"]] = None
+
+
+def catalogue_version() -> int:
+    """Current catalogue version."""
+    return versioning.get_version(VERSION_KEY)
+
+
+def bump_version() -> None:
+    """Mark every cached snapshot as stale."""
+    versioning.bump(VERSION_KEY)
+
+
+def api_item(i: Interventions) -> dict:
+    """An intervention as listed by the interventions and search APIs."""
+    return {
+        "id": i.id,
+        "name": i.name or f"Intervention #{i.id}",
+        "theme": i.theme or "",
+        "description": i.description or "",
+        "cost_level": float(i.cost_level or 0),
+        "intervention_rating": float(i.intervention_rating or 0),
+    }
+
+
+def _carbon_item(i: Interventions) -> dict:
+    return {
+        "id": i.id,
+        "name": i.name or f"Intervention #{i.id}",
+        "cost": float(i.cost_level or 0),
+        "rating": float(i.intervention_rating or 0),
+        "badges": [i.theme.capitalize()] if i.theme else [],
+    }
+
+
+def _results_item(i: Interventions) -> dict:
+    return {
+        "id": str(i.id),
+        "name": i.name,
+        "theme": i.theme,
+        "description": i.description,
+        "cost_level": float(i.cost_level or 0),
+        "intervention_rating": float(i.intervention_rating or 0),
+        "cost_range": getattr(i, "cost_range", ""),
+    }
+
+
+def _class_matches(class_name: Optional[str], terms: List[str]) -> bool:
+    value = (class_name or "").lower()
+    return any(t.lower() in value for t in terms)
+
+
+class CatalogueSnapshot:
+    """
+    Immutable view of the catalogue at one version. Callers must copy the
+    dicts they hand out if they add request-specific fields.
+    """
+
+    def __init__(self, version: int, interventions: List[Interventions]):
+        self.version = version
+        self.interventions = tuple(interventions)  # pk order
+
+        # ORDER BY theme, name (NULLs first, like SQLite)
+        by_theme_name = sorted(
+            self.interventions,
+            key=lambda i: (i.theme is not None, i.theme or "", i.name is not None, i.name or ""),
+        )
+        self.api_items = tuple(api_item(i) for i in by_theme_name)
+        self._class_names = tuple(i.class_name for i in by_theme_name)
+
+        # ?cls= filter on interventions_api, pre-grouped per alias key; a label
+        # matching several keys' aliases is listed under each of them
+        by_class: Dict[str, List[dict]] = {key: [] for key in CLASS_ALIASES}
+        for item, class_name in zip(self.api_items, self._class_names):
+            for key in class_keys_for(class_name):
+                by_class[key].append(item)
+        self.by_class: Dict[str, Tuple[dict, ...]] = {key: tuple(items) for key, items in by_class.items()}
+
+        # calculator_results: one theme, ORDER BY -intervention_rating, cost_level
+        by_theme: Dict[str, List[Interventions]] = {}
+        for i in self.interventions:
+            by_theme.setdefault(i.theme, []).append(i)
+        self.results_json: Dict[str, str] = {}
+        for theme, rows in by_theme.items():
+            rows.sort(
+                key=lambda i: (
+                    i.intervention_rating is None,
+                    -(i.intervention_rating or 0),
+                    i.cost_level is not None,
+                    i.cost_level or 0,
+                )
+            )
+            self.results_json[theme] = json.dumps([_results_item(i) for i in rows])
+
+        # carbon page: bucket by the UI class key of the theme label
+        carbon: Dict[str, list] = {}
+        for i in self.interventions:
+            cls_key = CLASS_ALIASES_REVERSE.get((i.theme or "other").lower(), "other")
+            carbon.setdefault(cls_key, []).append(_carbon_item(i))
+        self.carbon_json = json.dumps(carbon)
+
+    def _filter_class(self, terms: List[str]) -> Tuple[dict, ...]:
+        return tuple(
+            item for item, class_name in zip(self.api_items, self._class_names)
+            if _class_matches(class_name, terms)
+        )
+
+    def items_for_class(self, ui_key: str) -> Tuple[dict, ...]:
+        """API items for a UI class key; unknown keys fall back to a substring match."""
+        if ui_key in self.by_class:
+            return self.by_class[ui_key]
+        return self._filter_class([ui_key])
+
+    def results_json_for_theme(self, theme: Optional[str]) -> str:
+        return self.results_json.get(theme, "[]")
+
+
+def get_snapshot() -> CatalogueSnapshot:
+    """Return the snapshot for the current catalogue version."""
+    global _local
+    version = catalogue_version()
+    local = _local
+    if local is not None and local[0] == version:
+        telemetry.CACHE_REQUESTS.inc(cache="catalogue_snapshot", result="hit")
+        return local[1]
+
+    with _lock:
+        if _local is not None and _local[0] == version:
+            telemetry.CACHE_REQUESTS.inc(cache="catalogue_snapshot", result="hit")
+            return _local[1]
+        key = SNAPSHOT_KEY.format(version=version)
+        snapshot = cache.get(key)
+        telemetry.CACHE_REQUESTS.inc(cache="catalogue_snapshot", result="miss" if snapshot is None else "hit")
+        if snapshot is None:
+            snapshot = CatalogueSnapshot(version, list(Interventions.objects.order_by("id")))
+            cache.set(key, snapshot, timeout=SNAPSHOT_TIMEOUT)
+        _local = (version, snapshot)
+        return snapshot
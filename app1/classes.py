@@ -0,0 +1,51 @@
+# app1/classes.py
+"""
+UI class keys and the free-text class/theme labels that map onto them.
+Kept free of model imports so models, migrations and views can all use it.
+"""
+
+CLASS_ALIASES = {
+    "carbon": ["carbon", "carbon emissions", "operating carbon", "operational carbon", "embodied carbon"],
+    "health": ["health", "health & wellbeing", "health and wellbeing"],
+    "water": ["water", "water use", "water efficiency"],
+    "circular": ["circular", "circular economy"],
+    "resilience": ["resilience"],
+    "biodiversity": ["biodiversity"],
+    "value": ["value", "value & cost", "value and cost"],
+}
+
+# Exact label -> UI key (used to bucket themes on the carbon page)
+CLASS_ALIASES_REVERSE = {
+    alias.lower(): key for key, aliases in CLASS_ALIASES.items() for alias in aliases
+}
+
+
+def class_keys_for(class_name):
+    """
+    Every UI key whose aliases occur in a free-text class label, in
+    CLASS_ALIASES order ("Carbon Emissions" -> ["carbon"]). This is the
+    substring rule of the old LIKE filter: a label listed under several
+    ?cls= keys keeps all of them.
+    """
+    value = (class_name or "").strip().lower()
+    if not value:
+        return []
+    return [key for key, aliases in CLASS_ALIASES.items() if any(alias in value for alias in aliases)]
+
+
+def class_key_for(class_name):
+    """The first of class_keys_for(), for grouping by one class; unknown labels give None."""
+    keys = class_keys_for(class_name)
+    return keys[0] if keys else None
+
+
+# Fallback class targets when the ClassTargets table has no row for a key
+DEFAULT_CLASS_TARGETS = {
+    "carbon": 80,
+    "health": 60,
+    "water": 30,
+    "circular": 40,
+    "resilience": 60,
+    "value": 10,
+    "biodiversity": 20,
+}
@@ -0,0 +1,91 @@
+# app1/dependencies.py
+"""
+Process-wide index over the `intervention_dependencies` table.
+
+All rows are loaded once and grouped by intervention id into compact
+parallel arrays (metric names, min thresholds, max thresholds), so the
+calculator can filter the whole catalogue without touching the database.
+The index is tied to the catalogue version (see catalogue.py), so a change
+made by any worker is picked up on the next request.
+"""
+import math
+from array import array
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from .catalogue import VERSION_KEY
+from .models import InterventionDependencies
+from .versioning import VersionedLocal
+
+_NO_LIMIT = math.nan  # stored in the threshold arrays when min/max is NULL
+
+
+class DependencyIndex:
+    """
+    intervention_id -> (metric names, min values, max values)
+    """
+
+    __slots__ = ("_by_intervention", "_metric_names")
+
+    def __init__(self, rows: Iterable[Tuple[int, str, Optional[float], Optional[float]]]):
+        grouped: Dict[int, Tuple[list, array, array]] = {}
+        for intervention_id, metric_name, min_value, max_value in rows:
+            names, mins, maxs = grouped.setdefault(
+                intervention_id, ([], array("d"), array("d"))
+            )
+            names.append(metric_name)
+            mins.append(_NO_LIMIT if min_value is None else float(min_value))
+            maxs.append(_NO_LIMIT if max_value is None else float(max_value))
+
+        self._by_intervention = {
+            iid: (tuple(names), mins, maxs) for iid, (names, mins, maxs) in grouped.items()
+        }
+        self._metric_names = frozenset(
+            name for names, _, _ in self._by_intervention.values() for name in names
+        )
+
+    @classmethod
+    def load(cls) -> "DependencyIndex":
+        return cls(
+            InterventionDependencies.objects.values_list(
+                "intervention_id", "metric_name", "min_value", "max_value"
+            )
+        )
+
+    def __len__(self) -> int:
+        return len(self._by_intervention)
+
+    def excluded_ids(self, metric: Any) -> Set[int]:
+        """
+        Ids of interventions whose thresholds the given Metrics row fails.
+        Metrics without a value for a dependency's column are not checked
+        against it (same as the original per-row query loop).
+        """
+        values = {}
+        for name in self._metric_names:
+            val = getattr(metric, name, None)
+            if val is None:
+                continue
+            try:
+                values[name] = float(val)
+            except (TypeError, ValueError):
+                continue
+
+        excluded = set()
+        for iid, (names, mins, maxs) in self._by_intervention.items():
+            for name, lo, hi in zip(names, mins, maxs):
+                val = values.get(name)
+                if val is None:
+                    continue
+                # NaN comparisons are always False, so missing limits never fail
+                if val < lo or val > hi:
+                    excluded.add(iid)
+                    break
+        return excluded
+
+
+_index = VersionedLocal(VERSION_KEY, DependencyIndex.load)
+
+
+def get_index() -> DependencyIndex:
+    """Return the shared index for the current catalogue version."""
+    return _index.get()
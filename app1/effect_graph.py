@@ -0,0 +1,162 @@
+# app1/effect_graph.py
+"""
+Precomputed intervention effect graph keyed by intervention id.
+
+`intervention_effects` stores sources and targets as free-text names. The
+graph resolves both ends to intervention ids once per catalogue version
+(names are matched by "family", so every staged variant of an intervention
+is included) and keeps the edges in two CSR structures:
+
+    forward:  source position -> target positions, effect values, note ids
+    reverse:  target position -> source positions, effect values, note ids
+
+Effect rows whose source or target name doesn't resolve are collected in
+`unresolved_sources` / `unresolved_targets` so bad data can be fixed.
+"""
+import logging
+import re
+from array import array
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from .catalogue import VERSION_KEY, get_snapshot
+from .models import InterventionEffects
+from .versioning import VersionedLocal
+
+logger = logging.getLogger(__name__)
+
+_FAMILY_RE = re.compile(r"[^a-z0-9]+")
+
+
+def family_from_name(name: Optional[str]) -> str:
+    """'Façade air-tightness (Stage 2)' -> 'fa-ade-air-tightness-stage-2'"""
+    return _FAMILY_RE.sub("-", (name or "").lower()).strip("-")
+
+
+class Edge(NamedTuple):
+    source_id: int
+    target_id: int
+    effect_value: float
+    note: Optional[str]
+
+
+class _CSR:
+    """Rows of (column, value, note id) packed into flat arrays."""
+
+    __slots__ = ("indptr", "columns", "values", "notes")
+
+    def __init__(self, size: int, triples: List[Tuple[int, int, float, int]]):
+        counts = [0] * (size + 1)
+        for row, _, _, _ in triples:
+            counts[row + 1] += 1
+        for n in range(size):
+            counts[n + 1] += counts[n]
+        self.indptr = array("l", counts)
+
+        fill = list(counts[:-1])
+        self.columns = array("l", bytes(array("l").itemsize * len(triples)))
+        self.values = array("d", bytes(array("d").itemsize * len(triples)))
+        self.notes = array("l", bytes(array("l").itemsize * len(triples)))
+        for row, col, value, note in triples:
+            at = fill[row]
+            self.columns[at] = col
+            self.values[at] = value
+            self.notes[at] = note
+            fill[row] += 1
+
+    def row(self, pos: int) -> range:
+        return range(self.indptr[pos], self.indptr[pos + 1])
+
+
+class EffectGraph:
+    def __init__(self, interventions, effects: Iterable[Tuple[str, str, Optional[float], Optional[str]]]):
+        self.ids: Tuple[int, ...] = tuple(i.id for i in interventions)
+        self.position: Dict[int, int] = {iid: n for n, iid in enumerate(self.ids)}
+        self.names: Tuple[str, ...] = tuple(i.name or f"Intervention #{i.id}" for i in interventions)
+        # Catalogue ratings from the same snapshot, so the rating engine never mixes versions
+        self.ratings: Tuple[float, ...] = tuple(float(i.intervention_rating or 0) for i in interventions)
+
+        self._by_family: Dict[str, List[int]] = {}
+        for n, i in enumerate(interventions):
+            self._by_family.setdefault(family_from_name(i.name), []).append(n)
+
+        self.notes: List[str] = []
+        note_ids: Dict[str, int] = {}
+        unresolved_sources, unresolved_targets = set(), set()
+        triples = []
+        for source_name, target_name, effect_value, note in effects:
+            sources = self._by_family.get(family_from_name(source_name))
+            targets = self._by_family.get(family_from_name(target_name))
+            if not sources:
+                unresolved_sources.add(source_name)
+            if not targets:
+                unresolved_targets.add(target_name)
+            if not sources or not targets or effect_value is None:
+                continue
+            note_id = -1
+            if note:
+                note_id = note_ids.get(note, -1)
+                if note_id < 0:
+                    note_id = note_ids[note] = len(self.notes)
+                    self.notes.append(note)
+            for s in sources:
+                for t in targets:
+                    triples.append((s, t, float(effect_value), note_id))
+
+        self.unresolved_sources = tuple(sorted(unresolved_sources))
+        self.unresolved_targets = tuple(sorted(unresolved_targets))
+        self.forward = _CSR(len(self.ids), triples)
+        self.reverse = _CSR(len(self.ids), [(t, s, v, n) for s, t, v, n in triples])
+
+    @classmethod
+    def load(cls) -> "EffectGraph":
+        graph = cls(
+            get_snapshot().interventions,
+            InterventionEffects.objects.order_by("id").values_list(
+                "source_intervention_name", "target_intervention_name", "effect_value", "note"
+            ),
+        )
+        if graph.unresolved_sources or graph.unresolved_targets:
+            logger.warning(
+                "Effect graph: %d source and %d target names do not match any intervention",
+                len(graph.unresolved_sources),
+                len(graph.unresolved_targets),
+            )
+        return graph
+
+    def __len__(self) -> int:
+        return len(self.forward.columns)
+
+    def _note(self, note_id: int) -> Optional[str]:
+        return self.notes[note_id] if note_id >= 0 else None
+
+    def ids_for_name(self, name: Optional[str]) -> List[int]:
+        return [self.ids[n] for n in self._by_family.get(family_from_name(name), [])]
+
+    def effects_from(self, source_ids: Iterable[int]) -> Iterator[Edge]:
+        """All outgoing edges of the given sources (unknown ids are skipped)."""
+        csr = self.forward
+        for sid in dict.fromkeys(source_ids):
+            s = self.position.get(sid)
+            if s is None:
+                continue
+            for at in csr.row(s):
+                yield Edge(sid, self.ids[csr.columns[at]], csr.values[at], self._note(csr.notes[at]))
+
+    def influences_on(self, target_id: int) -> List[Edge]:
+        """All incoming edges of one target."""
+        t = self.position.get(target_id)
+        if t is None:
+            return []
+        csr = self.reverse
+        return [
+            Edge(self.ids[csr.columns[at]], target_id, csr.values[at], self._note(csr.notes[at]))
+            for at in csr.row(t)
+        ]
+
+
+_graph = VersionedLocal(VERSION_KEY, EffectGraph.load)
+
+
+def get_graph() -> EffectGraph:
+    """Return the shared graph for the current catalogue version."""
+    return _graph.get()
@@ -0,0 +1,72 @@
+# app1/etags.py
+"""
+Strong ETags for the JSON APIs.
+
+Each tag is derived only from version counters (the catalogue version
+plus a per-project version, see versioning.py), so a conditional GET that
+matches is answered with 304 before the view body loads anything else. Use with Django's
+`django.views.decorators.http.etag` decorator.
+"""
+import hashlib
+from typing import Optional
+
+from . import versioning
+from .catalogue import VERSION_KEY as CATALOGUE_VERSION_KEY
+
+PROJECT_VERSION_KEY = "project:{project_id}:version"
+
+
+def project_version_key(project_id: int) -> str:
+    return PROJECT_VERSION_KEY.format(project_id=project_id)
+
+
+def bump_project_version(project_id: Optional[int]) -> None:
+    """Call whenever a project's metrics or intervention selections change."""
+    if project_id:
+        versioning.bump(project_version_key(project_id))
+
+
+def _tag(*parts) -> str:
+    return hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+
+def _versions(project_id: Optional[int] = None) -> tuple:
+    keys = [CATALOGUE_VERSION_KEY]
+    if project_id:
+        keys.append(project_version_key(project_id))
+    found = versioning.get_versions(*keys)
+    return tuple(found[k] for k in keys)
+
+
+def interventions_api_etag(request) -> str:
+    # Payload embeds the session project's areas, so its version is part of the tag
+    metrics_id = request.session.get("metrics_id")
+    ui_key = (request.GET.get("cls") or "").strip().lower()
+    return _tag("interventions", ui_key, metrics_id, *_versions(metrics_id))
+
+
+def intervention_selection_list_etag(request, metrics_id: int) -> str:
+    return _tag("selections", metrics_id, *_versions(metrics_id))
+
+
+def intervention_effects_etag(request) -> str:
+    return _tag("effects", request.GET.get("source") or "", *_versions())
+
+
+def _id_set_tag(kind: str, request) -> str:
+    ids = sorted(
+        {int(x) for chunk in request.GET.getlist("ids") for x in chunk.split(",") if x.strip().isdigit()}
+    )
+    return _tag(kind, ",".join(map(str, ids)), *_versions())
+
+
+def intervention_effects_batch_etag(request) -> str:
+    return _id_set_tag("effects-batch", request)
+
+
+def intervention_ratings_etag(request) -> str:
+    return _id_set_tag("ratings", request)
+
+
+def intervention_search_etag(request) -> str:
+    return _tag("search", (request.GET.get("q") or "").strip().lower(), request.GET.get("limit") or "", *_versions())
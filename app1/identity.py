@@ -0,0 +1,139 @@
+# app1/identity.py
+"""
+Per-request identity: the user that owns projects and their role
+(UserProfile.user_type).
+
+Projects belong to the Django auth user (`Metrics.user` points at
+auth.User), which AuthenticationMiddleware has already loaded, so the
+owner costs nothing to resolve. The role is resolved once per request by
+`IdentityMiddleware` and kept in the session, so a warm session runs no
+profile query; `request.user.userprofile` is filled from that copy for
+templates and `is_admin()` checks.
+
+The session copy is tagged with a per-user version counter (see
+versioning.py) that signals bump whenever the user's profile changes,
+e.g. promote/demote in admin_dashboard. The counter is shared by every
+worker (a shared cache, or the VersionCounter table under the per-process
+LocMem default), so a role change made in another process is picked up
+within VERSION_POLL_SECONDS. ROLE_MAX_AGE only bounds how long a copy is
+trusted if a bump is ever missed (e.g. a profile edited outside Django).
+"""
+import time
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+from django.contrib.auth import get_user_model
+
+from . import versioning
+from .models import UserProfile
+
+SESSION_KEY = "_app_identity"
+ROLE_VERSION_KEY = "identity:role:{user_id}:version"
+# Seconds a session copy is trusted even if the version didn't move
+ROLE_MAX_AGE = 300
+
+
+@dataclass(frozen=True)
+class Identity:
+    user_id: int
+    role: Optional[str]  # None when the user has no UserProfile
+    profile_id: Optional[int]
+    version: int
+    resolved_at: float
+
+    @property
+    def is_admin(self) -> bool:
+        return self.role == "admin"
+
+
+def role_version_key(user_id: int) -> str:
+    return ROLE_VERSION_KEY.format(user_id=user_id)
+
+
+def bump_role_version(user_id: Optional[int]) -> None:
+    """Call whenever a user's profile/role changes."""
+    if user_id:
+        versioning.bump(role_version_key(user_id))
+
+
+def _load(user_id: int, version: int) -> Identity:
+    profile = UserProfile.objects.filter(user_id=user_id).values_list("id", "user_type").first()
+    return Identity(
+        user_id=user_id,
+        role=profile[1] if profile else None,
+        profile_id=profile[0] if profile else None,
+        version=version,
+        resolved_at=time.time(),
+    )
+
+
+def _from_session(data, user_id: int, version: int) -> Optional[Identity]:
+    if not isinstance(data, dict):
+        return None
+    try:
+        ident = Identity(**data)
+    except TypeError:
+        return None
+    if ident.user_id != user_id or ident.version != version:
+        return None
+    if time.time() - ident.resolved_at > ROLE_MAX_AGE:
+        return None
+    return ident
+
+
+def _prime_profile(user, ident: Identity) -> None:
+    """Fill `user.userprofile` so templates and is_admin() don't query it."""
+    related = get_user_model().userprofile.related
+    if ident.profile_id is None:
+        related.set_cached_value(user, None)
+        return
+    profile = UserProfile.from_db(None, ["id", "user_id", "user_type"], [ident.profile_id, ident.user_id, ident.role])
+    UserProfile.user.field.set_cached_value(profile, user)
+    related.set_cached_value(user, profile)
+
+
+def resolve(request) -> Optional[Identity]:
+    """The request's Identity (None when anonymous), memoised on the request."""
+    if hasattr(request, "_identity"):
+        return request._identity
+
+    user = getattr(request, "user", None)
+    ident = None
+    if getattr(user, "is_authenticated", False):
+        version = versioning.get_version(role_version_key(user.pk))
+        session = getattr(request, "session", None)
+        if session is not None:
+            ident = _from_session(session.get(SESSION_KEY), user.pk, version)
+        if ident is None:
+            ident = _load(user.pk, version)
+            if session is not None:
+                session[SESSION_KEY] = asdict(ident)
+        _prime_profile(user, ident)
+
+    request._identity = ident
+    return ident
+
+
+def owner(request):
+    """The auth user owning the request's projects, or None when anonymous."""
+    user = getattr(request, "user", None)
+    if not getattr(user, "is_authenticated", False):
+        return None
+    # Unwrap AuthenticationMiddleware's lazy object for FK assignment
+    return getattr(user, "_wrapped", user)
+
+
+def is_admin(request) -> bool:
+    ident = resolve(request)
+    return bool(ident and ident.is_admin)
+
+
+class IdentityMiddleware:
+    """Resolve the role once per request (after AuthenticationMiddleware)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        resolve(request)
+        return self.get_response(request)
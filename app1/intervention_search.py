@@ -0,0 +1,257 @@
+# app1/intervention_search.py
+"""
+In-memory typeahead index over the intervention catalogue.
+
+Built from the catalogue snapshot and rebuilt whenever the catalogue
+version moves (see versioning.VersionedLocal), so each process searches
+plain Python structures and never touches the database.
+
+Ranking, per query term (every term must match):
+    8  the name starts with the term
+    5  a word in the name starts with the term
+    3  the term appears inside the name (e.g. "olar" in "Solar PV")
+    2  the theme contains the term
+    1  a description word starts with the term
+
+Word prefixes (2-6 characters) of names and themes map to posting lists
+pre-sorted by that weight, so a single-word query reads just `limit`
+entries. Multi-word queries intersect the lists tier by tier (name-start
+with name-start, then the next best combination, ...) and stop as soon as
+no remaining combination can beat the current top-k. Infix (3+ letters)
+and description-only matches are found through a trigram index and a
+sorted description vocabulary, only when the prefix lists cannot fill
+the top-k on their own.
+"""
+import heapq
+import re
+import threading
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from itertools import product
+from typing import Dict, List, Sequence, Tuple
+
+from . import catalogue, versioning
+from .catalogue import api_item
+
+MIN_TERM = 2
+MAX_PREFIX = 6
+MAX_LIMIT = 50
+# Description words a single prefix may expand to in the fallback scan
+MAX_VOCAB_EXPANSION = 64
+# Memoised query results per index (cleared when full)
+RESULT_CACHE_SIZE = 2048
+
+NAME_START = 8
+NAME_WORD = 5
+NAME_INFIX = 3
+THEME_MATCH = 2
+DESCRIPTION_MATCH = 1
+
+_WORD = re.compile(r"\w+")
+_EMPTY = (array("I"), array("B"), ())
+
+
+def _terms(query: str) -> Tuple[str, ...]:
+    return tuple(dict.fromkeys(t for t in _WORD.findall(query.lower()) if len(t) >= MIN_TERM))
+
+
+def _trigrams(text: str):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _tiers(weights: array):
+    """(weight, start, end) runs of a best-first weight list."""
+    runs = []
+    start = 0
+    for pos in range(1, len(weights) + 1):
+        if pos == len(weights) or weights[pos] != weights[start]:
+            runs.append((weights[start], start, pos))
+            start = pos
+    return tuple(runs)
+
+
+def _padded_words(text: str) -> str:
+    # " w1 w2 ..." so that `" " + term in ...` is a word-prefix test
+    return " " + " ".join(_WORD.findall(text))
+
+
+class InterventionSearchIndex:
+
+    def __init__(self, interventions: Sequence):
+        self.items = tuple(api_item(i) for i in interventions)
+        self.names = tuple((i.name or "").lower() for i in interventions)
+        self.themes = tuple((i.theme or "").lower() for i in interventions)
+        self._name_words = tuple(_padded_words(n) for n in self.names)
+        self._theme_words = tuple(_padded_words(t) for t in self.themes)
+        self._description_words = tuple(_padded_words((i.description or "").lower()) for i in interventions)
+
+        # prefix -> {idx: weight}, then frozen into lists sorted best-first
+        weights = defaultdict(dict)
+        trigrams = defaultdict(set)
+        description_vocab = defaultdict(set)
+        for idx in range(len(self.items)):
+            fields = (
+                (self._name_words[idx].split(), NAME_WORD),
+                (self._theme_words[idx].split(), THEME_MATCH),
+            )
+            for words, weight in fields:
+                for position, word in enumerate(words):
+                    w = NAME_START if weight == NAME_WORD and position == 0 else weight
+                    for end in range(MIN_TERM, min(len(word), MAX_PREFIX) + 1):
+                        bucket = weights[word[:end]]
+                        if bucket.get(idx, 0) < w:
+                            bucket[idx] = w
+            for field in (self.names[idx], self.themes[idx]):
+                for gram in _trigrams(field):
+                    trigrams[gram].add(idx)
+            for word in self._description_words[idx].split():
+                description_vocab[word].add(idx)
+
+        self._prefix: Dict[str, Tuple[array, array, tuple]] = {}
+        for prefix, bucket in weights.items():
+            ranked = sorted(bucket.items(), key=lambda kv: (-kv[1], len(self.names[kv[0]]), kv[0]))
+            weight_list = array("B", (w for _, w in ranked))
+            self._prefix[prefix] = (array("I", (i for i, _ in ranked)), weight_list, _tiers(weight_list))
+        self._trigrams = {g: array("I", sorted(s)) for g, s in trigrams.items()}
+        self._vocab = sorted(description_vocab)
+        self._description = {w: array("I", sorted(s)) for w, s in description_vocab.items()}
+
+        self._cache: Dict[tuple, list] = {}
+        self._cache_lock = threading.Lock()
+
+    # ---- scoring ----
+
+    def _term_score(self, idx: int, term: str) -> int:
+        name = self.names[idx]
+        if name.startswith(term):
+            return NAME_START
+        if " " + term in self._name_words[idx]:
+            return NAME_WORD
+        # Infix matches need three letters, like the trigram index
+        infix = len(term) >= 3
+        if infix and term in name:
+            return NAME_INFIX
+        if " " + term in self._theme_words[idx] or (infix and term in self.themes[idx]):
+            return THEME_MATCH
+        if " " + term in self._description_words[idx]:
+            return DESCRIPTION_MATCH
+        return 0
+
+    def _score(self, idx: int, terms) -> int:
+        total = 0
+        for term in terms:
+            score = self._term_score(idx, term)
+            if not score:
+                return 0
+            total += score
+        return total
+
+    def _rank_key(self, idx: int, score: int):
+        # Higher score first, then shorter names, then catalogue (pk) order
+        return (score, -len(self.names[idx]), -idx)
+
+    # ---- candidate sources ----
+
+    def _fallback_candidates(self, term: str):
+        """Items matching `term` by name/theme infix or description word prefix."""
+        found = set()
+        if len(term) >= 3:
+            postings = sorted((self._trigrams.get(g, ()) for g in _trigrams(term)), key=len)
+            if postings and postings[0]:
+                found = set(postings[0])
+                for posting in postings[1:]:
+                    found.intersection_update(posting)
+        start = bisect_left(self._vocab, term)
+        for word in self._vocab[start:start + MAX_VOCAB_EXPANSION]:
+            if not word.startswith(term):
+                break
+            found.update(self._description[word])
+        return found
+
+    # ---- queries ----
+
+    def _search(self, terms, k: int) -> List[Tuple[int, int]]:
+        lists = [self._prefix.get(t[:MAX_PREFIX], _EMPTY) for t in terms]
+        seen = set()
+        top = []  # min-heap of (rank key, idx, score), at most k entries
+
+        def consider(idx):
+            seen.add(idx)
+            score = self._score(idx, terms)
+            if score:
+                entry = (self._rank_key(idx, score), idx, score)
+                if len(top) < k:
+                    heapq.heappush(top, entry)
+                elif entry > top[0]:
+                    heapq.heapreplace(top, entry)
+
+        def done(bound):
+            return len(top) == k and top[0][2] >= bound
+
+        # An item missing from one list scores at most NAME_INFIX on that term
+        best = [max(runs[0][0], NAME_INFIX) if runs else 0 for _, _, runs in lists]
+        outside = sum(best) + max(NAME_INFIX - b for b in best)
+
+        if len(lists) == 1:
+            # Single term: the list is already in rank order, read until full
+            docs, weights, _ = lists[0]
+            for pos, idx in enumerate(docs):
+                if done(max(weights[pos], NAME_INFIX)):
+                    break
+                consider(idx)
+        else:
+            # Tier combinations, best upper bound first, intersected in C. An
+            # item in the theme tier may still score an infix hit on the name.
+            tiers = [
+                [(max(w, NAME_INFIX), docs, lo, hi) for w, lo, hi in runs]
+                for docs, _, runs in lists
+            ]
+            combos = sorted(product(*tiers), key=lambda combo: -sum(tier[0] for tier in combo))
+            for combo in combos:
+                if done(sum(tier[0] for tier in combo)):
+                    break
+                segments = sorted((docs[lo:hi] for _, docs, lo, hi in combo), key=len)
+                for idx in set(segments[0]).intersection(*segments[1:]):
+                    consider(idx)
+
+        if not done(outside):
+            # Items outside some prefix list only match that term through an
+            # infix or description hit
+            for term in terms:
+                for idx in self._fallback_candidates(term):
+                    if idx not in seen:
+                        consider(idx)
+
+        return [(idx, score) for _, idx, score in sorted(top, reverse=True)]
+
+    def clear_cache(self) -> None:
+        with self._cache_lock:
+            self._cache.clear()
+
+    def search(self, query: str, limit: int = 10) -> List[dict]:
+        """Top `limit` interventions matching every term of `query`, best first."""
+        terms = _terms(query)
+        if not terms:
+            return []
+        key = (terms, min(limit, MAX_LIMIT))
+        hits = self._cache.get(key)
+        if hits is None:
+            hits = self._search(*key)
+            with self._cache_lock:
+                if len(self._cache) >= RESULT_CACHE_SIZE:
+                    self._cache.clear()
+                self._cache[key] = hits
+        return [dict(self.items[idx], score=score) for idx, score in hits]
+
+
+def _load() -> InterventionSearchIndex:
+    return InterventionSearchIndex(catalogue.get_snapshot().interventions)
+
+
+_index = versioning.VersionedLocal(catalogue.VERSION_KEY, _load)
+
+
+def get_index() -> InterventionSearchIndex:
+    """Index for the current catalogue version (rebuilt after catalogue writes)."""
+    return _index.get()
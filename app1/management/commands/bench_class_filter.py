@@ -0,0 +1,118 @@
+"""
+Compare the old `?cls=` filter (one LOWER("class") LIKE '%term%' per alias,
+run on every request) with the path interventions_api now takes: the
+class groups pre-built in the catalogue snapshot (app1/catalogue.py).
+
+Runs on a throwaway test database file, so it never touches the project
+database:
+
+    python manage.py bench_class_filter --rows 100000
+
+Both paths must return the same interventions in the same order; the
+command fails if they don't.
+"""
+import os
+import random
+import statistics
+import tempfile
+import time
+from functools import reduce
+from operator import or_
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from app1 import catalogue
+from app1.classes import CLASS_ALIASES
+from app1.models import Interventions
+
+CLASS_LABELS = [
+    "Carbon Emissions",
+    "Health and Wellbeing",
+    "Water Use",
+    "Circular Economy",
+    "Resilience",
+    "Biodiversity",
+    "Value & Cost",
+    "Water and Carbon",  # listed under both ?cls=carbon and ?cls=water
+    "",
+]
+
+
+def _like_filter(key):
+    """The pre-snapshot query: every alias as a case-insensitive substring."""
+    terms = reduce(or_, (Q(class_name__icontains=t) for t in CLASS_ALIASES[key]))
+    rows = Interventions.objects.filter(terms).order_by("theme", "name")
+    return [catalogue.api_item(i) for i in rows]
+
+
+def _time(func, repeat):
+    timings, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings, result
+
+
+class Command(BaseCommand):
+    help = "Benchmark LIKE-based class filtering against the catalogue snapshot's class groups."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100_000)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--cls", default="carbon", choices=sorted(CLASS_ALIASES))
+        parser.add_argument("--seed", type=int, default=398)
+
+    def handle(self, *args, **opts):
+        test_settings = connection.settings_dict.setdefault("TEST", {})
+        old_test_name = test_settings.get("NAME")
+        with tempfile.TemporaryDirectory() as tmp:
+            test_settings["NAME"] = os.path.join(tmp, "bench.db")
+            setup_test_environment()
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            try:
+                with override_settings(CACHES={"default": {
+                    "BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "bench-class-filter",
+                }}):
+                    self._run(opts)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                teardown_test_environment()
+                test_settings["NAME"] = old_test_name
+
+    def _run(self, opts):
+        rng = random.Random(opts["seed"])
+        Interventions.objects.bulk_create(
+            (
+                Interventions(
+                    class_name=rng.choice(CLASS_LABELS), theme=f"Theme {n % 40}", name=f"Intervention {n}",
+                    description="x" * rng.randint(20, 200), cost_level=rng.randint(1, 10), cost_range="",
+                    intervention_rating=rng.randint(1, 10),
+                )
+                for n in range(1, opts["rows"] + 1)
+            ),
+            batch_size=2000,
+        )
+        catalogue.bump_version()
+        key = opts["cls"]
+
+        like_timings, expected = _time(lambda: _like_filter(key), opts["repeat"])
+        build_timings, _ = _time(lambda: catalogue.CatalogueSnapshot(0, list(Interventions.objects.order_by("id"))), 3)
+        catalogue.get_snapshot()  # warm
+        lookup_timings, found = _time(lambda: catalogue.get_snapshot().items_for_class(key), opts["repeat"])
+
+        if [item["id"] for item in found] != [item["id"] for item in expected]:
+            raise CommandError(f"The snapshot returned {len(found)} items for ?cls={key}, LIKE returned {len(expected)}")
+        for label, timings in (
+            ("LIKE per alias", like_timings),
+            ("snapshot build", build_timings),
+            ("snapshot lookup", lookup_timings),
+        ):
+            self.stdout.write(
+                f"{label:<16} rows={len(expected):<7} median={statistics.median(timings):9.3f} ms "
+                f"min={min(timings):9.3f} ms"
+            )
+        self.stdout.write("The snapshot is built once per catalogue version; requests pay the lookup.")
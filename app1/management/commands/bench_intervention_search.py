@@ -0,0 +1,66 @@
+"""
+Time the in-memory intervention typeahead index on a synthetic catalogue:
+
+    python manage.py bench_intervention_search --items 50000
+
+Builds the index from unsaved model instances, so no database is touched.
+"""
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from app1.intervention_search import InterventionSearchIndex
+from app1.models import Interventions
+
+WORDS = (
+    "solar pv rooftop array battery storage heat pump insulation glazing double triple led lighting "
+    "rainwater harvesting greywater recycling green roof wall facade shading timber low carbon concrete "
+    "recycled steel ventilation natural daylight sensor smart meter ev charging bike parking native "
+    "planting habitat biodiversity composting waste reduction water efficient fixtures tap shower toilet"
+).split()
+THEMES = ("Energy", "Water", "Materials", "Health", "Biodiversity", "Waste", "Transport", "Monitoring")
+QUERIES = ("so", "sol", "solar", "heat pump", "rain harv", "led", "timber carb", "xyzzy", "bio", "wat eff")
+
+
+class Command(BaseCommand):
+    help = "Benchmark intervention typeahead queries against a synthetic catalogue."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--items", type=int, default=50_000)
+        parser.add_argument("--repeat", type=int, default=200)
+        parser.add_argument("--limit", type=int, default=10)
+        parser.add_argument("--seed", type=int, default=398)
+
+    def handle(self, *args, **opts):
+        rng = random.Random(opts["seed"])
+        items = [
+            Interventions(
+                id=n,
+                name=" ".join(rng.sample(WORDS, rng.randint(2, 5))).title(),
+                theme=rng.choice(THEMES),
+                description=" ".join(rng.choices(WORDS, k=rng.randint(10, 40))),
+                cost_level=rng.randint(1, 5),
+                intervention_rating=rng.randint(1, 10),
+            )
+            for n in range(1, opts["items"] + 1)
+        ]
+
+        start = time.perf_counter()
+        index = InterventionSearchIndex(items)
+        self.stdout.write(f"built index over {len(items)} items in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        for query in QUERIES:
+            timings = []
+            hits = []
+            for _ in range(opts["repeat"]):
+                index.clear_cache()  # time the index, not the result memo
+                start = time.perf_counter()
+                hits = index.search(query, limit=opts["limit"])
+                timings.append((time.perf_counter() - start) * 1000)
+            top = hits[0]["name"] if hits else "-"
+            self.stdout.write(
+                f"{query!r:<14} hits={len(hits):<3} median={statistics.median(timings):7.3f} ms "
+                f"p95={sorted(timings)[int(len(timings) * 0.95) - 1]:7.3f} ms  top: {top}"
+            )
@@ -0,0 +1,143 @@
+"""
+Compare session write behaviour under concurrent users:
+
+    always     stock db sessions, `modified = True` on every view (old views)
+    elided     app1.session_backends.db: write only when data changed
+    cached_db  app1.session_backends.cached_db: as above, reads from cache
+
+Each simulated request loads the user's session row, re-stores the active
+project (switching project with probability --switch) and reads one
+project row, like project_detail_view. Session stores are the real engine
+classes (change tracking and encoding); the rows live in a throwaway
+SQLite file shaped like django_session, so the project database is never
+touched:
+
+    python manage.py bench_sessions --users 16 --requests 300
+"""
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from django.contrib.sessions.backends import db as stock_db
+from django.core.management.base import BaseCommand
+
+from app1.session_backends import cached_db as eliding_cached_db
+from app1.session_backends import db as eliding_db
+
+MODES = {
+    "always": stock_db.SessionStore,
+    "elided": eliding_db.SessionStore,
+    "cached_db": eliding_cached_db.SessionStore,
+}
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class Command(BaseCommand):
+    help = "Benchmark session writes and latency with and without write elision."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=16)
+        parser.add_argument("--requests", type=int, default=300, help="Requests per user")
+        parser.add_argument("--switch", type=float, default=0.05, help="Chance a request changes project")
+        parser.add_argument("--seed", type=int, default=398)
+
+    def handle(self, *args, **opts):
+        for mode, store_class in MODES.items():
+            with tempfile.TemporaryDirectory() as tmp:
+                stats = self._run(os.path.join(tmp, "bench.db"), mode, store_class, opts)
+            timings = stats["timings"]
+            self.stdout.write(
+                f"{mode:<10} requests={len(timings):<6} writes={stats['writes']:<6} "
+                f"p50={statistics.median(timings):7.2f} ms p95={_percentile(timings, 95):7.2f} ms "
+                f"p99={_percentile(timings, 99):7.2f} ms  {len(timings) / stats['elapsed']:8.0f} req/s"
+            )
+
+    def _run(self, path, mode, store_class, opts):
+        setup = sqlite3.connect(path)
+        setup.executescript(
+            """
+            CREATE TABLE django_session (
+                session_key varchar(40) PRIMARY KEY, session_data text, expire_date datetime);
+            CREATE INDEX django_session_expire_date ON django_session (expire_date);
+            CREATE TABLE Metrics (id INTEGER PRIMARY KEY, project_name varchar(255), payload text);
+            """
+        )
+        setup.executemany(
+            "INSERT INTO Metrics VALUES (?, ?, ?)", [(n, f"Project {n}", "x" * 2000) for n in range(1, 201)]
+        )
+        encoder = store_class()
+        sessions = {}
+        for user in range(opts["users"]):
+            key = f"bench{user:035d}"
+            data = {"_auth_user_id": str(user + 1), "metrics_id": 1, "user_theme": "light"}
+            sessions[key] = encoder.encode(data)
+        setup.executemany(
+            "INSERT INTO django_session VALUES (?, ?, '2999-01-01 00:00:00')", sessions.items()
+        )
+        setup.commit()
+        setup.close()
+
+        cache = dict(sessions)  # shared cache for the cached_db mode
+        lock = threading.Lock()
+        stats = {"timings": [], "writes": 0}
+        barrier = threading.Barrier(opts["users"] + 1)
+
+        def user_thread(n, key):
+            conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+            rng = random.Random(opts["seed"] + n)
+            project = 1
+            timings, writes = [], 0
+            barrier.wait()
+            for _ in range(opts["requests"]):
+                start = time.perf_counter()
+                store = store_class(session_key=key)
+                raw = cache.get(key) if mode == "cached_db" else None
+                if raw is None:
+                    raw = conn.execute(
+                        "SELECT session_data FROM django_session WHERE session_key = ? AND expire_date > ?",
+                        (key, "2000-01-01"),
+                    ).fetchone()[0]
+                store._session_cache = store.decode(raw)
+
+                if rng.random() < opts["switch"]:
+                    project = rng.randint(1, 200)
+                conn.execute("SELECT project_name, payload FROM Metrics WHERE id = ?", (project,)).fetchone()
+                store["metrics_id"] = project
+                if mode == "always":
+                    store.modified = True
+
+                if store.modified:
+                    data = store.encode(store._get_session(no_load=True))
+                    conn.execute(
+                        "UPDATE django_session SET session_data = ?, expire_date = '2999-01-01 00:00:00' "
+                        "WHERE session_key = ?",
+                        (data, key),
+                    )
+                    if mode == "cached_db":
+                        cache[key] = data
+                    writes += 1
+                timings.append((time.perf_counter() - start) * 1000)
+            conn.close()
+            with lock:
+                stats["timings"].extend(timings)
+                stats["writes"] += writes
+
+        threads = [
+            threading.Thread(target=user_thread, args=(n, key)) for n, key in enumerate(sessions)
+        ]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        stats["elapsed"] = time.perf_counter() - start
+        return stats
@@ -0,0 +1,417 @@
+"""
+Benchmark the hot views on a deterministic synthetic dataset:
+
+    python manage.py bench_views
+    python manage.py bench_views --metrics 10000 --interventions 2000 --effects 20000 --iterations 20
+    python manage.py bench_views --compare logs/bench_views-20260101T120000.json
+    python manage.py bench_views --compare old.json new.json
+
+Builds a throwaway SQLite database file (migrated, plus the unmanaged
+tables) and seeds it from --seed, so two runs at the same scale time the
+same data. Each case is then requested through the test client by a
+signed-in admin: --warmup untimed requests, --iterations timed ones
+(latency percentiles and query count), and a few more under tracemalloc
+for the peak of Python allocations per request. Report cases marked
+"cold" use a different project on every request, so they include the
+build; "warm" ones hit the artifact cache.
+
+Results are written as JSON (--output, default logs/bench_views-<time>.json).
+With --compare the run is checked against an earlier result file; given
+two files, they are compared without running anything. A case regresses
+when its p95 grows by more than --threshold percent (and at least 1 ms)
+or it runs more queries; the command then exits non-zero.
+"""
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from decimal import Decimal
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from app1 import querylog, rollups
+from app1.models import (
+    ClassTargets,
+    InterventionDependencies,
+    InterventionEffects,
+    InterventionSelection,
+    Interventions,
+    Metrics,
+    UserProfile,
+)
+
+from .check_query_budgets import _create_unmanaged_tables
+
+PASSWORD = "bench-views"
+
+THEMES = [
+    ("Operating Carbon", "Carbon Emissions"),
+    ("Embodied Carbon", "Carbon Emissions"),
+    ("Water Use", "Water"),
+    ("Circular Potentials", "Circular Economy"),
+    ("Health and Wellbeing", "Health & Wellbeing"),
+    ("Resilience", "Resilience"),
+    ("Biodiversity", "Biodiversity"),
+    ("Value and Cost", "Value & Cost"),
+]
+WORDS = [
+    "solar", "rainwater", "heat", "pump", "glazing", "insulation", "timber", "green", "roof", "facade",
+    "recycled", "low", "carbon", "concrete", "led", "sensor", "shading", "ventilation", "battery", "reuse",
+]
+BUILDING_TYPES = ["Office", "Residential", "Hotel", "Retail", "School", "Hospital", "Warehouse"]
+LOCATIONS = ["Brisbane", "Sydney", "Melbourne", "Perth", "Adelaide", "Hobart", "Darwin", "Canberra"]
+DEPENDENCY_METRICS = ["gifa_m2", "roof_area_m2", "num_apartments", "total_budget_aud", "external_wall_area_m2"]
+BATCH = 2000
+MIN_REGRESSION_MS = 1.0
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+# =========================
+# Synthetic data
+# =========================
+
+def _seed(opts) -> dict:
+    rng = random.Random(opts["seed"])
+    now = timezone.now()
+
+    admin = User.objects.create_user("bench_admin", "bench_admin@example.com", PASSWORD)
+    UserProfile.objects.create(user=admin, user_type="admin")
+    hashed = make_password(PASSWORD)
+    User.objects.bulk_create(
+        User(username=f"bench_user_{n}", email=f"bench_user_{n}@example.com", password=hashed)
+        for n in range(opts["users"])
+    )
+    user_ids = [admin.id] + list(User.objects.exclude(id=admin.id).values_list("id", flat=True))
+
+    ClassTargets.objects.bulk_create(
+        (
+            ClassTargets(class_name=label, target_rating=rng.randint(10, 80))
+            for label in dict.fromkeys(class_name for _, class_name in THEMES)
+        ),
+        ignore_conflicts=True,
+    )
+
+    interventions = []
+    for n in range(1, opts["interventions"] + 1):
+        theme, class_name = THEMES[n % len(THEMES)]
+        words = rng.sample(WORDS, 3)
+        interventions.append(Interventions(
+            name=f"{words[0].title()} {words[1]} {n}", theme=theme, class_name=class_name,
+            description=" ".join(rng.choices(WORDS, k=12)),
+            cost_level=rng.randint(1, 5), cost_range=f"${rng.randint(1, 50)}k", intervention_rating=rng.randint(1, 10),
+        ))
+    Interventions.objects.bulk_create(interventions, batch_size=BATCH)
+    catalogue = list(Interventions.objects.order_by("id").values_list("id", "name"))
+    names = [name for _, name in catalogue]
+
+    InterventionEffects.objects.bulk_create(
+        (
+            InterventionEffects(
+                source_intervention_name=rng.choice(names), target_intervention_name=rng.choice(names),
+                effect_value=round(rng.uniform(-2, 2), 2),
+            )
+            for _ in range(opts["effects"])
+        ),
+        batch_size=BATCH,
+    )
+    InterventionDependencies.objects.bulk_create(
+        (
+            InterventionDependencies(
+                intervention_id=iid, metric_name=rng.choice(DEPENDENCY_METRICS),
+                min_value=rng.choice([None, rng.uniform(0, 500)]), max_value=rng.choice([None, rng.uniform(1000, 50000)]),
+            )
+            for iid, _ in rng.sample(catalogue, min(len(catalogue), opts["dependencies"]))
+        ),
+        batch_size=BATCH,
+    )
+
+    Metrics.objects.bulk_create(
+        (
+            Metrics(
+                # The admin owns every tenth project: reports are owner-only
+                user_id=admin.id if n % 10 == 0 else rng.choice(user_ids), project_code=f"BV{n:06d}",
+                project_name=f"{rng.choice(WORDS).title()} {rng.choice(BUILDING_TYPES).lower()} {n}",
+                building_type=rng.choice(BUILDING_TYPES), location=rng.choice(LOCATIONS),
+                gifa_m2=Decimal(rng.randint(200, 60000)), roof_area_m2=Decimal(rng.randint(50, 8000)),
+                num_apartments=rng.randint(0, 300), num_keys=rng.randint(0, 200),
+                total_budget_aud=rng.choice([None, Decimal(rng.randint(10, 5000) * 1000)]),
+            )
+            for n in range(1, opts["metrics"] + 1)
+        ),
+        batch_size=BATCH,
+    )
+    # Spread creation dates over five years (auto_now_add sets them all to now)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'UPDATE "Metrics" SET created_at = datetime(%s, printf(\'-%%d days\', (id * 7919) %% 1825)), '
+            "updated_at = datetime(%s, printf('-%%d minutes', (id * 104729) %% 2628000))",
+            [now.strftime("%Y-%m-%d %H:%M:%S")] * 2,
+        )
+    project_ids = list(Metrics.objects.values_list("id", flat=True))
+    own_ids = list(Metrics.objects.filter(user=admin).order_by("id").values_list("id", flat=True))
+
+    InterventionSelection.objects.bulk_create(
+        (
+            InterventionSelection(project_id=rng.choice(project_ids), intervention_id=rng.choice(catalogue)[0])
+            for _ in range(opts["selections"])
+        ),
+        batch_size=BATCH,
+        ignore_conflicts=True,
+    )
+    rollups.rebuild()
+
+    return {
+        "own_project_ids": own_ids,
+        "selected_ids": [iid for iid, _ in rng.sample(catalogue, min(len(catalogue), 5))],
+        "effect_source": names[len(names) // 2],
+        "search": rng.choice(WORDS),
+    }
+
+
+# =========================
+# Cases
+# =========================
+
+def _cases(data, rounds: int) -> dict:
+    """name -> callable(client, n) making the n-th request of that case."""
+    projects = data["own_project_ids"]
+    project = projects[0]
+    selection = [str(i) for i in data["selected_ids"]]
+
+    def cold(offset):
+        # A different project per request, so nothing is cached yet
+        return lambda n: projects[(offset + n) % len(projects)]
+
+    cold_html, cold_word = cold(1), cold(1 + rounds)
+    return {
+        "interventions_api": lambda c, n: c.get(reverse("interventions_api"), {"cls": "carbon"}),
+        "carbon_view": lambda c, n: c.get(reverse("carbon")),
+        "calculator_post": lambda c, n: c.post(
+            reverse("calculator"), {"metrics_id": project, "selected_ids": selection}
+        ),
+        "get_intervention_effects": lambda c, n: c.get(
+            reverse("get_intervention_effects"), {"source": data["effect_source"]}
+        ),
+        "dashboard_view": lambda c, n: c.get(reverse("dashboard")),
+        "projects_view": lambda c, n: c.get(reverse("projects")),
+        "projects_view_search": lambda c, n: c.get(reverse("projects"), {"q": data["search"]}),
+        "generate_report_html_warm": lambda c, n: c.get(reverse("generate_report", args=[project])),
+        "generate_report_html_cold": lambda c, n: c.get(reverse("generate_report", args=[cold_html(n)])),
+        "generate_report_word_cold": lambda c, n: c.get(
+            reverse("generate_report", args=[cold_word(n)]), {"download": "word"}
+        ),
+    }
+
+
+@contextmanager
+def _quiet_request_logs():
+    """Keep slow-request and trace logging out of the benchmark."""
+    loggers = [logging.getLogger(name) for name in ("app1.slow_requests", "app1.traces")]
+    levels = [logger.level for logger in loggers]
+    for logger in loggers:
+        logger.setLevel(logging.CRITICAL)
+    try:
+        yield
+    finally:
+        for logger, level in zip(loggers, levels):
+            logger.setLevel(level)
+
+
+def _request(make, client, n):
+    """(ms, queries, status) for one request, streamed bodies included."""
+    stats = querylog.QueryStats()
+    start = time.perf_counter()
+    with connection.execute_wrapper(stats):
+        response = make(client, n)
+        if response.streaming:
+            b"".join(response.streaming_content)
+        response.close()
+    return (time.perf_counter() - start) * 1000, stats.count, response.status_code
+
+
+class Command(BaseCommand):
+    help = "Time the hot views on a synthetic dataset and save or compare the results."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--metrics", type=int, default=100_000, help="Projects (Metrics rows)")
+        parser.add_argument("--interventions", type=int, default=20_000)
+        parser.add_argument("--effects", type=int, default=200_000, help="InterventionEffects rows")
+        parser.add_argument("--dependencies", type=int, default=2_000, help="InterventionDependencies rows")
+        parser.add_argument("--selections", type=int, default=100_000, help="InterventionSelection rows")
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument("--seed", type=int, default=398)
+        parser.add_argument("--iterations", type=int, default=30, help="Timed requests per case")
+        parser.add_argument("--warmup", type=int, default=3, help="Untimed requests per case")
+        parser.add_argument("--memory-iterations", type=int, default=3, help="Requests per case under tracemalloc")
+        parser.add_argument("--case", action="append", help="Only run this case (repeatable)")
+        parser.add_argument("--output", help="Result file (default logs/bench_views-<time>.json)")
+        parser.add_argument("--compare", nargs="+", metavar="FILE", help="Baseline result, or baseline and new")
+        parser.add_argument("--threshold", type=float, default=20.0, help="Allowed p95 growth, percent")
+
+    def handle(self, *args, **opts):
+        compare = opts["compare"] or []
+        if len(compare) > 2:
+            raise CommandError("--compare takes a baseline file, or a baseline and a new result file")
+        if len(compare) == 2:
+            self._compare(self._load(compare[0]), self._load(compare[1]), opts["threshold"])
+            return
+        baseline = self._load(compare[0]) if compare else None
+
+        result = self._bench(opts)
+        output = opts["output"] or os.path.join(
+            settings.LOG_DIR, f"bench_views-{timezone.now():%Y%m%dT%H%M%S}.json"
+        )
+        with open(output, "w") as fh:
+            json.dump(result, fh, indent=2)
+        self.stdout.write(f"Results written to {output}")
+        if baseline is not None:
+            self._compare(baseline, result, opts["threshold"])
+
+    # --- Running ---
+
+    def _bench(self, opts) -> dict:
+        test_settings = connection.settings_dict.setdefault("TEST", {})
+        old_test_name = test_settings.get("NAME")
+        with tempfile.TemporaryDirectory() as tmp:
+            # A database file rather than the in-memory default, like production
+            test_settings["NAME"] = os.path.join(tmp, "bench.db")
+            setup_test_environment()
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            try:
+                with override_settings(
+                    REPORT_CACHE_DIR=os.path.join(tmp, "reports"),
+                    PROFILE_DIR=os.path.join(tmp, "profiles"),
+                    CACHES={"default": {
+                        "BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "bench-views",
+                    }},
+                    SESSION_ENGINE="app1.session_backends.db",
+                ):
+                    with _quiet_request_logs():
+                        return self._run(opts)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                teardown_test_environment()
+                test_settings["NAME"] = old_test_name
+
+    def _run(self, opts) -> dict:
+        _create_unmanaged_tables()
+        start = time.perf_counter()
+        data = _seed(opts)
+        self.stdout.write(f"Seeded in {time.perf_counter() - start:.1f} s")
+
+        rounds = opts["warmup"] + opts["iterations"] + opts["memory_iterations"]
+        cases = _cases(data, rounds)
+        unknown = set(opts["case"] or []) - set(cases)
+        if unknown:
+            raise CommandError(f"Unknown case(s): {', '.join(sorted(unknown))}; choose from {', '.join(cases)}")
+
+        client = Client()
+        client.login(username="bench_admin", password=PASSWORD)
+        results = {}
+        for name, make in cases.items():
+            if opts["case"] and name not in opts["case"]:
+                continue
+            n = 0
+            for _ in range(opts["warmup"]):
+                _request(make, client, n)
+                n += 1
+            timings, queries, statuses = [], [], set()
+            for _ in range(opts["iterations"]):
+                ms, count, status = _request(make, client, n)
+                n += 1
+                timings.append(ms)
+                queries.append(count)
+                statuses.add(status)
+
+            peak = 0
+            tracemalloc.start()
+            try:
+                for _ in range(opts["memory_iterations"]):
+                    tracemalloc.reset_peak()
+                    _request(make, client, n)
+                    n += 1
+                    peak = max(peak, tracemalloc.get_traced_memory()[1])
+            finally:
+                tracemalloc.stop()
+
+            results[name] = {
+                "p50_ms": round(statistics.median(timings), 3),
+                "p95_ms": round(_percentile(timings, 95), 3),
+                "p99_ms": round(_percentile(timings, 99), 3),
+                "mean_ms": round(statistics.fmean(timings), 3),
+                "queries": max(queries),
+                "peak_kib": round(peak / 1024, 1),
+                "status": sorted(statuses),
+            }
+            line = (
+                f"{name:<28} p50={results[name]['p50_ms']:8.2f} ms p95={results[name]['p95_ms']:8.2f} ms "
+                f"p99={results[name]['p99_ms']:8.2f} ms queries={max(queries):<4} "
+                f"peak={results[name]['peak_kib']:9.1f} KiB"
+            )
+            bad = [s for s in statuses if s >= 300]
+            self.stdout.write(self.style.ERROR(f"{line} status={bad}") if bad else line)
+
+        return {
+            "created": timezone.now().isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "scale": {key: opts[key] for key in (
+                "metrics", "interventions", "effects", "dependencies", "selections", "users", "seed",
+            )},
+            "iterations": opts["iterations"],
+            "results": results,
+        }
+
+    # --- Comparing ---
+
+    def _load(self, path) -> dict:
+        try:
+            with open(path) as fh:
+                return json.load(fh)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Can't read {path}: {exc}")
+
+    def _compare(self, base: dict, new: dict, threshold: float) -> None:
+        if base.get("scale") != new.get("scale"):
+            self.stdout.write(self.style.WARNING(f"Scales differ: {base.get('scale')} vs {new.get('scale')}"))
+        regressions = 0
+        for name, after in new["results"].items():
+            before = base["results"].get(name)
+            if before is None:
+                self.stdout.write(f"{name:<28} (new case)")
+                continue
+            change = (after["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100 if before["p95_ms"] else 0.0
+            slower = change > threshold and after["p95_ms"] - before["p95_ms"] >= MIN_REGRESSION_MS
+            more_queries = after["queries"] > before["queries"]
+            line = (
+                f"{name:<28} p95 {before['p95_ms']:8.2f} -> {after['p95_ms']:8.2f} ms ({change:+6.1f}%)  "
+                f"queries {before['queries']} -> {after['queries']}  "
+                f"peak {before['peak_kib']:.0f} -> {after['peak_kib']:.0f} KiB"
+            )
+            if slower or more_queries:
+                regressions += 1
+                self.stdout.write(self.style.ERROR(f"{line}  REGRESSION"))
+            else:
+                self.stdout.write(line)
+        if regressions:
+            raise CommandError(f"{regressions} case(s) regressed against the baseline")
+        self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
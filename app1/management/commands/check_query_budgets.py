@@ -0,0 +1,158 @@
+"""
+Exercise every budgeted URL and fail if any runs more queries than its
+budget (QUERY_BUDGETS in app1/urls.py):
+
+    python manage.py check_query_budgets
+
+The same requests also run as a test (app1/tests.py).
+
+Runs on a throwaway test database (migrated, plus the unmanaged tables,
+and seeded with a small catalogue, an admin and a few projects), each request from a fresh
+logged-in session so session and role loading count against the budget.
+Version counters are re-read on every request (VERSION_POLL_SECONDS=0),
+so requests are counted as if no counter were memoised. Report artifacts
+and profiles go to a temporary directory.
+"""
+import json
+import tempfile
+from decimal import Decimal
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import get_resolver, reverse
+
+from app1 import querylog
+from app1.models import Interventions, Metrics, ReportJob, UserProfile
+
+PASSWORD = "budget-check"
+
+
+def _create_unmanaged_tables():
+    """Tables managed outside migrations (managed = False) are built from the model."""
+    existing = set(connection.introspection.table_names())
+    with connection.schema_editor() as editor:
+        for model in apps.get_app_config("app1").get_models():
+            if model._meta.managed:
+                continue
+            if model._meta.db_table in existing:
+                editor.delete_model(model)
+            editor.create_model(model)
+
+
+def _seed():
+    admin = User.objects.create_user("budget_admin", "budget_admin@example.com", PASSWORD)
+    UserProfile.objects.create(user=admin, user_type="admin")
+    themes = ["Operating Carbon", "Water Use", "Circular Potentials", "Health and Wellbeing"]
+    for n in range(1, 41):
+        Interventions.objects.create(
+            name=f"Intervention {n}", theme=themes[n % len(themes)], description=f"Solar option {n}",
+            cost_level=n % 5 + 1, intervention_rating=n % 10 + 1,
+        )
+    projects = [
+        Metrics.objects.create(
+            user=admin, project_code=f"QB{n:03d}", project_name=f"Budget project {n}",
+            location="Brisbane", building_type="Office", total_budget_aud=Decimal("250000"),
+        )
+        for n in range(1, 6)
+    ]
+    job = ReportJob.objects.create(project=projects[0], report_format="html", requested_by=admin)
+    return projects[0], list(Interventions.objects.values_list("id", flat=True)[:5]), job
+
+
+def _checks(project, ids, job):
+    """(url name, method, path args, data) for every budgeted URL."""
+    id_list = ",".join(map(str, ids))
+    as_json = lambda data: {"data": json.dumps(data), "content_type": "application/json"}  # noqa: E731
+    return [
+        ("home", "get", [], {}),
+        ("dashboard", "get", [], {}),
+        ("login", "get", [], {}),
+        ("register", "get", [], {}),
+        ("projects", "get", [], {"q": "budget"}),
+        ("projects_view", "get", [], {}),
+        ("create_project", "get", [], {}),
+        ("create_project", "post", [], {"data": {"project_name": "Budget new", "location": "Bris"}}),
+        ("project_detail", "get", [project.id], {}),
+        ("project_detail", "post", [project.id], {"data": {"gifa_m2": "1000"}}),
+        ("metrics_edit", "get", [project.id], {}),
+        ("metrics_edit", "post", [project.id], {"data": {"project_name": "Budget edited"}}),
+        ("calculator", "get", [], {}),
+        ("calculator_results", "get", [], {}),
+        ("carbon", "get", [], {}),
+        ("carbon_2", "get", [], {}),
+        ("projects_api", "get", [], {}),
+        ("projects_search_api", "get", [], {"data": {"q": "budget"}}),
+        ("intervention_selection_list_api", "get", [project.id], {}),
+        ("intervention_selection_save_api", "post", [project.id], as_json({"selected_ids": ids})),
+        ("intervention_optimise_api", "post", [project.id], as_json({"budget": 100000})),
+        ("interventions_api", "get", [], {}),
+        ("save_metrics", "post", [], as_json({"metrics_id": project.id, "global_budget": "300000"})),
+        ("get_intervention_effects", "get", [], {"data": {"source": "Intervention 1"}}),
+        ("intervention_effects_batch_api", "get", [], {"data": {"ids": id_list}}),
+        ("intervention_ratings_api", "get", [], {"data": {"ids": id_list}}),
+        ("intervention_search_api", "get", [], {"data": {"q": "sol"}}),
+        ("settings", "get", [], {}),
+        ("reports", "get", [], {}),
+        ("generate_report", "get", [project.id], {}),
+        ("report_job_submit_api", "post", [project.id], {"data": {"format": "html"}}),
+        ("report_job_status_api", "get", [job.id], {}),
+        ("report_job_download", "get", [job.id], {}),
+        ("admin_dashboard", "get", [], {}),
+        ("admin_users_api", "get", [], {}),
+        ("admin_profiles", "get", [], {}),
+        ("admin_profile_file", "get", ["20260101T000000-00000000", "collapsed"], {}),
+        ("metrics", "get", [], {}),
+    ]
+
+
+class Command(BaseCommand):
+    help = "Fail if any URL runs more queries than its budget in QUERY_BUDGETS."
+
+    def handle(self, *args, **opts):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            with tempfile.TemporaryDirectory() as tmp, override_settings(
+                REPORT_CACHE_DIR=tmp, PROFILE_DIR=tmp, VERSION_POLL_SECONDS=0,
+            ):
+                failures = self._run()
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        if failures:
+            raise CommandError(f"{failures} request(s) over their query budget")
+        self.stdout.write(self.style.SUCCESS("All checked URLs are within their query budgets."))
+
+    def _run(self) -> int:
+        _create_unmanaged_tables()
+        checks = _checks(*_seed())
+        failures = 0
+        for url_name, method, args, kwargs in checks:
+            client = Client()
+            client.login(username="budget_admin", password=PASSWORD)
+            url = reverse(url_name, args=args)
+            try:
+                with querylog.query_budget(url_name) as stats:
+                    response = getattr(client, method)(url, **kwargs)
+                    if hasattr(response, "streaming_content"):
+                        b"".join(response.streaming_content)
+            except querylog.QueryBudgetExceeded as exc:
+                failures += 1
+                self.stdout.write(self.style.ERROR(f"FAIL {method.upper():4} {url}  {exc}"))
+                continue
+            self.stdout.write(
+                f"ok   {method.upper():4} {url:<45} {response.status_code}  "
+                f"{stats.count:>2}/{querylog.budget_for(url_name)} queries"
+            )
+
+        covered = {name for name, *_ in checks}
+        named = {name for name in get_resolver().reverse_dict if isinstance(name, str)}
+        for name in sorted(named - covered):
+            budget = querylog.budget_for(name)
+            label = "not exercised" if budget is not None else "no budget declared"
+            self.stdout.write(self.style.WARNING(f"skip {name}: {label}"))
+        return failures
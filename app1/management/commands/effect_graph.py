@@ -0,0 +1,25 @@
+"""
+Summarise the intervention effect graph and list effect rows whose source
+or target names don't match any intervention:
+
+    python manage.py effect_graph
+"""
+from django.core.management.base import BaseCommand
+
+from app1.effect_graph import EffectGraph
+
+
+class Command(BaseCommand):
+    help = "Show effect graph size and unresolved intervention names."
+
+    def handle(self, *args, **opts):
+        graph = EffectGraph.load()
+        self.stdout.write(f"{len(graph.ids)} interventions, {len(graph)} resolved edges")
+
+        for label, names in (
+            ("Unresolved source names", graph.unresolved_sources),
+            ("Unresolved target names", graph.unresolved_targets),
+        ):
+            self.stdout.write(f"{label}: {len(names)}")
+            for name in names:
+                self.stdout.write(f"  - {name}")
@@ -0,0 +1,28 @@
+"""
+Switch the project database to SQLite's WAL journal mode:
+
+    python manage.py enable_wal
+
+The journal mode is persistent, so this runs once per database (a fresh
+or restored database file starts in rollback-journal mode) rather than
+from the per-connection pragmas in settings.DATABASES. It is a deploy
+step (see readme.md): don't run it on the sdt_app.db checked into the
+repository, whose writes would then sit in the ignored -wal file.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from app1 import sqlite
+
+
+class Command(BaseCommand):
+    help = "Put the SQLite database in WAL journal mode."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **opts):
+        mode = sqlite.enable_wal(opts["database"])
+        if mode.lower() != "wal":
+            raise CommandError(f"Journal mode is still {mode}")
+        self.stdout.write(self.style.SUCCESS("Journal mode: wal"))
@@ -0,0 +1,19 @@
+"""
+Recompute the dashboard rollup tables from Metrics and Interventions:
+
+    python manage.py rebuild_rollups
+
+Only needed after writes that bypass model signals (bulk_create,
+QuerySet.update, raw SQL or restoring a database dump).
+"""
+from django.core.management.base import BaseCommand
+
+from app1 import rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild ProjectRollup and ThemeRollup from scratch."
+
+    def handle(self, *args, **opts):
+        months, themes = rollups.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {months} month bucket(s) and {themes} theme row(s)."))
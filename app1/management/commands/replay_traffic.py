@@ -0,0 +1,417 @@
+"""
+Drive the app over HTTP with concurrent simulated users:
+
+    python manage.py replay_traffic --users 16 --sessions 3
+    python manage.py replay_traffic --log logs/requests.jsonl --users 16 --speed 1
+    python manage.py replay_traffic --url http://127.0.0.1:8000 --metrics-token "$SDT_METRICS_TOKEN"
+
+Each user is a thread with its own cookie jar. It registers a fresh
+account, then either walks the scripted journey --sessions times (create
+project -> save_metrics -> calculator -> selection save -> HTML and Word
+report), or replays recorded sessions from --log (see app1/traffic.py).
+Login/register/admin requests in a recording are skipped. Recorded project
+ids are mapped onto the projects the replay creates. --speed scales the
+recorded think time (0 = back to back).
+
+Without --url the app is served in-process by a threaded WSGI server on a
+throwaway, migrated copy of the project database, so nothing real is
+touched (client and server then share one interpreter; use --url against
+a separate server for cleaner numbers). With --url the target database
+*is* written to: point it at a scratch copy.
+
+Reports throughput, error rates and per-step latency. SQLite lock
+contention (busy retries and give-ups) is the change in
+app1_sqlite_busy_total on /metrics over the run, which needs the server's
+METRICS_TOKEN.
+"""
+import json
+import logging
+import os
+import queue
+import random
+import re
+import secrets
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+from datetime import datetime
+from http.cookiejar import CookieJar
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler, get_internal_wsgi_application
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import override_settings
+from django.urls import Resolver404, resolve, reverse
+
+from app1 import sqlite, traffic
+
+# Recorded requests that don't make sense for a replay account
+SKIPPED_URL_NAMES = {"login", "logout", "register", "metrics", "settings"}
+SKIPPED_PREFIX = "admin_"
+ID_PARAMS = ("metrics_id", "project_id")
+MAX_THINK = 5.0  # seconds; longer recorded pauses are cut to this
+BUSY_SAMPLE = re.compile(r'^app1_sqlite_busy_total\{outcome="(\w+)"\} ([0-9.e+]+)$', re.M)
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Report redirects as responses, so each call is exactly one request."""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = []  # (step, ms, status or None)
+
+    def add(self, step, ms, status):
+        with self.lock:
+            self.samples.append((step, ms, status))
+
+
+class SimUser:
+    """One simulated browser: cookie jar, CSRF token and timed requests."""
+
+    def __init__(self, base_url: str, results: Results, timeout: float):
+        self.base_url = base_url.rstrip("/")
+        self.results = results
+        self.timeout = timeout
+        self.cookies = CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies), _NoRedirect())
+
+    def _csrf_token(self) -> str:
+        return next((c.value for c in self.cookies if c.name == settings.CSRF_COOKIE_NAME), "")
+
+    def request(self, step, method, path, params=None, form=None, json_body=None, record=True):
+        """(status, body); status is None when the server couldn't be reached."""
+        url = self.base_url + path + ("?" + urlencode(params, doseq=True) if params else "")
+        headers, data = {}, None
+        if json_body is not None:
+            data = json.dumps(json_body).encode()
+            headers["Content-Type"] = "application/json"
+        elif form is not None:
+            data = urlencode(form, doseq=True).encode()
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        if method == "POST":
+            headers["X-CSRFToken"] = self._csrf_token()
+        req = urllib.request.Request(url, data=data, headers=headers, method=method)
+
+        start = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=self.timeout) as response:
+                status, body = response.status, response.read()
+        except urllib.error.HTTPError as exc:
+            status, body = exc.code, exc.read()
+        except OSError:
+            status, body = None, b""
+        if record:
+            self.results.add(step, (time.perf_counter() - start) * 1000, status)
+        return status, body
+
+    def get(self, step, path, **kwargs):
+        return self.request(step, "GET", path, **kwargs)
+
+    def post(self, step, path, **kwargs):
+        return self.request(step, "POST", path, **kwargs)
+
+    def register(self, username: str) -> bool:
+        self.get("register", reverse("register"))  # sets the CSRF cookie
+        password = secrets.token_urlsafe(12)
+        status, _ = self.post("register", reverse("register"), form={
+            "username": username, "email": f"{username}@example.com", "password1": password, "password2": password,
+        })
+        return status == 302 and any(c.name == settings.SESSION_COOKIE_NAME for c in self.cookies)
+
+    def json(self, step, method, path, **kwargs):
+        status, body = self.request(step, method, path, **kwargs)
+        try:
+            return json.loads(body) if status == 200 else None
+        except ValueError:
+            return None
+
+
+# =========================
+# Sessions
+# =========================
+
+def scripted_session(user: SimUser, rng: random.Random, catalogue: list, label: str) -> None:
+    """create project -> save_metrics -> calculator -> selection save -> reports"""
+    user.get("create_project", reverse("create_project"))
+    user.post("create_project", reverse("create_project"), form={
+        "project_name": f"Replay {label}", "location": rng.choice(["Brisbane", "Sydney", "Perth"]),
+        "project_type": rng.choice(["Office", "Residential", "School"]),
+    })
+    saved = user.json("save_metrics", "POST", reverse("save_metrics"), json_body={
+        "gifa_m2": rng.randint(500, 40000), "roof_area_m2": rng.randint(100, 5000),
+        "num_apartments": rng.randint(0, 200), "global_budget": rng.randint(50, 2000) * 1000,
+    })
+    if not saved or not saved.get("metrics_id"):
+        return
+    project_id = saved["metrics_id"]
+    selected = rng.sample(catalogue, min(len(catalogue), rng.randint(3, 8)))
+
+    user.get("calculator", reverse("calculator"))
+    user.post("calculator", reverse("calculator"), form={"metrics_id": project_id, "selected_ids": selected})
+    user.post(
+        "intervention_selection_save_api", reverse("intervention_selection_save_api", args=[project_id]),
+        json_body={"selected_ids": selected},
+    )
+    user.get("generate_report", reverse("generate_report", args=[project_id]))
+    user.get("generate_report:word", reverse("generate_report", args=[project_id]), params={"download": "word"})
+
+
+def _map_ids(value, id_map):
+    if isinstance(value, list):
+        return [_map_ids(v, id_map) for v in value]
+    try:
+        return str(id_map.get(int(value), value)) if isinstance(value, str) else id_map.get(value, value)
+    except (TypeError, ValueError):
+        return value
+
+
+def _rewrite_path(path: str, id_map: dict) -> str:
+    """Map the project id kwargs of a recorded path; other ids (report jobs, ...) are kept."""
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return path
+    if not any(name in ID_PARAMS for name in match.kwargs):
+        return path
+    kwargs = {k: _map_ids(v, id_map) if k in ID_PARAMS else v for k, v in match.kwargs.items()}
+    return reverse(match.view_name, args=match.args, kwargs=kwargs)
+
+
+def _rewrite(record: dict, id_map: dict):
+    path = _rewrite_path(record["path"], id_map)
+    params = {k: _map_ids(v, id_map) if k in ID_PARAMS else v for k, v in record.get("query", {}).items()}
+    form = {k: _map_ids(v, id_map) if k in ID_PARAMS else v for k, v in record.get("form", {}).items()}
+    body = record.get("json")
+    if isinstance(body, dict):
+        body = {k: _map_ids(v, id_map) if k in ID_PARAMS else v for k, v in body.items()}
+    return path, params, form, body
+
+
+def recorded_session(user: SimUser, records: list, speed: float) -> None:
+    """Replay one recorded session, mapping its project ids onto the ones this replay creates."""
+    id_map = {}
+    previous = None
+    for record in records:
+        name = record.get("url_name")
+        if not name or name in SKIPPED_URL_NAMES or name.startswith(SKIPPED_PREFIX):
+            continue
+        if isinstance(record.get("json"), dict) and "_omitted" in record["json"]:
+            continue
+        ts = datetime.fromisoformat(record["ts"]).timestamp()
+        if speed and previous is not None:
+            time.sleep(min(MAX_THINK, max(0.0, ts - previous) * speed))
+        previous = ts
+
+        path, params, form, body = _rewrite(record, id_map)
+        status, response = user.request(
+            name, record["method"], path, params=params or None,
+            form=form if record["method"] == "POST" and body is None else None, json_body=body,
+        )
+        recorded_id = record.get("metrics_id")
+        if recorded_id and recorded_id not in id_map and name in ("create_project", "save_metrics"):
+            # Learn which project this replay made current
+            current = user.json("projects_api", "GET", reverse("projects_api"), params={"page_size": 1}, record=False)
+            if current and current.get("items"):
+                id_map[recorded_id] = current["items"][0]["id"]
+
+
+# =========================
+# Command
+# =========================
+
+@contextmanager
+def _quiet_server_logs():
+    """The in-process server's slow-request console log would drown the report."""
+    loggers = [logging.getLogger(name) for name in ("app1.slow_requests", "django.request")]
+    levels = [logger.level for logger in loggers]
+    for logger in loggers:
+        logger.setLevel(logging.CRITICAL)
+    try:
+        yield
+    finally:
+        for logger, level in zip(loggers, levels):
+            logger.setLevel(level)
+
+
+class Command(BaseCommand):
+    help = "Replay scripted or recorded traffic with concurrent simulated users."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", help="Base URL of a running server (default: serve a throwaway copy in-process)")
+        parser.add_argument("--log", help="Recorded requests (JSONL from RequestRecorderMiddleware)")
+        parser.add_argument("--users", type=int, default=8, help="Concurrent simulated users")
+        parser.add_argument("--sessions", type=int, default=3, help="Scripted journeys per user")
+        parser.add_argument("--loops", type=int, default=1, help="Times to replay the recorded sessions")
+        parser.add_argument("--speed", type=float, default=0.0, help="Recorded think time multiplier (0 = none)")
+        parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout, seconds")
+        parser.add_argument("--metrics-token", default=os.environ.get("SDT_METRICS_TOKEN", ""))
+        parser.add_argument("--seed", type=int, default=398)
+
+    def handle(self, *args, **opts):
+        recorded = None
+        if opts["log"]:
+            try:
+                recorded = traffic.load_sessions(opts["log"])
+            except OSError as exc:
+                raise CommandError(f"Can't read {opts['log']}: {exc}")
+            if not recorded:
+                raise CommandError(f"No recorded sessions in {opts['log']}")
+            self.stdout.write(f"Loaded {len(recorded)} recorded session(s)")
+
+        if opts["url"]:
+            self._run(opts["url"], opts["metrics_token"], recorded, opts)
+            return
+        with tempfile.TemporaryDirectory() as tmp:
+            self._serve_and_run(tmp, recorded, opts)
+
+    def _serve_and_run(self, tmp, recorded, opts):
+        db_settings = connections.settings[DEFAULT_DB_ALIAS]
+        source = db_settings["NAME"]
+        copy = os.path.join(tmp, "replay.db")
+        with sqlite3.connect(source) as src, sqlite3.connect(copy) as dst:
+            src.backup(dst)
+        connections[DEFAULT_DB_ALIAS].close()
+        db_settings["NAME"] = copy
+        token = secrets.token_hex(16)
+        try:
+            call_command("migrate", verbosity=0)
+            sqlite.enable_wal()
+            with override_settings(
+                METRICS_TOKEN=token,
+                REPORT_CACHE_DIR=os.path.join(tmp, "reports"),
+                PROFILE_DIR=os.path.join(tmp, "profiles"),
+            ):
+                server = ThreadedWSGIServer(("127.0.0.1", 0), _QuietHandler)
+                server.set_app(get_internal_wsgi_application())  # sets logging up again
+                thread = threading.Thread(target=server.serve_forever, daemon=True)
+                thread.start()
+                try:
+                    host, port = server.server_address[:2]
+                    with _quiet_server_logs():
+                        self._run(f"http://{host}:{port}", token, recorded, opts)
+                finally:
+                    server.shutdown()
+                    server.server_close()
+        finally:
+            connections.close_all()
+            db_settings["NAME"] = source
+
+    def _busy_counts(self, base_url, token):
+        """{"retry": n, "gave_up": n} from /metrics, or None without access."""
+        if not token:
+            return None
+        req = urllib.request.Request(base_url.rstrip("/") + reverse("metrics"), headers={"Authorization": f"Bearer {token}"})
+        try:
+            with urllib.request.urlopen(req, timeout=10) as response:
+                text = response.read().decode()
+        except OSError:
+            return None
+        counts = {"retry": 0.0, "gave_up": 0.0}
+        for outcome, value in BUSY_SAMPLE.findall(text):
+            counts[outcome] = float(value)
+        return counts
+
+    def _run(self, base_url, token, recorded, opts):
+        results = Results()
+        run_id = secrets.token_hex(3)
+        work = queue.Queue()
+        if recorded is None:
+            for user in range(opts["users"]):
+                for n in range(opts["sessions"]):
+                    work.put(f"{run_id}-{user}-{n}")
+        else:
+            for _ in range(opts["loops"]):
+                for records in recorded:
+                    work.put(records)
+        failed_logins = []
+
+        def simulate(n):
+            user = SimUser(base_url, results, opts["timeout"])
+            if not user.register(f"replay_{run_id}_{n}"):
+                failed_logins.append(n)
+                return
+            rng = random.Random(opts["seed"] + n)
+            catalogue = []
+            if recorded is None:
+                data = user.json("interventions_api", "GET", reverse("interventions_api"))
+                catalogue = [int(item["id"]) for item in (data or {}).get("items", [])]
+            while True:
+                try:
+                    item = work.get_nowait()
+                except queue.Empty:
+                    return
+                if recorded is None:
+                    scripted_session(user, rng, catalogue, item)
+                else:
+                    recorded_session(user, item, opts["speed"])
+
+        busy_before = self._busy_counts(base_url, token)
+        threads = [threading.Thread(target=simulate, args=(n,)) for n in range(opts["users"])]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        busy_after = self._busy_counts(base_url, token)
+
+        if failed_logins:
+            self.stdout.write(self.style.ERROR(f"{len(failed_logins)} user(s) could not register/sign in"))
+        self._report(results.samples, elapsed, opts["users"], busy_before, busy_after)
+
+    def _report(self, samples, elapsed, users, busy_before, busy_after):
+        if not samples:
+            raise CommandError("No requests were made")
+        server_errors = sum(1 for _, _, status in samples if status is not None and status >= 500)
+        client_errors = sum(1 for _, _, status in samples if status is not None and 400 <= status < 500)
+        unreachable = sum(1 for _, _, status in samples if status is None)
+        redirects = sum(1 for _, _, status in samples if status is not None and 300 <= status < 400)
+        total = len(samples)
+        self.stdout.write(
+            f"{total} requests from {users} users in {elapsed:.1f} s: {total / elapsed:.1f} req/s, "
+            f"errors {server_errors + client_errors + unreachable} ({(server_errors + client_errors + unreachable) / total:.1%}): "
+            f"{server_errors} 5xx, {client_errors} 4xx, {unreachable} unreachable; {redirects} redirects"
+        )
+        if busy_before is not None and busy_after is not None:
+            retries = busy_after["retry"] - busy_before["retry"]
+            gave_up = busy_after["gave_up"] - busy_before["gave_up"]
+            line = f"SQLite lock contention: {retries:.0f} busy retries, {gave_up:.0f} gave up"
+            self.stdout.write(self.style.ERROR(line) if gave_up else line)
+        else:
+            self.stdout.write(self.style.WARNING("SQLite lock contention: n/a (/metrics not readable; pass --metrics-token)"))
+
+        by_step = {}
+        for step, ms, status in samples:
+            by_step.setdefault(step, []).append((ms, status))
+        self.stdout.write(f"{'step':<34} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        for step, rows in sorted(by_step.items()):
+            timings = [ms for ms, _ in rows]
+            errors = sum(1 for _, status in rows if status is None or status >= 400)
+            line = (
+                f"{step:<34} {len(rows):>6} {statistics.median(timings):>9.1f} "
+                f"{_percentile(timings, 95):>9.1f} {_percentile(timings, 99):>9.1f} {errors:>7}"
+            )
+            self.stdout.write(self.style.ERROR(line) if errors else line)
@@ -0,0 +1,34 @@
+"""
+Render queued report jobs:
+
+    python manage.py run_report_worker            # poll forever
+    python manage.py run_report_worker --once     # drain the queue and exit
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from app1 import report_jobs
+
+
+class Command(BaseCommand):
+    help = "Process queued ReportJob rows and write their artifacts to the report cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Exit when the queue is empty.")
+        parser.add_argument("--poll", type=float, default=2.0, help="Seconds between queue checks.")
+        parser.add_argument("--max-jobs", type=int, default=None, help="Exit after this many jobs.")
+
+    def handle(self, *args, **opts):
+        processed = 0
+        while True:
+            close_old_connections()
+            remaining = None if opts["max_jobs"] is None else opts["max_jobs"] - processed
+            n = report_jobs.run_pending(limit=remaining)
+            processed += n
+            if n:
+                self.stdout.write(f"Processed {n} report job(s)")
+            if opts["once"] or (opts["max_jobs"] is not None and processed >= opts["max_jobs"]):
+                break
+            time.sleep(opts["poll"])
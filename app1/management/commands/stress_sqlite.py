@@ -0,0 +1,156 @@
+"""
+Concurrency stress test for the SQLite connection profile.
+
+Worker threads run save_metrics-shaped write transactions (read the
+project row, update it, insert a selection row) against a throwaway
+database file, once with Django's stock SQLite settings and once with the
+production profile (WAL, as set by `enable_wal`, plus settings.DATABASES:
+pragmas, IMMEDIATE transactions, persistent connections) and
+`retry_on_busy`:
+
+    python manage.py stress_sqlite --threads 16 --writes 200
+
+The project database is never touched.
+"""
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+
+from app1 import sqlite
+
+ALIAS = "stress"
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class Command(BaseCommand):
+    help = "Stress concurrent SQLite writes with the stock and production connection profiles."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--writes", type=int, default=200, help="Write transactions per thread")
+        parser.add_argument("--readers", type=int, default=4, help="Extra threads running read queries")
+        parser.add_argument("--projects", type=int, default=20, help="Rows the writers contend on")
+
+    def handle(self, *args, **opts):
+        profiles = {
+            "stock": ({"OPTIONS": {}, "CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": False}, False),
+            "production": ({
+                "OPTIONS": dict(settings.DATABASES["default"].get("OPTIONS", {})),
+                "CONN_MAX_AGE": settings.DATABASES["default"].get("CONN_MAX_AGE", 0),
+                "CONN_HEALTH_CHECKS": settings.DATABASES["default"].get("CONN_HEALTH_CHECKS", False),
+            }, True),
+        }
+        for name, (profile, production) in profiles.items():
+            with tempfile.TemporaryDirectory() as tmp:
+                result = self._run(os.path.join(tmp, "stress.db"), profile, production, opts)
+            timings = result["timings"] or [0.0]
+            self.stdout.write(
+                f"{name:<10} journal={result['journal']:<8} committed={len(result['timings']):<6} "
+                f"locked={result['locked']:<5} retries={result['retries']:<5} reads={result['reads']:<7} "
+                f"p50={statistics.median(timings):7.2f} ms p99={_percentile(timings, 99):8.2f} ms "
+                f"{len(result['timings']) / result['elapsed']:7.0f} writes/s"
+            )
+
+    def _configure(self, path, profile):
+        connections.settings[ALIAS] = connections.configure_settings({
+            DEFAULT_DB_ALIAS: {},
+            ALIAS: {"ENGINE": "django.db.backends.sqlite3", "NAME": path, **profile},
+        })[ALIAS]
+        # Drop any connection this thread cached for the previous profile
+        if hasattr(connections._connections, ALIAS):
+            delattr(connections._connections, ALIAS)
+
+    def _run(self, path, profile, production, opts):
+        self._configure(path, profile)
+        conn = connections[ALIAS]
+        if production:
+            sqlite.enable_wal(ALIAS)
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "CREATE TABLE project (id INTEGER PRIMARY KEY, total_budget_aud decimal, updated_at real)"
+            )
+            cursor.execute(
+                "CREATE TABLE selection (id INTEGER PRIMARY KEY, project_id integer, intervention_id integer)"
+            )
+            cursor.executemany(
+                "INSERT INTO project VALUES (%s, 0, 0)", [(n,) for n in range(1, opts["projects"] + 1)]
+            )
+            cursor.execute("PRAGMA journal_mode")
+            journal = cursor.fetchone()[0]
+        conn.close()
+
+        retries_before = sqlite.stats["retries"]
+        lock = threading.Lock()
+        result = {"timings": [], "locked": 0, "reads": 0, "journal": journal}
+        stop = threading.Event()
+        barrier = threading.Barrier(opts["threads"] + opts["readers"] + 1)
+
+        def save(project_id, n):
+            with connections[ALIAS].cursor() as cursor:
+                cursor.execute("SELECT total_budget_aud FROM project WHERE id = %s", [project_id])
+                budget = cursor.fetchone()[0]
+                cursor.execute(
+                    "UPDATE project SET total_budget_aud = %s, updated_at = %s WHERE id = %s",
+                    [budget + 1, time.time(), project_id],
+                )
+                cursor.execute("INSERT INTO selection (project_id, intervention_id) VALUES (%s, %s)", [project_id, n])
+
+        def writer(worker):
+            write = sqlite.retry_on_busy(save, using=ALIAS) if production else transaction.atomic(using=ALIAS)(save)
+            timings, locked = [], 0
+            barrier.wait()
+            try:
+                for n in range(opts["writes"]):
+                    start = time.perf_counter()
+                    try:
+                        write((worker + n) % opts["projects"] + 1, n)
+                    except OperationalError as exc:
+                        if not sqlite.is_busy_error(exc):
+                            raise
+                        locked += 1
+                        continue
+                    timings.append((time.perf_counter() - start) * 1000)
+            finally:
+                connections[ALIAS].close()
+            with lock:
+                result["timings"].extend(timings)
+                result["locked"] += locked
+
+        def reader():
+            reads = 0
+            barrier.wait()
+            try:
+                while not stop.is_set():
+                    with connections[ALIAS].cursor() as cursor:
+                        cursor.execute("SELECT COUNT(*), SUM(total_budget_aud) FROM project")
+                        cursor.fetchone()
+                    reads += 1
+            finally:
+                connections[ALIAS].close()
+            with lock:
+                result["reads"] += reads
+
+        writers = [threading.Thread(target=writer, args=(w,)) for w in range(opts["threads"])]
+        readers = [threading.Thread(target=reader) for _ in range(opts["readers"])]
+        for thread in writers + readers:
+            thread.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in writers:
+            thread.join()
+        result["elapsed"] = time.perf_counter() - start
+        stop.set()
+        for thread in readers:
+            thread.join()
+        result["retries"] = sqlite.stats["retries"] - retries_before
+        return result
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-17 03:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0021_reportjob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reportjob',
+            name='report_format',
+            field=models.CharField(choices=[('word', 'Word'), ('html', 'HTML'), ('pdf', 'PDF')], max_length=10),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.7 on 2026-10-17 03:31
+
+from django.db import migrations, models
+
+from app1 import rollups
+
+
+def backfill_rollups(apps, schema_editor):
+    rollups.rebuild(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0022_reportjob_pdf_format'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThemeRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('theme', models.CharField(max_length=255, null=True, unique=True)),
+                ('intervention_count', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.BigIntegerField(default=0)),
+                ('rating_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'ThemeRollup',
+            },
+        ),
+        migrations.CreateModel(
+            name='ProjectRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('month', models.IntegerField()),
+                ('project_count', models.PositiveIntegerField(default=0)),
+                ('budget_sum', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('budget_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'ProjectRollup',
+                'unique_together': {('year', 'month')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-17 03:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0023_dashboard_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='metrics',
+            index=models.Index(fields=['updated_at', 'id'], name='Metrics_updated_f12265_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='metrics',
+            index=models.Index(fields=['user', 'updated_at', 'id'], name='Metrics_user_id_479b8c_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Full-text search index over Metrics (SQLite FTS5); see app1/search.py
+
+from django.db import migrations
+
+from app1 import search
+
+
+def create_index(apps, schema_editor):
+    search.install(schema_editor.connection)
+
+
+def drop_index(apps, schema_editor):
+    search.uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0024_metrics_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -137,6 +137,9 @@ class Metrics(models.Model):
             models.Index(fields=["building_type"]),
             models.Index(fields=["project_code"]),
             models.Index(fields=["created_at"]),
+            # Keyset pagination of the project lists (see pagination.py)
+            models.Index(fields=["updated_at", "id"]),
+            models.Index(fields=["user", "updated_at", "id"]),
         ]
 
     @property
@@ -185,4 +188,92 @@ class UserProfile(models.Model):
     user_type = models.CharField(max_length=10, choices=USER_TYPES, default='user')
 
     def __str__(self):
-        return f"{self.user.username} ({self.user_type})"
\ No newline at end of file
+        return f"{self.user.username} ({self.user_type})"
+
+class ReportJob(models.Model):
+    """
+    A queued report rendering request, processed by `manage.py run_report_worker`.
+    The finished file lives in the report artifact cache (see reports.py).
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    FORMAT_CHOICES = [
+        ('word', 'Word'),
+        ('html', 'HTML'),
+        ('pdf', 'PDF'),
+    ]
+
+    project = models.ForeignKey("Metrics", on_delete=models.CASCADE, related_name="report_jobs")
+    report_format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    requested_by = models.ForeignKey('auth.User', null=True, blank=True, on_delete=models.SET_NULL)
+    artifact = models.CharField(max_length=500, blank=True, default="")  # Path of the finished file
+    error = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "ReportJob"
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+        ]
+
+    def __str__(self):
+        return f"ReportJob #{self.id} – project {self.project_id} ({self.report_format}, {self.status})"
+
+
+class ProjectRollup(models.Model):
+    """
+    Per-month project count and budget totals read by the dashboard.
+    Maintained by signals on Metrics; rebuild with `manage.py rebuild_rollups`.
+    """
+    year = models.IntegerField()
+    month = models.IntegerField()
+    project_count = models.PositiveIntegerField(default=0)
+    budget_sum = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    budget_count = models.PositiveIntegerField(default=0)  # Projects with a budget (for the average)
+
+    class Meta:
+        db_table = "ProjectRollup"
+        unique_together = ("year", "month")
+
+    def __str__(self):
+        return f"{self.year}-{self.month:02d}: {self.project_count} projects"
+
+
+class ThemeRollup(models.Model):
+    """
+    Per-theme intervention rating totals read by the dashboard.
+    Maintained by signals on Interventions; rebuild with `manage.py rebuild_rollups`.
+    """
+    theme = models.CharField(max_length=255, null=True, unique=True)
+    intervention_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.BigIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)  # Interventions with a rating (for the average)
+
+    class Meta:
+        db_table = "ThemeRollup"
+
+    def __str__(self):
+        return f"{self.theme}: {self.rating_count} ratings"
+
+
+class VersionCounter(models.Model):
+    """
+    A cache version counter (see versioning.py), used when the configured
+    cache is per process and can't share the counters between workers.
+    """
+    key = models.CharField(max_length=200, primary_key=True)
+    value = models.BigIntegerField()
+
+    class Meta:
+        db_table = "VersionCounter"
+
+    def __str__(self):
+        return f"{self.key} = {self.value}"
@@ -0,0 +1,292 @@
+# app1/optimizer.py
+"""
+Budget-constrained intervention selection.
+
+Given a project (Metrics row) the solver picks the set of interventions that
+maximises the class-target score within the project's budget:
+
+    score = sum over classes of min(class rating total, class target)
+            + TOTAL_WEIGHT * overall rating total
+
+where each selected intervention contributes its adjusted rating (base
+rating plus effects from the other selected interventions, clamped, plus
+the selected boost -- the same rules as ratings.py). Candidates failing the
+project's dependency thresholds are excluded, and at most one intervention
+per name family (staged variants) can be chosen, like the calculator page.
+
+The solver is in-process and anytime: a lazy greedy pass (best marginal
+gain per dollar) gives a first answer, then a ruin-and-recreate local
+search keeps improving it until the time budget runs out or
+MAX_STALE_ROUNDS rounds in a row find nothing better. `solve()` yields
+every improved solution, so callers can stream progress.
+"""
+import heapq
+import random
+import re
+import time
+from typing import Dict, Iterator, List, Optional
+
+from .catalogue import get_snapshot
+from .classes import DEFAULT_CLASS_TARGETS, class_key_for
+from .dependencies import get_index
+from .effect_graph import family_from_name
+from .models import ClassTargets, Metrics
+from .ratings import MAX_RATING, MIN_RATING, SELECTED_BOOST, effect_delta, get_engine
+
+TOTAL_WEIGHT = 0.01  # small pull towards higher ratings once class targets are met
+MAX_STALE_ROUNDS = 2000  # local search rounds without improvement before stopping (~0.4 s)
+RUIN_MAX = 3  # picks dropped per local search round
+
+# cost_level -> (min, max) AUD, used when cost_range is blank (mirrors the page)
+COST_LEVEL_RANGES = {
+    1: (0, 25000), 2: (0, 50000), 3: (25000, 50000), 4: (25000, 50000),
+    5: (50000, 100000), 6: (100000, 200000), 7: (200000, 500000),
+    8: (500000, 1000000), 9: (1000000, 2000000), 10: (2000000, 3000000),
+}
+
+_RANGE_RE = re.compile(r"(\d+(?:\.\d+)?)(k|m)?-(\d+(?:\.\d+)?)(k|m)?")
+_SINGLE_RE = re.compile(r"(\d+(?:\.\d+)?)(k|m)?")
+_UNITS = {"k": 1_000, "m": 1_000_000}
+
+
+def parse_cost(cost_range: Optional[str], cost_level: Optional[int]) -> float:
+    """
+    Mid-point AUD cost of an intervention ("100–200k AUD" -> 150000).
+    A bare lower bound borrows the upper bound's unit ("100–200k" is 100k–200k).
+    """
+    if not cost_range:
+        lo, hi = COST_LEVEL_RANGES.get(int(cost_level or 0), (0, 0))
+        return (lo + hi) / 2
+    clean = re.sub(r"[,\s]", "", cost_range.lower()).replace("–", "-").replace("—", "-")
+    m = _RANGE_RE.search(clean)
+    if m:
+        hi_unit = m.group(4) or ""
+        lo = float(m.group(1)) * _UNITS.get(m.group(2) or hi_unit, 1)
+        hi = float(m.group(3)) * _UNITS.get(hi_unit, 1)
+        return (lo + hi) / 2
+    m = _SINGLE_RE.search(clean)
+    return float(m.group(1)) * _UNITS.get(m.group(2) or "", 1) if m else 0.0
+
+
+def class_targets() -> Dict[str, float]:
+    """Target rating per UI class key (ClassTargets rows override the defaults)."""
+    targets = dict(DEFAULT_CLASS_TARGETS)
+    for name, target in ClassTargets.objects.values_list("class_name", "target_rating"):
+        key = name.strip().lower() if name.strip().lower() in targets else class_key_for(name)
+        if key:
+            targets[key] = float(target)
+    return targets
+
+
+class Problem:
+    """Candidates, costs and the effect edges between them, as dense lists."""
+
+    def __init__(self, candidates, costs, budget: float, targets: Dict[str, float]):
+        engine = get_engine()
+        graph = engine.graph
+        self.budget = budget
+        self.ids: List[int] = [i.id for i in candidates]
+        self.cost: List[float] = list(costs)
+        self.base: List[float] = [float(i.intervention_rating or 0) for i in candidates]
+
+        class_of = [class_key_for(i.class_name) or "" for i in candidates]
+        keys = sorted(set(class_of))
+        self.class_of: List[int] = [keys.index(k) for k in class_of]
+        self.class_keys = keys
+        self.target: List[Optional[float]] = [targets.get(k) or None for k in keys]
+
+        families: Dict[str, int] = {}
+        self.family: List[int] = [
+            families.setdefault(family_from_name(i.name), len(families)) for i in candidates
+        ]
+
+        # effect edges restricted to candidates: outgoing[i] = [(j, delta), ...]
+        local = {iid: n for n, iid in enumerate(self.ids)}
+        self.outgoing: List[List[tuple]] = [[] for _ in self.ids]
+        csr = graph.forward
+        for n, iid in enumerate(self.ids):
+            pos = graph.position.get(iid)
+            if pos is None:
+                continue
+            for at in csr.row(pos):
+                j = local.get(graph.ids[csr.columns[at]])
+                if j is not None and j != n:
+                    self.outgoing[n].append((j, effect_delta(self.base[j], csr.values[at])))
+
+
+class State:
+    """A selection with incrementally maintained ratings and score."""
+
+    def __init__(self, problem: Problem):
+        p = self.p = problem
+        self.selected = [False] * len(p.ids)
+        self.raw = list(p.base)
+        self.touched = [0] * len(p.ids)
+        self.class_sum = [0.0] * len(p.class_keys)
+        self.families = set()
+        self.cost = 0.0
+
+    def rating(self, j: int) -> float:
+        r = self.raw[j]
+        if self.touched[j]:
+            r = min(MAX_RATING, max(MIN_RATING, r))
+        return r * SELECTED_BOOST
+
+    def score(self) -> float:
+        total = 0.0
+        capped = 0.0
+        for c, value in enumerate(self.class_sum):
+            target = self.p.target[c]
+            capped += min(value, target) if target else value
+            total += value
+        return capped + TOTAL_WEIGHT * total
+
+    def _shift(self, i: int, sign: int) -> None:
+        p = self.p
+        for j, delta in p.outgoing[i]:
+            if self.selected[j]:
+                before = self.rating(j)
+            self.raw[j] += sign * delta
+            self.touched[j] += sign
+            if self.selected[j]:
+                self.class_sum[p.class_of[j]] += self.rating(j) - before
+
+    def add(self, i: int) -> None:
+        self.selected[i] = True
+        self.families.add(self.p.family[i])
+        self.cost += self.p.cost[i]
+        self.class_sum[self.p.class_of[i]] += self.rating(i)
+        self._shift(i, +1)
+
+    def remove(self, i: int) -> None:
+        self._shift(i, -1)
+        self.class_sum[self.p.class_of[i]] -= self.rating(i)
+        self.cost -= self.p.cost[i]
+        self.families.discard(self.p.family[i])
+        self.selected[i] = False
+
+    def fits(self, i: int) -> bool:
+        return (
+            not self.selected[i]
+            and self.p.family[i] not in self.families
+            and self.cost + self.p.cost[i] <= self.p.budget + 1e-9
+        )
+
+    def gain(self, i: int) -> float:
+        before = self.score()
+        self.add(i)
+        after = self.score()
+        self.remove(i)
+        return after - before
+
+    def chosen(self) -> List[int]:
+        return [n for n, on in enumerate(self.selected) if on]
+
+
+def _ratio(gain: float, cost: float) -> float:
+    return gain / cost if cost > 0 else gain * 1e12
+
+
+def _greedy_fill(state: State, rng: Optional[random.Random], deadline: float) -> None:
+    """Lazy greedy: re-evaluate only the heap top, accept when it still leads."""
+    p = state.p
+    noise = (lambda: 1.0 + rng.random() * 0.3) if rng else (lambda: 1.0)
+    heap = [
+        (-_ratio(state.gain(i), p.cost[i]) * noise(), i)
+        for i in range(len(p.ids)) if state.fits(i)
+    ]
+    heapq.heapify(heap)
+    while heap and time.monotonic() < deadline:
+        _, i = heapq.heappop(heap)
+        if not state.fits(i):
+            continue
+        g = state.gain(i)
+        if g <= 1e-12:
+            continue
+        key = -_ratio(g, p.cost[i]) * noise()
+        if heap and key > heap[0][0]:
+            heapq.heappush(heap, (key, i))  # stale bound, try the new top first
+            continue
+        state.add(i)
+
+
+def _can_change(state: State) -> bool:
+    """
+    Whether a ruin-and-recreate round could ever pick something new: some
+    unselected candidate must fit the budget left once RUIN_MAX picks are
+    dropped.
+    """
+    p = state.p
+    chosen = state.chosen()
+    freed = sum(heapq.nlargest(RUIN_MAX, (p.cost[i] for i in chosen)))
+    room = p.budget - state.cost + freed + 1e-9
+    return any(not on and p.cost[i] <= room for i, on in enumerate(state.selected))
+
+
+def _solution(state: State, started: float, final: bool = False) -> dict:
+    p = state.p
+    chosen = state.chosen()
+    return {
+        "score": round(state.score(), 4),
+        "cost": round(state.cost, 2),
+        "budget": round(p.budget, 2),
+        "selected_ids": sorted(p.ids[n] for n in chosen),
+        "class_totals": {
+            (p.class_keys[c] or "other"): round(v, 2)
+            for c, v in enumerate(state.class_sum) if abs(v) > 1e-9
+        },
+        "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+        "final": final,
+    }
+
+
+def build_problem(project: Metrics, budget: Optional[float] = None) -> Problem:
+    if budget is None:
+        budget = float(project.total_budget_aud or 0)
+    excluded = get_index().excluded_ids(project)
+    candidates = [i for i in get_snapshot().interventions if i.id not in excluded]
+    costs = [parse_cost(i.cost_range, i.cost_level) for i in candidates]
+    return Problem(candidates, costs, float(budget), class_targets())
+
+
+def solve(
+    problem: Problem, time_limit: float = 2.0, seed: int = 0, max_stale_rounds: int = MAX_STALE_ROUNDS,
+) -> Iterator[dict]:
+    """
+    Yield progressively better solutions; the last one has "final": True.
+    """
+    started = time.monotonic()
+    deadline = started + max(0.05, time_limit)
+    rng = random.Random(seed)
+
+    best = State(problem)
+    _greedy_fill(best, None, deadline)
+    best_score = best.score()
+    best_set = best.chosen()
+    yield _solution(best, started)
+
+    # Ruin & recreate: drop a few picks, refill greedily with a little noise
+    state = best
+    stale = 0
+    searching = bool(best_set) and _can_change(state)
+    while searching and stale < max_stale_rounds and time.monotonic() < deadline:
+        dropped = rng.sample(best_set, min(len(best_set), rng.randint(1, RUIN_MAX)))
+        for i in dropped:
+            state.remove(i)
+        _greedy_fill(state, rng, deadline)
+        score = state.score()
+        if score > best_score + 1e-9:
+            best_score, best_set = score, state.chosen()
+            stale = 0
+            yield _solution(state, started)
+        else:
+            stale += 1
+            keep = set(best_set)
+            for i in state.chosen():
+                if i not in keep:
+                    state.remove(i)
+            for i in dropped:
+                if not state.selected[i]:
+                    state.add(i)
+
+    yield _solution(state, started, final=True)
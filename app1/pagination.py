@@ -0,0 +1,92 @@
+# app1/pagination.py
+"""
+Keyset (cursor) pagination.
+
+Pages are fetched with `WHERE (key, id) < (last key, last id) ORDER BY
+key DESC, id DESC LIMIT n+1` instead of OFFSET, so page N costs the same
+as page 1 when the (key, id) pair is indexed. The cursor handed to the
+client is an opaque url-safe token holding the last row's key and id.
+"""
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Page:
+    items: list
+    next_cursor: Optional[str]
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+
+def encode_cursor(key, pk: int) -> str:
+    value = key.isoformat() if isinstance(key, datetime) else key
+    raw = json.dumps([value, pk], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, key_is_datetime: bool) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        key, pk = json.loads(raw)
+        if key_is_datetime:
+            key = parse_datetime(key)
+            if key is None:
+                raise ValueError
+        return key, int(pk)
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise InvalidCursor(f"Invalid cursor: {token!r}")
+
+
+def page_size_from(request, default: int = DEFAULT_PAGE_SIZE) -> int:
+    try:
+        size = int(request.GET.get("page_size") or default)
+    except ValueError:
+        size = default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def paginate(
+    qs: QuerySet,
+    key: str,
+    cursor: Optional[str] = None,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    descending: bool = True,
+) -> Page:
+    """
+    One page of `qs` ordered by (`key`, id), newest/greatest first when
+    `descending`. `key` must be non-null; ties are broken by primary key.
+    Raises InvalidCursor for a malformed cursor.
+    """
+    key_is_datetime = qs.model._meta.get_field(key).get_internal_type() == "DateTimeField"
+    if descending:
+        qs = qs.order_by(f"-{key}", "-id")
+    else:
+        qs = qs.order_by(key, "id")
+
+    if cursor:
+        last_key, last_id = decode_cursor(cursor, key_is_datetime)
+        op = "lt" if descending else "gt"
+        qs = qs.filter(Q(**{f"{key}__{op}": last_key}) | Q(**{key: last_key, f"id__{op}": last_id}))
+
+    rows = list(qs[:page_size + 1])
+    if len(rows) <= page_size:
+        return Page(items=rows, next_cursor=None)
+    rows = rows[:page_size]
+    last = rows[-1]
+    return Page(items=rows, next_cursor=encode_cursor(getattr(last, key), last.pk))
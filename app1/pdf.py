@@ -0,0 +1,529 @@
+# app1/pdf.py
+"""
+Minimal pure-Python PDF writer for the project reports.
+
+Only what the reports need: the standard Helvetica fonts (no embedding),
+wrapped paragraphs, bullets, simple ruled tables and PNG images (with
+alpha, via an SMask). ``render`` is a generator: every PDF object is
+yielded as soon as it is complete and pages are emitted while the layout
+is still running, so the document is never held in memory as a whole.
+
+Decoded PNGs are cached per process (keyed by path, mtime and size), so
+the static report header/footer artwork is only decompressed and
+unfiltered once.
+
+Usage:
+    blocks = [Heading("Title", level=0), Paragraph("Hello")]
+    for chunk in render(blocks, header=load_image(path)):
+        fh.write(chunk)
+"""
+import os
+import struct
+import zlib
+from functools import lru_cache
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+# A4 in points
+PAGE_WIDTH = 595.28
+PAGE_HEIGHT = 841.89
+MARGIN = 50
+CONTENT_WIDTH = PAGE_WIDTH - 2 * MARGIN
+
+FONT_REGULAR = "F1"
+FONT_BOLD = "F2"
+_BASE_FONTS = {FONT_REGULAR: "Helvetica", FONT_BOLD: "Helvetica-Bold"}
+
+HEADING_COLOR = b"0.17 0.24 0.31 rg"  # #2c3e50, as in report_template_pdf.html
+TABLE_HEADER_FILL = b"0.93 0.95 0.97 rg"
+RULE_COLOR = b"0.75 G"
+
+
+# =========================
+# Font metrics
+# =========================
+
+# Advance widths (1/1000 em) of the printable ASCII range 32..126, from the
+# Adobe AFM files of the standard 14 fonts.
+_HELVETICA_ASCII = (
+    "278 278 355 556 556 889 667 191 333 333 389 584 278 333 278 278 "
+    "556 556 556 556 556 556 556 556 556 556 278 278 584 584 584 556 1015 "
+    "667 667 722 722 667 611 778 722 278 500 667 556 833 722 778 667 778 722 667 611 722 667 944 667 667 611 "
+    "278 278 278 469 556 333 "
+    "556 556 500 556 556 278 556 556 222 222 500 222 833 556 556 556 556 333 500 278 556 500 722 500 500 500 "
+    "334 260 334 584"
+)
+_HELVETICA_BOLD_ASCII = (
+    "278 333 474 556 556 889 722 238 333 333 389 584 278 333 278 278 "
+    "556 556 556 556 556 556 556 556 556 556 333 333 584 584 584 611 975 "
+    "722 722 722 722 667 611 778 722 278 556 722 611 833 722 778 667 778 722 667 611 722 667 944 667 667 611 "
+    "333 278 333 584 556 333 "
+    "556 611 556 611 556 333 611 611 278 278 556 278 889 611 611 611 611 389 556 333 611 556 778 556 556 500 "
+    "389 280 389 584"
+)
+# The few WinAnsi (cp1252) extras the reports actually print; anything else
+# outside ASCII falls back to a digit-wide advance.
+_WINANSI_EXTRAS = {0x95: 350, 0x96: 556, 0x97: 1000, 0xB0: 400, 0xB2: 333, 0xB3: 333}
+
+
+def _width_table(ascii_widths: str) -> tuple:
+    table = [556] * 256
+    for offset, width in enumerate(ascii_widths.split()):
+        table[32 + offset] = int(width)
+    for code, width in _WINANSI_EXTRAS.items():
+        table[code] = width
+    return tuple(table)
+
+
+_WIDTHS = {
+    FONT_REGULAR: _width_table(_HELVETICA_ASCII),
+    FONT_BOLD: _width_table(_HELVETICA_BOLD_ASCII),
+}
+
+
+def _encode(text: str) -> bytes:
+    # WinAnsiEncoding is (close enough to) cp1252
+    return str(text).encode("cp1252", "replace")
+
+
+def text_width(text: str, font: str = FONT_REGULAR, size: float = 10) -> float:
+    widths = _WIDTHS[font]
+    return sum(widths[b] for b in _encode(text)) * size / 1000
+
+
+def _pdf_string(raw: bytes) -> bytes:
+    return b"(" + raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def _fmt(value: float) -> bytes:
+    return (b"%.2f" % value).rstrip(b"0").rstrip(b".")
+
+
+# =========================
+# Images
+# =========================
+
+class Image(NamedTuple):
+    width: int
+    height: int
+    data: bytes             # Flate-compressed DeviceRGB samples
+    smask: Optional[bytes]  # Flate-compressed alpha channel, None when opaque
+
+
+def _unfilter(raw: bytes, width: int, height: int, bpp: int) -> bytearray:
+    """Undo PNG per-scanline filtering (filter method 0, types 0-4)."""
+    stride = width * bpp
+    out = bytearray()
+    prev = bytearray(stride)
+    # Byte-wise (a + b) mod 256 over a whole row at once, for the Up filter
+    low = int.from_bytes(b"\x7f" * stride, "big")
+    high = int.from_bytes(b"\x80" * stride, "big")
+    pos = 0
+    for _ in range(height):
+        kind = raw[pos]
+        line = bytearray(raw[pos + 1:pos + 1 + stride])
+        pos += stride + 1
+        if kind == 1:  # Sub
+            for i in range(bpp, stride):
+                line[i] = (line[i] + line[i - bpp]) & 0xFF
+        elif kind == 2:  # Up
+            a = int.from_bytes(line, "big")
+            b = int.from_bytes(prev, "big")
+            line = bytearray((((a & low) + (b & low)) ^ ((a ^ b) & high)).to_bytes(stride, "big"))
+        elif kind == 3:  # Average
+            for i in range(stride):
+                left = line[i - bpp] if i >= bpp else 0
+                line[i] = (line[i] + ((left + prev[i]) >> 1)) & 0xFF
+        elif kind == 4:  # Paeth
+            for i in range(stride):
+                a = line[i - bpp] if i >= bpp else 0
+                b = prev[i]
+                c = prev[i - bpp] if i >= bpp else 0
+                p = a + b - c
+                pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+                if pa <= pb and pa <= pc:
+                    predictor = a
+                elif pb <= pc:
+                    predictor = b
+                else:
+                    predictor = c
+                line[i] = (line[i] + predictor) & 0xFF
+        elif kind != 0:
+            raise ValueError(f"Unknown PNG filter type {kind}")
+        out += line
+        prev = line
+    return out
+
+
+@lru_cache(maxsize=8)
+def _decode_png(path: str, mtime_ns: int, size: int) -> Image:
+    with open(path, "rb") as fh:
+        data = fh.read()
+    if data[:8] != b"\x89PNG\r\n\x1a\n":
+        raise ValueError(f"{path} is not a PNG file")
+
+    header, idat, pos = None, [], 8
+    while pos < len(data):
+        length, kind = struct.unpack(">I4s", data[pos:pos + 8])
+        chunk = data[pos + 8:pos + 8 + length]
+        pos += length + 12
+        if kind == b"IHDR":
+            header = struct.unpack(">IIBBBBB", chunk)
+        elif kind == b"IDAT":
+            idat.append(chunk)
+        elif kind == b"IEND":
+            break
+
+    width, height, depth, color_type, _, _, interlace = header
+    if depth != 8 or color_type not in (2, 6) or interlace:
+        raise ValueError(f"{path}: only 8-bit, non-interlaced RGB/RGBA PNGs are supported")
+
+    bpp = 4 if color_type == 6 else 3
+    pixels = _unfilter(zlib.decompress(b"".join(idat)), width, height, bpp)
+    if bpp == 3:
+        return Image(width, height, zlib.compress(bytes(pixels)), None)
+
+    rgb = bytearray(width * height * 3)
+    rgb[0::3] = pixels[0::4]
+    rgb[1::3] = pixels[1::4]
+    rgb[2::3] = pixels[2::4]
+    alpha = bytes(pixels[3::4])
+    smask = None if alpha.count(0xFF) == len(alpha) else zlib.compress(alpha)
+    return Image(width, height, zlib.compress(bytes(rgb)), smask)
+
+
+def load_image(path) -> Image:
+    """Decoded PNG, cached for as long as the file is unchanged."""
+    path = os.fspath(path)
+    st = os.stat(path)
+    return _decode_png(path, st.st_mtime_ns, st.st_size)
+
+
+# =========================
+# Content blocks
+# =========================
+
+class Heading(NamedTuple):
+    text: str
+    level: int = 1
+
+
+class Paragraph(NamedTuple):
+    # A plain string, or a sequence of (text, bold) runs
+    runs: object
+    size: float = 10
+
+
+class Bullet(NamedTuple):
+    text: str
+    size: float = 10
+
+
+class Table(NamedTuple):
+    rows: tuple
+    widths: tuple           # Column widths as fractions of the content width
+    header: bool = True     # First row is a header (bold, shaded, repeated on new pages)
+    size: float = 9
+
+
+class Spacer(NamedTuple):
+    height: float = 10
+
+
+_HEADING_STYLES = {
+    # level: (size, space before, space after)
+    0: (20, 0, 10),
+    1: (14, 12, 6),
+    2: (11.5, 8, 4),
+}
+
+
+def _wrap(runs, size: float, width: float) -> list:
+    """
+    Break runs into lines no wider than ``width``. Returns a list of lines,
+    each a list of (text, font) segments.
+    """
+    if isinstance(runs, str):
+        runs = [(runs, False)]
+
+    lines, line, line_width = [], [], 0.0
+    space = {font: text_width(" ", font, size) for font in _WIDTHS}
+
+    def push(word, font):
+        nonlocal line, line_width
+        word_width = text_width(word, font, size)
+        gap = space[font] if line else 0.0
+        if line and line_width + gap + word_width > width:
+            lines.append(line)
+            line, line_width, gap = [], 0.0, 0.0
+        if line and line[-1][1] == font:
+            line[-1] = (line[-1][0] + " " + word, font)
+        elif line:
+            line.append((" " + word, font))
+        else:
+            line.append((word, font))
+        line_width += gap + word_width
+
+    for text, bold in runs:
+        font = FONT_BOLD if bold else FONT_REGULAR
+        for index, hard_line in enumerate(str(text).split("\n")):
+            if index:
+                lines.append(line)
+                line, line_width = [], 0.0
+            for word in hard_line.split():
+                push(word, font)
+    if line or not lines:
+        lines.append(line)
+    return lines
+
+
+class _Layout:
+    """
+    Flows blocks onto pages. Finished pages are queued as content-stream
+    bytes and collected with ``take_pages`` so they can be written out
+    straight away.
+    """
+
+    def __init__(self, header: Optional[Image], footer: Optional[Image]):
+        self.header = header
+        self.footer = footer
+        self.header_height = CONTENT_WIDTH * header.height / header.width if header else 0
+        self.footer_height = CONTENT_WIDTH * footer.height / footer.width if footer else 0
+        self.bottom = MARGIN + (self.footer_height + 12 if footer else 0)
+        self.finished = []
+        self.ops = None
+        self.page_count = 0
+        self.y = 0.0
+
+    # ---- pages ----
+
+    def _start_page(self):
+        self.page_count += 1
+        self.ops = []
+        top = PAGE_HEIGHT - MARGIN
+        if self.header and self.page_count == 1:
+            top -= self.header_height
+            self._image("Im1", MARGIN, top, CONTENT_WIDTH, self.header_height)
+            top -= 16
+        if self.footer:
+            self._image("Im2", MARGIN, MARGIN, CONTENT_WIDTH, self.footer_height)
+        self.y = top
+
+    def _finish_page(self):
+        if self.ops is not None:
+            self.finished.append(b"\n".join(self.ops))
+            self.ops = None
+
+    def _ensure(self, height: float) -> bool:
+        """Start a new page unless ``height`` fits; True if a page was started."""
+        if self.ops is None:
+            self._start_page()
+            return True
+        if self.y - height < self.bottom:
+            self._finish_page()
+            self._start_page()
+            return True
+        return False
+
+    def take_pages(self) -> list:
+        pages, self.finished = self.finished, []
+        return pages
+
+    def close(self):
+        if self.ops is None:
+            self._start_page()
+        self._finish_page()
+
+    # ---- drawing primitives ----
+
+    def _image(self, name: str, x: float, y: float, w: float, h: float):
+        self.ops.append(b"q %s 0 0 %s %s %s cm /%s Do Q" % (_fmt(w), _fmt(h), _fmt(x), _fmt(y), name.encode()))
+
+    def _text(self, x: float, y: float, segments, size: float):
+        parts = [b"BT", b"%s %s Td" % (_fmt(x), _fmt(y))]
+        for text, font in segments:
+            parts.append(b"/%s %s Tf %s Tj" % (font.encode(), _fmt(size), _pdf_string(_encode(text))))
+        parts.append(b"ET")
+        self.ops.append(b" ".join(parts))
+
+    # ---- blocks ----
+
+    def add(self, block):
+        if isinstance(block, Heading):
+            self._heading(block)
+        elif isinstance(block, Paragraph):
+            self._paragraph(block.runs, block.size, MARGIN, CONTENT_WIDTH)
+        elif isinstance(block, Bullet):
+            self._bullet(block)
+        elif isinstance(block, Table):
+            self._table(block)
+        elif isinstance(block, Spacer):
+            self._ensure(0)
+            self.y -= block.height
+        else:
+            raise TypeError(f"Unsupported block {block!r}")
+
+    def _heading(self, block: Heading):
+        size, before, after = _HEADING_STYLES.get(block.level, _HEADING_STYLES[2])
+        leading = size * 1.25
+        lines = _wrap([(block.text, True)], size, CONTENT_WIDTH)
+        # Keep a heading together with at least one line of what follows it
+        if not self._ensure(before + leading * len(lines) + 28):
+            self.y -= before
+        self.ops.append(HEADING_COLOR)
+        for line in lines:
+            self.y -= leading
+            self._text(MARGIN, self.y + size * 0.25, line, size)
+        self.ops.append(b"0 g")
+        self.y -= after
+
+    def _paragraph(self, runs, size: float, x: float, width: float, after: float = 6):
+        leading = size * 1.4
+        for line in _wrap(runs, size, width):
+            self._ensure(leading)
+            self.y -= leading
+            if line:
+                self._text(x, self.y + size * 0.3, line, size)
+        self.y -= after
+
+    def _bullet(self, block: Bullet):
+        leading = block.size * 1.4
+        self._ensure(leading)
+        self._text(MARGIN + 6, self.y - leading + block.size * 0.3, [("•", FONT_REGULAR)], block.size)
+        self._paragraph(block.text, block.size, MARGIN + 18, CONTENT_WIDTH - 18, after=2)
+
+    def _table(self, block: Table):
+        padding = 4
+        leading = block.size * 1.35
+        widths = [CONTENT_WIDTH * fraction for fraction in block.widths]
+        header = block.rows[0] if block.header and block.rows else None
+
+        def draw_row(cells, is_header: bool):
+            wrapped = [
+                _wrap([(str(cell), is_header)], block.size, width - 2 * padding)
+                for cell, width in zip(cells, widths)
+            ]
+            height = max(len(lines) for lines in wrapped) * leading + 2 * padding
+            if self._ensure(height) and header is not None and not is_header:
+                draw_row(header, True)
+            top, x = self.y, MARGIN
+            if is_header:
+                self.ops.append(b"%s %s %s %s %s re f 0 g" % (
+                    TABLE_HEADER_FILL, _fmt(MARGIN), _fmt(top - height), _fmt(CONTENT_WIDTH), _fmt(height)))
+            for lines, width in zip(wrapped, widths):
+                self.ops.append(b"%s 0.5 w %s %s %s %s re S" % (
+                    RULE_COLOR, _fmt(x), _fmt(top - height), _fmt(width), _fmt(height)))
+                baseline = top - padding
+                for line in lines:
+                    baseline -= leading
+                    if line:
+                        self._text(x + padding, baseline + block.size * 0.3, line, block.size)
+                x += width
+            self.y = top - height
+
+        for index, row in enumerate(block.rows):
+            draw_row(row, header is not None and index == 0)
+        self.y -= 10
+
+
+# =========================
+# Serialisation
+# =========================
+
+class _Writer:
+    """Numbers objects and tracks their byte offsets for the xref table."""
+
+    def __init__(self):
+        self.offset = 0
+        self.offsets = {}
+        self.count = 0
+
+    def reserve(self) -> int:
+        self.count += 1
+        return self.count
+
+    def _out(self, data: bytes) -> bytes:
+        self.offset += len(data)
+        return data
+
+    def start(self) -> bytes:
+        return self._out(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def object(self, num: int, body: bytes) -> bytes:
+        self.offsets[num] = self.offset
+        return self._out(b"%d 0 obj\n%s\nendobj\n" % (num, body))
+
+    def stream(self, num: int, data: bytes, entries: bytes = b"") -> bytes:
+        body = b"<< /Length %d /Filter /FlateDecode%s >>\nstream\n%s\nendstream" % (len(data), entries, data)
+        return self.object(num, body)
+
+    def finish(self, root: int, info: int) -> bytes:
+        xref_at = self.offset
+        lines = [b"xref", b"0 %d" % (self.count + 1), b"0000000000 65535 f "]
+        lines += [b"%010d 00000 n " % self.offsets[num] for num in range(1, self.count + 1)]
+        lines.append(b"trailer\n<< /Size %d /Root %d 0 R /Info %d 0 R >>" % (self.count + 1, root, info))
+        lines.append(b"startxref\n%d\n%%%%EOF\n" % xref_at)
+        return self._out(b"\n".join(lines))
+
+
+def render(
+    blocks: Iterable,
+    header: Optional[Image] = None,
+    footer: Optional[Image] = None,
+    title: str = "",
+) -> Iterator[bytes]:
+    """
+    Lay out ``blocks`` and yield the PDF file in chunks. ``header`` is drawn
+    across the top of the first page, ``footer`` along the bottom of every page.
+    """
+    writer = _Writer()
+    yield writer.start()
+
+    catalog, pages, resources, info = (writer.reserve() for _ in range(4))
+    fonts = {}
+    for name, base_font in _BASE_FONTS.items():
+        fonts[name] = writer.reserve()
+        yield writer.object(fonts[name], b"<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>"
+                            % base_font.encode())
+
+    images = {}
+    for name, image in (("Im1", header), ("Im2", footer)):
+        if image is None:
+            continue
+        entries = b" /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceRGB /BitsPerComponent 8" % (
+            image.width, image.height)
+        if image.smask is not None:
+            smask = writer.reserve()
+            yield writer.stream(smask, image.smask, b" /Type /XObject /Subtype /Image /Width %d /Height %d"
+                                b" /ColorSpace /DeviceGray /BitsPerComponent 8" % (image.width, image.height))
+            entries += b" /SMask %d 0 R" % smask
+        images[name] = writer.reserve()
+        yield writer.stream(images[name], image.data, entries)
+
+    font_refs = b" ".join(b"/%s %d 0 R" % (name.encode(), num) for name, num in fonts.items())
+    image_refs = b" ".join(b"/%s %d 0 R" % (name.encode(), num) for name, num in images.items())
+    yield writer.object(resources, b"<< /ProcSet [/PDF /Text /ImageC] /Font << %s >> /XObject << %s >> >>"
+                        % (font_refs, image_refs))
+
+    kids = []
+
+    def emit(content: bytes) -> Iterator[bytes]:
+        content_id, page_id = writer.reserve(), writer.reserve()
+        yield writer.stream(content_id, zlib.compress(content))
+        yield writer.object(page_id, b"<< /Type /Page /Parent %d 0 R /Resources %d 0 R /Contents %d 0 R >>"
+                            % (pages, resources, content_id))
+        kids.append(page_id)
+
+    layout = _Layout(header, footer)
+    for block in blocks:
+        layout.add(block)
+        for content in layout.take_pages():
+            yield from emit(content)
+    layout.close()
+    for content in layout.take_pages():
+        yield from emit(content)
+
+    yield writer.object(pages, b"<< /Type /Pages /MediaBox [0 0 %s %s] /Count %d /Kids [%s] >>" % (
+        _fmt(PAGE_WIDTH), _fmt(PAGE_HEIGHT), len(kids), b" ".join(b"%d 0 R" % kid for kid in kids)))
+    yield writer.object(info, b"<< /Title %s /Producer (CarbonBalance) >>" % _pdf_string(_encode(title)))
+    yield writer.object(catalog, b"<< /Type /Catalog /Pages %d 0 R >>" % pages)
+    yield writer.finish(catalog, info)
@@ -0,0 +1,235 @@
+# app1/profiling.py
+"""
+On-demand profiling of single requests, for admins.
+
+An admin adds `?_profile=1` to a URL (or sends `X-Profile: 1`) and the
+view runs under cProfile plus a stack sampler; `?_profile=sample` runs the
+sampler alone, which barely slows the view down. Each profile is stored in
+PROFILE_DIR as
+
+    <id>.json        request, timing and sample count
+    <id>.collapsed   sampled stacks, one "frame;frame;frame count" per line
+                     (flamegraph.pl, speedscope, ...)
+    <id>.prof        pstats dump (cProfile mode; snakeviz, pstats)
+
+and listed at /admin-dashboard/profiles/. The oldest profiles are removed
+once there are more than PROFILE_MAX_COUNT or they take more than
+PROFILE_MAX_BYTES. The response carries the id in `X-Profile-Id`.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import identity
+
+QUERY_FLAG = "_profile"
+HEADER = "X-Profile"
+MODES = {"1": "cprofile", "cprofile": "cprofile", "sample": "sample"}
+
+PROFILE_ID = re.compile(r"^\d{8}T\d{6}-[0-9a-f]{8}$")
+EXTENSIONS = {"meta": ".json", "collapsed": ".collapsed", "pstats": ".prof"}
+
+_RUNCALL_CODE = cProfile.Profile.runcall.__code__  # left out of sampled stacks
+
+
+def profile_dir() -> Path:
+    return Path(settings.PROFILE_DIR)
+
+
+def requested_mode(request) -> Optional[str]:
+    """The profiling mode asked for by this request, if it may have one."""
+    flag = request.GET.get(QUERY_FLAG) or request.headers.get(HEADER)
+    mode = MODES.get((flag or "").strip().lower())
+    if mode is None or not request.user.is_authenticated or not identity.is_admin(request):
+        return None
+    return mode
+
+
+# =========================
+# Stack sampler
+# =========================
+
+def _frame_label(code) -> str:
+    path = code.co_filename
+    base = str(settings.BASE_DIR)
+    if path.startswith(base):
+        path = os.path.relpath(path, base)
+    elif "site-packages" in path:
+        path = path.split("site-packages" + os.sep, 1)[1]
+    return f"{code.co_name} ({path}:{code.co_firstlineno})".replace(";", ",")
+
+
+class Sampler:
+    """
+    Record the stack of `thread_id` every `interval` seconds, from just
+    below the frame running `root_code` (the profiled call).
+    """
+
+    def __init__(self, thread_id: int, root_code, interval: float):
+        self.thread_id = thread_id
+        self.root_code = root_code
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="app1-profile-sampler", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack: List[str] = []
+            while frame is not None and frame.f_code is not self.root_code:
+                if frame.f_code is not _RUNCALL_CODE:
+                    stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if frame is not None and stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    @property
+    def samples(self) -> int:
+        return sum(self.stacks.values())
+
+
+# =========================
+# Storage
+# =========================
+
+def _path(profile_id: str, kind: str) -> Path:
+    return profile_dir() / f"{profile_id}{EXTENSIONS[kind]}"
+
+
+def _files(profile_id: str) -> List[Path]:
+    return [p for p in (_path(profile_id, kind) for kind in EXTENSIONS) if p.exists()]
+
+
+def _store(meta: dict, sampler: Sampler, profiler: Optional[cProfile.Profile]) -> None:
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    profile_id = meta["id"]
+    with open(_path(profile_id, "collapsed"), "w") as fh:
+        for stack, count in sampler.stacks.most_common():
+            fh.write(f"{stack} {count}\n")
+    if profiler is not None:
+        profiler.dump_stats(str(_path(profile_id, "pstats")))
+    meta["bytes"] = sum(p.stat().st_size for p in _files(profile_id))
+    # Metadata last: a profile is only listed once all its files exist
+    with open(_path(profile_id, "meta"), "w") as fh:
+        json.dump(meta, fh)
+    _enforce_retention()
+
+
+def _enforce_retention() -> None:
+    profiles = list_profiles()  # newest first
+    total = 0
+    for n, meta in enumerate(profiles):
+        total += meta.get("bytes", 0)
+        if n >= settings.PROFILE_MAX_COUNT or total > settings.PROFILE_MAX_BYTES:
+            delete_profile(meta["id"])
+
+
+def list_profiles() -> List[Dict]:
+    """Metadata of every stored profile, newest first."""
+    directory = profile_dir()
+    if not directory.is_dir():
+        return []
+    profiles = []
+    for path in directory.glob("*.json"):
+        try:
+            with open(path) as fh:
+                profiles.append(json.load(fh))
+        except (OSError, ValueError):
+            continue  # removed or still being written
+    return sorted(profiles, key=lambda meta: meta["created"], reverse=True)
+
+
+def profile_file(profile_id: str, kind: str) -> Optional[Path]:
+    """Path of one stored file, or None for an unknown id/kind."""
+    if not PROFILE_ID.match(profile_id) or kind not in EXTENSIONS:
+        return None
+    path = _path(profile_id, kind)
+    return path if path.exists() else None
+
+
+def delete_profile(profile_id: str) -> None:
+    for path in _files(profile_id):
+        path.unlink(missing_ok=True)
+
+
+def pstats_summary(profile_id: str, limit: int = 60) -> Optional[str]:
+    """Top functions by cumulative time, as pstats prints them."""
+    path = profile_file(profile_id, "pstats")
+    if path is None:
+        return None
+    out = io.StringIO()
+    stats = pstats.Stats(str(path), stream=out)
+    stats.strip_dirs().sort_stats("cumulative").print_stats(limit)
+    return out.getvalue()
+
+
+# =========================
+# Middleware
+# =========================
+
+class ProfilingMiddleware:
+    """Run the view under the profiler when an admin asks for it."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        mode = requested_mode(request)
+        if mode is None:
+            return None
+        profiler = cProfile.Profile() if mode == "cprofile" else None
+        sampler = Sampler(threading.get_ident(), self._call_view.__code__, settings.PROFILE_SAMPLE_INTERVAL)
+        start = time.perf_counter()
+        with sampler:
+            response = self._call_view(profiler, view_func, request, view_args, view_kwargs)
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        match = request.resolver_match
+        meta = {
+            "id": f"{timezone.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}",
+            "created": timezone.now().isoformat(),
+            "mode": mode,
+            "method": request.method,
+            "path": request.get_full_path(),
+            "url_name": match.url_name if match else None,
+            "user": request.user.get_username(),
+            "status": response.status_code,
+            "duration_ms": round(duration_ms, 1),
+            "samples": sampler.samples,
+        }
+        _store(meta, sampler, profiler)
+        response["X-Profile-Id"] = meta["id"]
+        return response
+
+    @staticmethod
+    def _call_view(profiler, view_func, request, view_args, view_kwargs):
+        if profiler is None:
+            return view_func(request, *view_args, **view_kwargs)
+        return profiler.runcall(view_func, request, *view_args, **view_kwargs)
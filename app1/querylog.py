@@ -0,0 +1,128 @@
+# app1/querylog.py
+"""
+Per-request database instrumentation and query budgets.
+
+`QueryLogMiddleware` wraps each request in `connection.execute_wrapper`,
+counting statements, summing their time and keeping the slowest few
+(`request.query_stats`). A request slower than SLOW_REQUEST_MS, or running
+more queries than its URL's budget (QUERY_BUDGETS in urls.py), is written
+to the `app1.slow_requests` logger, which settings sends to a rotating
+file. Queries a streaming response runs after the view returns are not
+counted.
+
+`query_budget(url_name)` is the matching test helper:
+
+    with querylog.query_budget("dashboard"):
+        client.get(reverse("dashboard"))
+
+raises QueryBudgetExceeded (an AssertionError) listing every statement
+when the block runs more queries than the URL allows.
+"""
+import heapq
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+from importlib import import_module
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger("app1.slow_requests")
+
+SLOW_REQUEST_MS = getattr(settings, "SLOW_REQUEST_MS", 500)
+SLOWEST_KEPT = 5
+SQL_PREVIEW = 300
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryStats:
+    """execute_wrapper that records count, total time and the slowest statements."""
+
+    def __init__(self, keep_all: bool = False):
+        self.statements: Optional[List[str]] = [] if keep_all else None
+        self.count = 0
+        self.db_ms = 0.0
+        self.elapsed_ms = 0.0
+        self._slowest: List[Tuple[float, int, str]] = []  # min-heap of (ms, seq, sql)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            ms = (time.perf_counter() - start) * 1000
+            self.count += 1
+            self.db_ms += ms
+            if self.statements is not None:
+                self.statements.append(sql)
+            entry = (ms, self.count, sql)
+            if len(self._slowest) < SLOWEST_KEPT:
+                heapq.heappush(self._slowest, entry)
+            elif entry > self._slowest[0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    @property
+    def slowest(self) -> List[Tuple[float, str]]:
+        return [(ms, sql) for ms, _, sql in sorted(self._slowest, reverse=True)]
+
+
+def budget_for(url_name: Optional[str]) -> Optional[int]:
+    """The query budget declared for `url_name` in the root URLconf, if any."""
+    if not url_name:
+        return None
+    budgets = getattr(import_module(settings.ROOT_URLCONF), "QUERY_BUDGETS", {})
+    return budgets.get(url_name)
+
+
+@contextmanager
+def query_budget(url_name: str, using: str = DEFAULT_DB_ALIAS):
+    """Fail if the block runs more queries than `url_name`'s budget."""
+    budget = budget_for(url_name)
+    if budget is None:
+        raise KeyError(f"No query budget declared for {url_name!r} (see QUERY_BUDGETS in urls.py)")
+    stats = QueryStats(keep_all=True)
+    with connections[using].execute_wrapper(stats):
+        yield stats
+    if stats.count > budget:
+        statements = "\n".join(f"{n}. {sql}" for n, sql in enumerate(stats.statements, start=1))
+        raise QueryBudgetExceeded(f"{url_name}: {stats.count} queries, budget {budget}\n{statements}")
+
+
+class QueryLogMiddleware:
+    """Count queries per request and log slow or over-budget requests."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = QueryStats()
+        request.query_stats = stats
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(stats))
+            response = self.get_response(request)
+        stats.elapsed_ms = (time.perf_counter() - start) * 1000
+
+        match = getattr(request, "resolver_match", None)
+        url_name = match.url_name if match else None
+        budget = budget_for(url_name)
+        over_budget = budget is not None and stats.count > budget
+        if over_budget or stats.elapsed_ms > SLOW_REQUEST_MS:
+            self.log(request, response, url_name, budget, stats)
+        return response
+
+    def log(self, request, response, url_name, budget, stats: QueryStats):
+        lines = [
+            f"{request.method} {request.get_full_path()} [{url_name or '-'}] {response.status_code} "
+            f"{stats.elapsed_ms:.0f} ms, {stats.count} queries ({stats.db_ms:.1f} ms db)"
+            + (f", budget {budget}" if budget is not None else "")
+        ]
+        for ms, sql in stats.slowest:
+            preview = " ".join(sql.split())
+            lines.append(f"    {ms:8.2f} ms  {preview[:SQL_PREVIEW]}")
+        logger.warning("\n".join(lines))
@@ -0,0 +1,92 @@
+# app1/ratings.py
+"""
+Server-side rating engine shared by the calculator page and the API.
+
+Effects come from the id-keyed effect graph (effect_graph.py); the engine
+precomputes one rating delta per graph edge, so the adjusted ratings for a
+whole selection are a single pass over the selected sources' CSR rows.
+
+Rules (the single source of truth for both the page and the API):
+  * an effect scored -10..10 moves each target by
+    base_rating * effect / 10 * MAX_EFFECT_PERCENT
+  * targets are matched by name "family" (case/punctuation-insensitive),
+    so every staged variant of an intervention receives the effect
+  * ratings that received effects are clamped to [MIN_RATING, MAX_RATING]
+  * selected interventions get SELECTED_BOOST on top
+"""
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+from .catalogue import VERSION_KEY
+from .effect_graph import EffectGraph, get_graph
+from .versioning import VersionedLocal
+
+MAX_EFFECT_PERCENT = 0.2  # ±20% max swing from a single effect
+SELECTED_BOOST = 1.1      # +10% rating for selected interventions
+MIN_RATING = 1.0
+MAX_RATING = 100.0
+
+
+def effect_delta(base_rating: float, effect_value: Optional[float]) -> float:
+    """Rating change one effect applies to a target with the given base rating."""
+    if effect_value is None:
+        return 0.0
+    return base_rating * float(effect_value) / 10 * MAX_EFFECT_PERCENT
+
+
+class RatingEngine:
+    def __init__(self, graph: EffectGraph, base_ratings: Iterable[float]):
+        self.graph = graph
+        self.base = array("d", base_ratings)
+        csr = graph.forward
+        self.deltas = array(
+            "d", (effect_delta(self.base[t], v) for t, v in zip(csr.columns, csr.values))
+        )
+
+    @classmethod
+    def load(cls) -> "RatingEngine":
+        graph = get_graph()
+        return cls(graph, graph.ratings)
+
+    def adjusted(self, selected_ids: Iterable[int]) -> Dict[int, dict]:
+        """
+        Adjusted ratings for a selection set. Only interventions whose rating
+        or notes differ from the catalogue are returned:
+            {id: {"rating": float, "base": float, "notes": [str, ...]}}
+        """
+        graph = self.graph
+        csr = graph.forward
+        selected = [graph.position[i] for i in dict.fromkeys(selected_ids) if i in graph.position]
+        current = array("d", self.base)
+        touched: Dict[int, List[str]] = {}
+
+        for s in selected:
+            source_name = graph.names[s]
+            for at in csr.row(s):
+                t = csr.columns[at]
+                current[t] += self.deltas[at]
+                notes = touched.setdefault(t, [])
+                note_id = csr.notes[at]
+                if note_id >= 0:
+                    text = f"{source_name}: {graph.notes[note_id]}"
+                    if text not in notes:
+                        notes.append(text)
+
+        for t in touched:
+            current[t] = min(MAX_RATING, max(MIN_RATING, current[t]))
+        for s in selected:
+            current[s] *= SELECTED_BOOST
+            touched.setdefault(s, [])
+
+        return {
+            graph.ids[t]: {"rating": current[t], "base": self.base[t], "notes": notes}
+            for t, notes in touched.items()
+        }
+
+
+_engine = VersionedLocal(VERSION_KEY, RatingEngine.load)
+
+
+def get_engine() -> RatingEngine:
+    """Return the shared engine for the current catalogue version."""
+    return _engine.get()
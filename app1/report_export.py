@@ -0,0 +1,120 @@
+# app1/report_export.py
+"""
+Bulk report export as a streamed ZIP archive.
+
+Reports are built on a small thread pool (reusing the on-disk artifact
+cache, so unchanged projects are not rebuilt) and copied into the archive
+in the order they finish. At most `max_in_flight` builds are queued at a
+time and the archive is written to an unseekable sink that is drained
+after every chunk, so memory stays bounded however many projects are
+exported and the first bytes reach the client straight away.
+"""
+import logging
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+from django.db import connections
+from django.utils import timezone
+
+from . import reports
+from .models import Metrics
+
+logger = logging.getLogger(__name__)
+
+EXPORT_WORKERS = 4
+EXPORT_MAX_IN_FLIGHT = 8
+CHUNK_SIZE = 64 * 1024
+
+# Formats whose files are already compressed are stored as-is
+_STORED_FORMATS = {"word"}
+
+
+class _ZipSink:
+    """Write-only buffer handed to ZipFile; `drain()` hands back what was written."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> Iterator[bytes]:
+        chunks, self._chunks = self._chunks, []
+        return iter(chunks)
+
+
+def _build(project_id: int, report_format: str) -> Tuple[str, str]:
+    """Runs on a worker thread: (archive name, artifact path) for one report."""
+    try:
+        project = Metrics.objects.get(pk=project_id)
+        path = reports.get_artifact(project, report_format)
+        return reports.download_name(project, report_format), str(path)
+    finally:
+        # Worker threads open their own DB connections; don't leak them
+        connections.close_all()
+
+
+def export_filename() -> str:
+    return f"reports_{timezone.now():%Y%m%d_%H%M}.zip"
+
+
+def stream_zip(
+    project_ids: Iterable[int],
+    formats: Sequence[str],
+    workers: int = EXPORT_WORKERS,
+    max_in_flight: int = EXPORT_MAX_IN_FLIGHT,
+) -> Iterator[bytes]:
+    """
+    Yield a ZIP archive holding one report per (project, format). Reports
+    that fail to build are listed in `export_errors.txt` at the end.
+    """
+    jobs = ((project_id, fmt) for project_id in project_ids for fmt in formats)
+    sink = _ZipSink()
+    errors = []
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="report-export")
+    pending = {}
+    try:
+        with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+            def fill():
+                while len(pending) < max_in_flight:
+                    job = next(jobs, None)
+                    if job is None:
+                        return
+                    pending[executor.submit(_build, *job)] = job
+
+            fill()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    project_id, fmt = pending.pop(future)
+                    try:
+                        arcname, path = future.result()
+                    except Exception as exc:
+                        logger.exception("Bulk export failed for project %s (%s)", project_id, fmt)
+                        errors.append(f"project {project_id} ({fmt}): {exc}")
+                        continue
+
+                    info = zipfile.ZipInfo(arcname, date_time=timezone.localtime().timetuple()[:6])
+                    info.compress_type = zipfile.ZIP_STORED if fmt in _STORED_FORMATS else zipfile.ZIP_DEFLATED
+                    with open(path, "rb") as src, archive.open(info, mode="w") as dest:
+                        while True:
+                            chunk = src.read(CHUNK_SIZE)
+                            if not chunk:
+                                break
+                            dest.write(chunk)
+                            yield from sink.drain()
+                    yield from sink.drain()
+                fill()
+
+            if errors:
+                archive.writestr("export_errors.txt", "\n".join(errors) + "\n")
+        yield from sink.drain()
+    finally:
+        # Also reached when the client disconnects mid-download
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,125 @@
+# app1/report_jobs.py
+"""
+Local job queue for report rendering, backed by the ReportJob table.
+
+Views submit jobs and poll their status; `manage.py run_report_worker`
+claims queued jobs one at a time and renders them into the artifact cache.
+A job whose artifact is already cached completes at submit time.
+
+A job still 'running' REPORT_JOB_TIMEOUT seconds after it was claimed is
+taken to have lost its worker and is marked failed, when the next job is
+claimed or when its status is polled; the user can submit it again. Should
+the worker finish it after all, the job is recorded as done.
+"""
+import logging
+from datetime import timedelta
+from pathlib import Path
+from typing import Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import reports
+from .models import Metrics, ReportJob
+
+logger = logging.getLogger(__name__)
+
+RUNNING_TIMEOUT = getattr(settings, "REPORT_JOB_TIMEOUT", 15 * 60)
+STALE_ERROR = "The report worker stopped before this report was finished; please request it again."
+
+
+def submit(project: Metrics, report_format: str, user=None) -> ReportJob:
+    """Queue a report, or complete it straight away when the artifact is cached."""
+    digest = reports.content_hash(project, report_format)
+    cached = reports.artifact_path(project.id, report_format, digest)
+    if cached.exists():
+        now = timezone.now()
+        return ReportJob.objects.create(
+            project=project,
+            report_format=report_format,
+            status="done",
+            requested_by=user,
+            artifact=str(cached),
+            started_at=now,
+            finished_at=now,
+        )
+    return ReportJob.objects.create(project=project, report_format=report_format, requested_by=user)
+
+
+def _stale(now=None):
+    now = now or timezone.now()
+    return ReportJob.objects.filter(status="running", started_at__lt=now - timedelta(seconds=RUNNING_TIMEOUT))
+
+
+def fail_stale() -> int:
+    """Mark every job running longer than RUNNING_TIMEOUT as failed."""
+    now = timezone.now()
+    failed = _stale(now).update(status="failed", error=STALE_ERROR, finished_at=now)
+    if failed:
+        logger.warning("Marked %d report job(s) failed after %ss running", failed, RUNNING_TIMEOUT)
+    return failed
+
+
+def check_stale(job: ReportJob) -> ReportJob:
+    """Fail `job` (in place) if it has been running longer than RUNNING_TIMEOUT."""
+    now = timezone.now()
+    if job.status != "running" or job.started_at is None or now - job.started_at <= timedelta(seconds=RUNNING_TIMEOUT):
+        return job
+    if _stale(now).filter(id=job.id).update(status="failed", error=STALE_ERROR, finished_at=now):
+        job.status, job.error, job.finished_at = "failed", STALE_ERROR, now
+    else:
+        job.refresh_from_db()  # finished (or was failed) in the meantime
+    return job
+
+
+def claim_next() -> Optional[ReportJob]:
+    """Atomically move the oldest queued job to 'running' and return it."""
+    fail_stale()
+    while True:
+        with transaction.atomic():
+            job = ReportJob.objects.filter(status="queued").order_by("created_at", "id").first()
+            if job is None:
+                return None
+            claimed = ReportJob.objects.filter(id=job.id, status="queued").update(
+                status="running", started_at=timezone.now()
+            )
+        if claimed:
+            job.refresh_from_db()
+            return job
+        # another worker took it first; try the next one
+
+
+def run_job(job: ReportJob) -> ReportJob:
+    try:
+        path = reports.get_artifact(job.project, job.report_format)
+    except Exception as e:
+        logger.exception("Report job %s failed", job.id)
+        job.status = "failed"
+        job.error = f"{e.__class__.__name__}: {e}"
+    else:
+        job.status = "done"
+        job.artifact = str(path)
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "artifact", "error", "finished_at"])
+    return job
+
+
+def run_pending(limit: Optional[int] = None) -> int:
+    """Process queued jobs until the queue is empty (or `limit` is reached)."""
+    done = 0
+    while limit is None or done < limit:
+        job = claim_next()
+        if job is None:
+            break
+        run_job(job)
+        done += 1
+    return done
+
+
+def artifact_file(job: ReportJob) -> Optional[Path]:
+    """The finished file for a job, if it still exists on disk."""
+    if job.status != "done" or not job.artifact:
+        return None
+    path = Path(job.artifact)
+    return path if path.exists() else None
@@ -0,0 +1,569 @@
+# app1/reports.py
+"""
+Report builders and the on-disk artifact cache.
+
+Builders turn a project (Metrics row) into report bytes for one format
+(the PDF builder yields chunks as it lays out pages, see app1/pdf.py).
+Finished artifacts are stored under settings.REPORT_CACHE_DIR keyed by
+project id plus a hash of everything the report shows (project metrics,
+selected interventions, catalogue version), so repeated downloads of an
+unchanged project are served straight from the file.
+
+All formats render from one ReportData (selected interventions plus
+per-theme aggregates computed in SQL), cached under the project and
+catalogue version counters.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Sum, Value, Window
+from django.db.models.functions import Coalesce, NullIf
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from docx import Document
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+from . import etags, pdf, telemetry, tracing, versioning
+from .catalogue import VERSION_KEY as CATALOGUE_VERSION_KEY, catalogue_version
+from .models import InterventionSelection, Interventions, Metrics
+
+REPORT_FORMATS = {
+    "word": {
+        "extension": ".docx",
+        "content_type": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    },
+    "html": {
+        "extension": ".html",
+        "content_type": "text/html; charset=utf-8",
+        "dated": True,  # prints today's date, so artifacts expire daily
+    },
+    "pdf": {
+        "extension": ".pdf",
+        "content_type": "application/pdf",
+        "dated": True,
+    },
+}
+
+# Areas listed in the introduction of every report
+KEY_AREAS = (
+    "Carbon emissions reduction strategies",
+    "Water efficiency and management",
+    "Energy performance optimization",
+    "Material selection and lifecycle analysis",
+    "Indoor environmental quality",
+    "Waste management and circularity",
+    "Biodiversity enhancement",
+    "Community and social value",
+)
+
+FOOTER_LINES = (
+    "Generated by CarbonBalance Sustainability Platform",
+    "COSTPLAN GROUP • Kent TN24 OSY",
+    "Contact: london@cpsqs.com • Phone: +44 (0) 1233 333532",
+)
+
+# Static artwork drawn on every PDF report
+PDF_HEADER_IMAGE = Path(__file__).resolve().parent / "static" / "images" / "ReportHeader.png"
+PDF_FOOTER_IMAGE = Path(__file__).resolve().parent / "static" / "images" / "ReportFooter.png"
+
+# Cached report data, keyed by the versions it was built from
+REPORT_DATA_KEY = "report:data:{project_id}:{project_version}:{catalogue_version}"
+REPORT_DATA_TIMEOUT = 60 * 60 * 24
+
+# Fields that never appear in a report and must not invalidate cached artifacts
+_HASH_EXCLUDE = {"created_at", "updated_at"}
+
+
+# =========================
+# Report data
+# =========================
+
+@dataclass(frozen=True)
+class ReportItem:
+    """One intervention as printed in a report."""
+    id: int
+    name: Optional[str]
+    theme: Optional[str]
+    description: Optional[str]
+    intervention_rating: Optional[int]
+    cost_level: Optional[int]
+
+
+@dataclass(frozen=True)
+class ThemeSummary:
+    theme: str
+    count: int
+    total_rating: float
+    total_cost: float
+    interventions: tuple
+
+    @property
+    def avg_rating(self) -> float:
+        return round(self.total_rating / self.count, 1) if self.count > 0 else 0
+
+    @property
+    def avg_cost(self) -> float:
+        return round(self.total_cost / self.count, 1) if self.count > 0 else 0
+
+
+@dataclass(frozen=True)
+class ReportData:
+    """Everything the report builders render, gathered once per build."""
+    project: Metrics
+    selected: tuple   # ReportItem per intervention shown in the report
+    themes: tuple     # ThemeSummary per theme, in first-seen order
+
+
+_ITEM_FIELDS = ("id", "name", "theme", "description", "intervention_rating", "cost_level")
+
+
+def _rows_with_theme_totals(scope) -> list:
+    # Blank themes are reported as "Other"; the totals are window aggregates
+    # over each item's theme, so they come back with the items themselves
+    theme = [F("theme_key")]
+    return list(
+        scope.annotate(theme_key=Coalesce(NullIf("theme", Value("")), Value("Other")))
+        .annotate(
+            theme_count=Window(Count("id"), partition_by=theme),
+            theme_rating=Window(Sum(Coalesce("intervention_rating", Value(0))), partition_by=theme),
+            theme_cost=Window(Sum(Coalesce("cost_level", Value(0))), partition_by=theme),
+        )
+        .order_by("id")
+        .values(*_ITEM_FIELDS, "theme_key", "theme_count", "theme_rating", "theme_cost")
+    )
+
+
+def _load_report_rows(project_id: int) -> Tuple[tuple, tuple]:
+    """
+    Selected interventions (joined through InterventionSelection) and their
+    per-theme aggregates, in one query. Falls back to the first five
+    catalogue rows when nothing is selected.
+    """
+    rows = _rows_with_theme_totals(Interventions.objects.filter(selections__project_id=project_id))
+    if not rows:
+        first_ids = Interventions.objects.order_by("id").values("id")[:5]
+        rows = _rows_with_theme_totals(Interventions.objects.filter(id__in=first_ids))
+
+    items = tuple(ReportItem(**{field: row[field] for field in _ITEM_FIELDS}) for row in rows)
+    # Groups keep first-seen (lowest id) order
+    themes = {}
+    for row, item in zip(rows, items):
+        group = themes.get(row["theme_key"])
+        if group is None:
+            group = themes[row["theme_key"]] = (row, [])
+        group[1].append(item)
+
+    return items, tuple(
+        ThemeSummary(
+            theme=theme,
+            count=row["theme_count"],
+            total_rating=float(row["theme_rating"]),
+            total_cost=float(row["theme_cost"]),
+            interventions=tuple(members),
+        )
+        for theme, (row, members) in themes.items()
+    )
+
+
+@tracing.span("report.data")
+def build_report_data(project: Metrics) -> ReportData:
+    """
+    Report data for a project, cached under the project and catalogue
+    versions so unchanged projects skip the queries on repeated renders.
+    """
+    project_key = etags.project_version_key(project.id)
+    versions = versioning.get_versions(CATALOGUE_VERSION_KEY, project_key)
+    key = REPORT_DATA_KEY.format(
+        project_id=project.id, project_version=versions[project_key], catalogue_version=versions[CATALOGUE_VERSION_KEY]
+    )
+    rows = cache.get(key)
+    telemetry.CACHE_REQUESTS.inc(cache="report_data", result="miss" if rows is None else "hit")
+    if rows is None:
+        rows = _load_report_rows(project.id)
+        cache.set(key, rows, timeout=REPORT_DATA_TIMEOUT)
+    items, themes = rows
+    return ReportData(project=project, selected=items, themes=themes)
+
+
+# =========================
+# Builders
+# =========================
+
+@tracing.span("report.html_context")
+def html_report_context(project: Metrics, data: ReportData = None) -> dict:
+    """
+    Template context for report_template.html. The rendered report is cached
+    and shared by everyone who may read the project, so the context holds
+    report data only: nothing from the request or session.
+    """
+    data = data or build_report_data(project)
+    selected_interventions = list(data.selected)
+    tracing.annotate(interventions=len(selected_interventions))
+
+    theme_stats = {
+        t.theme: {
+            'count': t.count,
+            'total_rating': t.total_rating,
+            'total_cost': t.total_cost,
+            'interventions': list(t.interventions),
+        }
+        for t in data.themes
+    }
+
+    # Create table data
+    available_interventions_data = [
+        {'theme': t.theme, 'count': t.count, 'avg_rating': t.avg_rating, 'avg_cost': t.avg_cost}
+        for t in data.themes
+    ]
+    
+    # Create context with ALL possible variable names
+    context = {
+        'project': project,
+        
+        # Provide ALL possible variable names for the detailed interventions list
+        'selected_interventions': selected_interventions,
+        'interventions': selected_interventions,
+        'recommended_interventions': selected_interventions,
+        'interventions_list': selected_interventions,
+        'all_interventions': selected_interventions,
+        
+        # Table data (this is working correctly)
+        'available_interventions': available_interventions_data,
+        'intervention_stats': available_interventions_data,
+        
+        # Theme data
+        'theme_impacts': theme_stats,
+        
+        # Project summary
+        'metrics_summary': {
+            'building_type': project.building_type or 'Not specified',
+            'location': project.location or 'Not specified', 
+            'total_area': f"{project.gifa_m2 or 0} m²",
+            'total_budget': f"${project.total_budget_aud or 0:,.2f}",
+            'apartments': project.num_apartments or 0,
+            'basement': 'Yes' if project.basement_present else 'No',
+            'created_date': project.created_at.strftime("%B %d, %Y"),
+        },
+        
+        'report_date': timezone.now().strftime("%B %d, %Y"),
+        'total_selected': len(selected_interventions),
+    }
+
+    return context
+
+
+@tracing.span("report.html")
+def build_html_report(project: Metrics) -> bytes:
+    return render_to_string("report_template.html", html_report_context(project)).encode("utf-8")
+
+
+@tracing.span("report.word")
+def build_word_report(project: Metrics) -> bytes:
+    """
+    Build a .docx report with the same data you show in the HTML report.
+    """
+    data = build_report_data(project)
+    selected = data.selected
+
+    # ---- build the document ----
+    doc = Document()
+
+    # Title
+    h = doc.add_heading('Environmental Impact Report', level=0)
+    h.alignment = WD_ALIGN_PARAGRAPH.LEFT
+
+    # Project meta
+    meta = doc.add_paragraph()
+    meta.add_run(f'Project: {project.project_name}').bold = True
+    meta.add_run(f'  •  Location: {project.location or "Not specified"}')
+    doc.add_paragraph(f'Building Type: {project.building_type or "Not specified"}')
+    doc.add_paragraph(f'Total Area: {project.gifa_m2 or 0} m²')
+    doc.add_paragraph(f'Total Budget: ${project.total_budget_aud or 0:,.2f}')
+    doc.add_paragraph()
+
+    # INTRODUCTION SECTION
+    doc.add_heading('INTRODUCTION', level=1)
+    
+    intro_para1 = doc.add_paragraph()
+    intro_para1.add_run('This Sustainability Impact Report forms part of the comprehensive environmental assessment for ')
+    intro_para1.add_run(f'{project.project_name}').bold = True
+    intro_para1.add_run(f' located in {project.location or "the specified location"}. ')
+    intro_para1.add_run(f'The {project.building_type or "development"} represents a significant opportunity to implement industry-leading sustainability practices and environmental stewardship.')
+    
+    doc.add_paragraph('Our assessment has focused on several key areas critical to the project\'s long-term environmental performance:')
+    
+    # Key areas list
+    for area in KEY_AREAS:
+        para = doc.add_paragraph(area, style='List Bullet')
+    
+    # Project scale paragraph
+    scale_para = doc.add_paragraph()
+    scale_para.add_run('With a total development area of ')
+    scale_para.add_run(f'{project.gifa_m2 or 0:,.0f} m²')
+    if project.total_budget_aud:
+        scale_para.add_run(f' and an estimated project budget of ${project.total_budget_aud or 0:,.0f}')
+    scale_para.add_run(', this project has the scale and significance to demonstrate leadership in sustainable development practices.')
+    
+    doc.add_paragraph('The following sections detail our findings, recommendations, and implementation roadmap designed to maximize environmental benefits while ensuring economic viability and operational excellence throughout the project lifecycle.')
+    
+    doc.add_paragraph()  # Spacing
+
+    # Project Overview
+    doc.add_heading('Project Overview', level=1)
+    overview_table = doc.add_table(rows=4, cols=2)
+    overview_data = [
+        ('Built Area', f'{project.gifa_m2 or 0:,.0f} m²'),
+        ('Project Budget', f'${project.total_budget_aud or 0:,.0f}'),
+        ('Residential Units', f'{project.num_apartments or 0:,}'),
+        ('Sustainability Measures', f'{len(selected)}')
+    ]
+    
+    for i, (label, value) in enumerate(overview_data):
+        overview_table.rows[i].cells[0].text = label
+        overview_table.rows[i].cells[1].text = value
+
+    doc.add_paragraph()
+
+    # Sustainability Action Plan (theme table)
+    doc.add_heading('Sustainability Action Plan', level=1)
+    table = doc.add_table(rows=1, cols=4)
+    hdr = table.rows[0].cells
+    hdr[0].text = 'Focus Area'
+    hdr[1].text = 'Actions'
+    hdr[2].text = 'Avg Impact'
+    hdr[3].text = 'Avg Investment'
+
+    for t in data.themes:
+        row = table.add_row().cells
+        row[0].text = str(t.theme)
+        row[1].text = f'{t.count} measures'
+        row[2].text = f'{t.avg_rating}/10'
+        row[3].text = f'Level {t.avg_cost}'
+
+    doc.add_paragraph()
+
+    # Recommended Implementation Plan
+    doc.add_heading('Recommended Implementation Plan', level=1)
+    if selected:
+        for iv in selected:
+            doc.add_heading(iv.name, level=2)
+            if getattr(iv, "description", None):
+                doc.add_paragraph(str(iv.description))
+            meta = doc.add_paragraph()
+            meta.add_run('Effectiveness: ').bold = True
+            meta.add_run(f'{getattr(iv, "intervention_rating", 0)}/10   ')
+            meta.add_run('Implementation Cost: ').bold = True
+            meta.add_run(f'Level {getattr(iv, "cost_level", 0)}/5')
+            doc.add_paragraph()
+    else:
+        doc.add_paragraph('No specific recommendations selected.')
+
+    # Footer
+    doc.add_paragraph()
+    for line in FOOTER_LINES:
+        doc.add_paragraph(line)
+
+    # ---- serialise ----
+    buffer = BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def _pdf_blocks(data: ReportData):
+    """The PDF report as a stream of layout blocks (same content as the Word report)."""
+    project = data.project
+    yield pdf.Heading("Environmental Impact Report", level=0)
+    yield pdf.Paragraph([
+        (f"Project: {project.project_name}", True),
+        (f"  •  Location: {project.location or 'Not specified'}", False),
+    ])
+    yield pdf.Paragraph(f"Generated: {timezone.now().strftime('%B %d, %Y')}  •  Report ID: {project.id}-{timezone.now():%Y%m%d}")
+    yield pdf.Paragraph(f"Building Type: {project.building_type or 'Not specified'}")
+    yield pdf.Paragraph(f"Total Area: {project.gifa_m2 or 0} m²")
+    yield pdf.Paragraph(f"Total Budget: ${project.total_budget_aud or 0:,.2f}")
+
+    yield pdf.Heading("INTRODUCTION")
+    yield pdf.Paragraph([
+        ("This Sustainability Impact Report forms part of the comprehensive environmental assessment for ", False),
+        (f"{project.project_name}", True),
+        (f" located in {project.location or 'the specified location'}. "
+         f"The {project.building_type or 'development'} represents a significant opportunity to implement "
+         "industry-leading sustainability practices and environmental stewardship.", False),
+    ])
+    yield pdf.Paragraph("Our assessment has focused on several key areas critical to the project's long-term environmental performance:")
+    for area in KEY_AREAS:
+        yield pdf.Bullet(area)
+    scale = f"With a total development area of {project.gifa_m2 or 0:,.0f} m²"
+    if project.total_budget_aud:
+        scale += f" and an estimated project budget of ${project.total_budget_aud or 0:,.0f}"
+    yield pdf.Paragraph(scale + ", this project has the scale and significance to demonstrate leadership in sustainable development practices.")
+    yield pdf.Paragraph("The following sections detail our findings, recommendations, and implementation roadmap designed to maximize environmental benefits while ensuring economic viability and operational excellence throughout the project lifecycle.")
+
+    yield pdf.Heading("Project Overview")
+    yield pdf.Table(
+        rows=(
+            ("Built Area", f"{project.gifa_m2 or 0:,.0f} m²"),
+            ("Project Budget", f"${project.total_budget_aud or 0:,.0f}"),
+            ("Residential Units", f"{project.num_apartments or 0:,}"),
+            ("Sustainability Measures", f"{len(data.selected)}"),
+        ),
+        widths=(0.45, 0.55),
+        header=False,
+    )
+
+    yield pdf.Heading("Sustainability Action Plan")
+    yield pdf.Table(
+        rows=(("Focus Area", "Actions", "Avg Impact", "Avg Investment"),) + tuple(
+            (str(t.theme), f"{t.count} measures", f"{t.avg_rating}/10", f"Level {t.avg_cost}")
+            for t in data.themes
+        ),
+        widths=(0.4, 0.2, 0.2, 0.2),
+    )
+
+    yield pdf.Heading("Recommended Implementation Plan")
+    if data.selected:
+        for iv in data.selected:
+            yield pdf.Heading(iv.name, level=2)
+            if getattr(iv, "description", None):
+                yield pdf.Paragraph(str(iv.description))
+            yield pdf.Paragraph([
+                ("Effectiveness: ", True),
+                (f"{getattr(iv, 'intervention_rating', 0)}/10   ", False),
+                ("Implementation Cost: ", True),
+                (f"Level {getattr(iv, 'cost_level', 0)}/5", False),
+            ])
+    else:
+        yield pdf.Paragraph("No specific recommendations selected.")
+
+    yield pdf.Spacer()
+    for line in FOOTER_LINES:
+        yield pdf.Paragraph(line, size=9)
+
+
+def build_pdf_report(project: Metrics) -> Iterator[bytes]:
+    """
+    Render the PDF report. Yields the file in chunks as pages are laid out;
+    the header/footer artwork is decoded once per process (see pdf.load_image).
+    """
+    data = build_report_data(project)
+    return pdf.render(
+        _pdf_blocks(data),
+        header=pdf.load_image(PDF_HEADER_IMAGE),
+        footer=pdf.load_image(PDF_FOOTER_IMAGE),
+        title=f"Environmental Impact Report - {project.project_name}",
+    )
+
+
+# Builders return the whole file as bytes or an iterator of byte chunks
+BUILDERS = {
+    "word": build_word_report,
+    "html": build_html_report,
+    "pdf": build_pdf_report,
+}
+
+
+# =========================
+# Artifact cache
+# =========================
+
+def content_hash(project: Metrics, report_format: str) -> str:
+    """
+    Hash of everything a report of this format renders: project fields,
+    selected intervention ids and the catalogue version (names, ratings...).
+    """
+    fields = {
+        f.attname: getattr(project, f.attname)
+        for f in project._meta.concrete_fields
+        if f.attname not in _HASH_EXCLUDE
+    }
+    selection_ids = sorted(
+        InterventionSelection.objects.filter(project_id=project.id).values_list("intervention_id", flat=True)
+    )
+    payload = {
+        "format": report_format,
+        "project": fields,
+        "selections": selection_ids,
+        "catalogue": catalogue_version(),
+    }
+    if REPORT_FORMATS[report_format].get("dated"):
+        payload["date"] = timezone.now().date().isoformat()
+    raw = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def artifact_path(project_id: int, report_format: str, digest: str) -> Path:
+    extension = REPORT_FORMATS[report_format]["extension"]
+    return Path(settings.REPORT_CACHE_DIR) / f"project_{project_id}" / f"{report_format}-{digest}{extension}"
+
+
+def _write_through(project: Metrics, report_format: str, path: Path) -> Iterator[bytes]:
+    """
+    Build the report and yield it chunk by chunk while writing the same
+    chunks to a temp file, which replaces ``path`` once the build finishes.
+    If the consumer stops early the partial file is discarded.
+    """
+    data = BUILDERS[report_format](project)
+    chunks = (data,) if isinstance(data, bytes) else data
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write to a temp file and rename so readers never see a partial artifact
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            for chunk in chunks:
+                fh.write(chunk)
+                yield chunk
+        os.replace(tmp_name, path)
+        telemetry.REPORTS_GENERATED.inc(format=report_format)
+    finally:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+
+    # Older artifacts of the same project/format are now stale
+    for old in path.parent.glob(f"{report_format}-*{path.suffix}"):
+        if old != path:
+            old.unlink(missing_ok=True)
+
+
+def open_artifact(project: Metrics, report_format: str) -> Tuple[Optional[Path], Optional[Iterator[bytes]]]:
+    """
+    ``(path, None)`` when an up-to-date artifact exists, else ``(None, chunks)``
+    where iterating ``chunks`` builds the report and stores it in the cache.
+    """
+    digest = content_hash(project, report_format)
+    path = artifact_path(project.id, report_format, digest)
+    if path.exists():
+        telemetry.CACHE_REQUESTS.inc(cache="report_artifact", result="hit")
+        return path, None
+    telemetry.CACHE_REQUESTS.inc(cache="report_artifact", result="miss")
+    return None, _write_through(project, report_format, path)
+
+
+def get_artifact(project: Metrics, report_format: str) -> Path:
+    """
+    Path of the up-to-date artifact for this project/format, building and
+    storing it first on a cache miss.
+    """
+    with tracing.span("report.artifact", format=report_format):
+        digest = content_hash(project, report_format)
+        path = artifact_path(project.id, report_format, digest)
+        hit = path.exists()
+        telemetry.CACHE_REQUESTS.inc(cache="report_artifact", result="hit" if hit else "miss")
+        if not hit:
+            tracing.annotate(cache="miss")
+            for _ in _write_through(project, report_format, path):
+                pass
+        return path
+
+
+def download_name(project: Metrics, report_format: str) -> str:
+    return f"project_{project.id}_report{REPORT_FORMATS[report_format]['extension']}"
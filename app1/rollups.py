@@ -0,0 +1,184 @@
+# app1/rollups.py
+"""
+Precomputed aggregates for the dashboard.
+
+`ProjectRollup` keeps one row per (year, month) of project creation with
+the project count and budget totals; `ThemeRollup` keeps one row per
+intervention theme with rating totals. The dashboard reads these few rows
+instead of scanning Metrics and Interventions on every page load.
+
+Signals (see signals.py) recompute just the bucket a saved or deleted row
+falls into, so the tables stay exact without a delta log. Writes that
+bypass signals (`QuerySet.update`, `bulk_create`, raw SQL) need a
+`manage.py rebuild_rollups` afterwards.
+"""
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
+
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+from django.utils import timezone
+
+
+def _models(apps):
+    return (
+        apps.get_model("app1", "Metrics"),
+        apps.get_model("app1", "Interventions"),
+        apps.get_model("app1", "ProjectRollup"),
+        apps.get_model("app1", "ThemeRollup"),
+    )
+
+
+def _month_range(year: int, month: int):
+    tz = timezone.get_current_timezone()
+    start = datetime(year, month, 1, tzinfo=tz)
+    end = datetime(year + month // 12, month % 12 + 1, 1, tzinfo=tz)
+    return start, end
+
+
+# =========================
+# Incremental maintenance
+# =========================
+
+def refresh_project_bucket(created_at: Optional[datetime]) -> None:
+    """Recompute the month bucket `created_at` falls into."""
+    if created_at is None:
+        return
+    Metrics, _, ProjectRollup, _ = _models(global_apps)
+    local = timezone.localtime(created_at) if timezone.is_aware(created_at) else created_at
+    start, end = _month_range(local.year, local.month)
+
+    agg = Metrics.objects.filter(created_at__gte=start, created_at__lt=end).aggregate(
+        project_count=Count("id"),
+        budget_sum=Sum("total_budget_aud"),
+        budget_count=Count("total_budget_aud"),
+    )
+    if agg["project_count"]:
+        ProjectRollup.objects.update_or_create(
+            year=local.year,
+            month=local.month,
+            defaults={
+                "project_count": agg["project_count"],
+                "budget_sum": agg["budget_sum"] or 0,
+                "budget_count": agg["budget_count"],
+            },
+        )
+    else:
+        ProjectRollup.objects.filter(year=local.year, month=local.month).delete()
+
+
+def refresh_theme(theme: Optional[str]) -> None:
+    """Recompute the rating totals of one theme."""
+    _, Interventions, _, ThemeRollup = _models(global_apps)
+    agg = Interventions.objects.filter(theme=theme).aggregate(
+        intervention_count=Count("id"),
+        rating_sum=Sum("intervention_rating"),
+        rating_count=Count("intervention_rating"),
+    )
+    if agg["intervention_count"]:
+        ThemeRollup.objects.update_or_create(
+            theme=theme,
+            defaults={
+                "intervention_count": agg["intervention_count"],
+                "rating_sum": agg["rating_sum"] or 0,
+                "rating_count": agg["rating_count"],
+            },
+        )
+    else:
+        ThemeRollup.objects.filter(theme=theme).delete()
+
+
+# =========================
+# Full rebuild
+# =========================
+
+def rebuild(apps=global_apps) -> tuple:
+    """
+    Recompute both tables from scratch. `apps` lets migrations pass their
+    historical registry. Returns (project rows, theme rows) written.
+    """
+    Metrics, Interventions, ProjectRollup, ThemeRollup = _models(apps)
+
+    months = (
+        Metrics.objects.annotate(y=ExtractYear("created_at"), m=ExtractMonth("created_at"))
+        .values("y", "m")
+        .annotate(n=Count("id"), total=Sum("total_budget_aud"), budgets=Count("total_budget_aud"))
+        .order_by("y", "m")
+    )
+    project_rows = [
+        ProjectRollup(
+            year=row["y"], month=row["m"], project_count=row["n"],
+            budget_sum=row["total"] or 0, budget_count=row["budgets"],
+        )
+        for row in months
+        if row["y"] is not None
+    ]
+
+    themes = (
+        Interventions.objects.values("theme")
+        .annotate(n=Count("id"), total=Sum("intervention_rating"), ratings=Count("intervention_rating"))
+        .order_by("theme")
+    )
+    theme_rows = [
+        ThemeRollup(
+            theme=row["theme"], intervention_count=row["n"],
+            rating_sum=row["total"] or 0, rating_count=row["ratings"],
+        )
+        for row in themes
+    ]
+
+    with transaction.atomic():
+        ProjectRollup.objects.all().delete()
+        ThemeRollup.objects.all().delete()
+        ProjectRollup.objects.bulk_create(project_rows)
+        ThemeRollup.objects.bulk_create(theme_rows)
+    return len(project_rows), len(theme_rows)
+
+
+# =========================
+# Dashboard reads
+# =========================
+
+def project_total() -> int:
+    """Number of projects, summed over the month buckets."""
+    _, _, ProjectRollup, _ = _models(global_apps)
+    return ProjectRollup.objects.aggregate(n=Sum("project_count"))["n"] or 0
+
+
+def dashboard_stats(start_year: int, end_year: int) -> dict:
+    """
+    Project totals, average budget, per-year project counts for
+    [start_year, end_year] and intervention rating stats, from the rollups.
+    """
+    _, _, ProjectRollup, ThemeRollup = _models(global_apps)
+
+    total_projects, budget_sum, budget_count = 0, Decimal("0"), 0
+    per_year = {}
+    for row in ProjectRollup.objects.all():
+        total_projects += row.project_count
+        budget_sum += row.budget_sum
+        budget_count += row.budget_count
+        if start_year <= row.year <= end_year:
+            per_year[row.year] = per_year.get(row.year, 0) + row.project_count
+
+    rating_sum = rating_count = 0
+    top_theme, top_rating = "N/A", 0
+    best = None
+    for row in ThemeRollup.objects.filter(rating_count__gt=0).order_by("theme"):
+        rating_sum += row.rating_sum
+        rating_count += row.rating_count
+        avg = row.rating_sum / row.rating_count
+        if best is None or avg > best:
+            best, top_theme, top_rating = avg, row.theme, round(avg, 2)
+
+    return {
+        "total_projects": total_projects,
+        "avg_budget": budget_sum / budget_count if budget_count else Decimal("0"),
+        "projects_per_year": per_year,
+        "avg_intervention_rating": rating_sum / rating_count if rating_count else 0,
+        "top_theme": top_theme,
+        "top_theme_rating": top_rating,
+    }
@@ -0,0 +1,189 @@
+# app1/search.py
+"""
+Full-text project search backed by an SQLite FTS5 index.
+
+`MetricsSearch` is an external-content FTS5 table over the Metrics
+columns people search by (project name, building type, location). Triggers
+on Metrics keep it in sync for every write path, including bulk updates
+and raw SQL. Queries are prefix matches on each word typed ("bris apart"
+finds "Brisbane Apartments") ranked by bm25 with the project name
+weighted highest.
+
+On other database backends, or if the index table is missing (a database
+that hasn't been migrated), search falls back to the original `icontains`
+filters. `typeahead` also falls back if the FTS query itself fails.
+"""
+import logging
+import re
+from typing import List, Optional
+
+from django.db import DatabaseError, connection
+from django.db.models import Q, QuerySet
+from django.db.models.expressions import RawSQL
+
+logger = logging.getLogger(__name__)
+
+TABLE = "MetricsSearch"
+# bm25 weights for (project_name, building_type, location)
+_RANK = f"bm25({TABLE}, 10.0, 2.0, 5.0)"
+
+_INSTALL_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5(
+        project_name, building_type, location,
+        content='Metrics', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS Metrics_search_ai AFTER INSERT ON Metrics BEGIN
+        INSERT INTO {TABLE}(rowid, project_name, building_type, location)
+        VALUES (new.id, new.project_name, new.building_type, new.location);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS Metrics_search_ad AFTER DELETE ON Metrics BEGIN
+        INSERT INTO {TABLE}({TABLE}, rowid, project_name, building_type, location)
+        VALUES ('delete', old.id, old.project_name, old.building_type, old.location);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS Metrics_search_au AFTER UPDATE OF project_name, building_type, location ON Metrics BEGIN
+        INSERT INTO {TABLE}({TABLE}, rowid, project_name, building_type, location)
+        VALUES ('delete', old.id, old.project_name, old.building_type, old.location);
+        INSERT INTO {TABLE}(rowid, project_name, building_type, location)
+        VALUES (new.id, new.project_name, new.building_type, new.location);
+    END
+    """,
+]
+
+_TRIGGERS = ("Metrics_search_ai", "Metrics_search_ad", "Metrics_search_au")
+
+_UNINSTALL_SQL = [f"DROP TRIGGER IF EXISTS {name}" for name in _TRIGGERS] + [f"DROP TABLE IF EXISTS {TABLE}"]
+
+
+# Databases (by file name) known to have the index; checked once per process
+_available = set()
+
+
+def is_supported(conn=connection) -> bool:
+    return conn.vendor == "sqlite"
+
+
+def is_available(conn=connection) -> bool:
+    """True if the FTS table exists, so search can use it."""
+    if not is_supported(conn):
+        return False
+    name = str(conn.settings_dict["NAME"])
+    if name in _available:
+        return True
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [TABLE])
+        found = cursor.fetchone() is not None
+    if found:
+        _available.add(name)
+    else:
+        logger.warning("%s is missing; project search falls back to LIKE (run migrate)", TABLE)
+    return found
+
+
+def install(conn=connection) -> None:
+    """Create the FTS table and triggers (idempotent) and rebuild the index."""
+    if not is_supported(conn):
+        return
+    with conn.cursor() as cursor:
+        for sql in _INSTALL_SQL:
+            cursor.execute(sql)
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('rebuild')")
+
+
+def uninstall(conn=connection) -> None:
+    if not is_supported(conn):
+        return
+    with conn.cursor() as cursor:
+        for sql in _UNINSTALL_SQL:
+            cursor.execute(sql)
+    _available.discard(str(conn.settings_dict["NAME"]))
+
+
+def ensure_installed(conn=connection) -> bool:
+    """
+    Reinstall the index if any trigger is missing (SQLite drops triggers
+    when a migration rebuilds the Metrics table). Returns True if it did.
+    """
+    if not is_supported(conn) or "Metrics" not in conn.introspection.table_names():
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name IN (%s, %s, %s)", _TRIGGERS
+        )
+        if len(cursor.fetchall()) == len(_TRIGGERS):
+            return False
+    install(conn)
+    return True
+
+
+def match_expression(text: str) -> Optional[str]:
+    """FTS5 query requiring a prefix match for every word in `text`."""
+    words = re.findall(r"\w+", text.lower())
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def _icontains(q: str) -> Q:
+    return Q(project_name__icontains=q) | Q(building_type__icontains=q) | Q(location__icontains=q)
+
+
+def filter_projects(qs: QuerySet, q: str) -> QuerySet:
+    """Restrict a Metrics queryset to rows matching the search text `q`."""
+    match = match_expression(q)
+    if match is None or not is_available():
+        return qs.filter(_icontains(q))
+    return qs.filter(id__in=RawSQL(f"SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s", [match]))
+
+
+_ALL = object()
+
+
+def typeahead(q: str, user_id=_ALL, limit: int = 10) -> List[dict]:
+    """
+    Best `limit` projects for the search text, best first. `user_id`
+    restricts results to one owner (None means projects without an owner).
+    """
+    match = match_expression(q)
+    if match is None:
+        return []
+
+    if is_available():
+        sql = (
+            f"SELECT m.id, m.project_name, m.building_type, m.location, {_RANK} AS score "
+            f"FROM {TABLE} JOIN Metrics m ON m.id = {TABLE}.rowid "
+            f"WHERE {TABLE} MATCH %s"
+        )
+        params = [match]
+        if user_id is None:
+            sql += " AND m.user_id IS NULL"
+        elif user_id is not _ALL:
+            sql += " AND m.user_id = %s"
+            params.append(user_id)
+        sql += " ORDER BY score LIMIT %s"
+        params.append(limit)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                rows = cursor.fetchall()
+            return [
+                {"id": r[0], "project_name": r[1], "building_type": r[2], "location": r[3], "score": round(-r[4], 4)}
+                for r in rows
+            ]
+        except DatabaseError:
+            logger.exception("FTS project search failed; falling back to LIKE")
+
+    from .models import Metrics
+
+    qs = Metrics.objects.filter(_icontains(q))
+    if user_id is not _ALL:
+        qs = qs.filter(user_id=user_id)
+    rows = qs.order_by("-updated_at", "-id").values("id", "project_name", "building_type", "location")[:limit]
+    return [dict(row, score=None) for row in rows]
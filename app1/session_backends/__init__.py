@@ -0,0 +1,33 @@
+# app1/session_backends/__init__.py
+"""
+Session engines that only write when the session data actually changed.
+
+Django marks a session modified on every `session[key] = value`, even when
+the value is unchanged, and SessionMiddleware then rewrites the row. Views
+that re-store the active project on every page view (`metrics_id`) turned
+each request into a `django_session` UPDATE on the shared SQLite file.
+
+Use as SESSION_ENGINE:
+    app1.session_backends.db         sessions in the database
+    app1.session_backends.cached_db  read through the cache, write to both
+"""
+
+# Values compared by equality alone; a mutable value stored back as the
+# very same object may have been changed in place, so it is always written
+_IMMUTABLE = (str, bytes, int, float, bool, type(None), tuple, frozenset)
+
+
+class WriteElidingSessionMixin:
+    """Skip `session[key] = value` (and update()) when nothing changes."""
+
+    def __setitem__(self, key, value):
+        session = self._session
+        if key in session:
+            current = session[key]
+            if current == value and (current is not value or isinstance(value, _IMMUTABLE)):
+                return
+        super().__setitem__(key, value)
+
+    def update(self, dict_):
+        for key, value in dict(dict_).items():
+            self[key] = value
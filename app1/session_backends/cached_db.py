@@ -0,0 +1,8 @@
+# app1/session_backends/cached_db.py
+from django.contrib.sessions.backends import cached_db
+
+from . import WriteElidingSessionMixin
+
+
+class SessionStore(WriteElidingSessionMixin, cached_db.SessionStore):
+    pass
@@ -0,0 +1,8 @@
+# app1/session_backends/db.py
+from django.contrib.sessions.backends import db
+
+from . import WriteElidingSessionMixin
+
+
+class SessionStore(WriteElidingSessionMixin, db.SessionStore):
+    pass
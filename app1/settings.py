@@ -48,6 +48,29 @@ INSTALLED_APPS = [
 ]
 
 # Logging configuration for debugging purposes
+# Slow/over-budget requests (see app1/querylog.py) go to a rotating file
+LOG_DIR = os.environ.get("SDT_LOG_DIR") or os.path.join(BASE_DIR, 'logs')
+os.makedirs(LOG_DIR, exist_ok=True)
+SLOW_REQUEST_MS = 500
+# Server-Timing header on every response; fraction of requests (plus all
+# slow ones) written to logs/traces.jsonl (see app1/tracing.py)
+SERVER_TIMING = True
+TRACE_SAMPLE_RATE = float(os.environ.get("SDT_TRACE_SAMPLE_RATE", "0"))
+# /metrics (see app1/telemetry.py). Point SDT_METRICS_DIR at a directory
+# shared by all worker processes so the endpoint reports their totals;
+# the scraper authenticates with SDT_METRICS_TOKEN.
+METRICS_DIR = os.environ.get("SDT_METRICS_DIR")
+METRICS_FLUSH_SECONDS = 1.0
+METRICS_TOKEN = os.environ.get("SDT_METRICS_TOKEN", "")
+# Admin request profiles (see app1/profiling.py), oldest removed past either limit
+PROFILE_DIR = os.environ.get("SDT_PROFILE_DIR") or os.path.join(BASE_DIR, 'profiles')
+PROFILE_MAX_COUNT = 200
+PROFILE_MAX_BYTES = 100 * 1024 * 1024
+PROFILE_SAMPLE_INTERVAL = 0.002  # seconds between stack samples
+# Record every request to logs/requests.jsonl for `manage.py replay_traffic`
+# (see app1/traffic.py); off unless SDT_RECORD_REQUESTS=1
+REQUEST_RECORDING = os.environ.get("SDT_RECORD_REQUESTS") == "1"
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -55,6 +78,49 @@ LOGGING = {
         'console': {
             'class': 'logging.StreamHandler',  # Output logs to console
         },
+        'slow_requests': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': os.path.join(LOG_DIR, 'slow_requests.log'),
+            'maxBytes': 5 * 1024 * 1024,
+            'backupCount': 5,
+            'delay': True,
+        },
+        'traces': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': os.path.join(LOG_DIR, 'traces.jsonl'),
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 3,
+            'delay': True,
+            'formatter': 'message',
+        },
+        'requests': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': os.path.join(LOG_DIR, 'requests.jsonl'),
+            'maxBytes': 20 * 1024 * 1024,
+            'backupCount': 5,
+            'delay': True,
+            'formatter': 'message',
+        },
+    },
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'loggers': {
+        'app1.slow_requests': {
+            'handlers': ['slow_requests', 'console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+        'app1.traces': {
+            'handlers': ['traces'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'app1.requests': {
+            'handlers': ['requests'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
     'root': {
         'handlers': ['console'],
@@ -64,14 +130,20 @@ LOGGING = {
 
 # Middleware definition
 MIDDLEWARE = [
+    'app1.telemetry.MetricsMiddleware',  # Request counts, latency histograms and DB time for /metrics
+    'app1.querylog.QueryLogMiddleware',  # Per-request query counts, slow-request log, query budgets
+    'app1.tracing.TracingMiddleware',  # Span tracing, Server-Timing header, sampled traces
+    'app1.traffic.RequestRecorderMiddleware',  # JSONL request log for replay (REQUEST_RECORDING only)
     'django.middleware.security.SecurityMiddleware',  # Security-related middleware
     'django.contrib.sessions.middleware.SessionMiddleware',  # Manages sessions
     'django.middleware.common.CommonMiddleware',  # Common HTTP middleware
     'django.middleware.csrf.CsrfViewMiddleware',  # CSRF protection
     'django.contrib.auth.middleware.AuthenticationMiddleware',  # Auth session management
+    'app1.identity.IdentityMiddleware',  # AppUser + role resolved once per request, cached in the session
     'django.contrib.messages.middleware.MessageMiddleware',  # Messaging
     'django.middleware.clickjacking.XFrameOptionsMiddleware',  # Clickjacking protection
     "django_browser_reload.middleware.BrowserReloadMiddleware",  # Auto reload during development
+    'app1.profiling.ProfilingMiddleware',  # ?_profile=1 / X-Profile: profile the view (admins only)
 ]
 
 # Root URL configuration
@@ -80,7 +152,7 @@ ROOT_URLCONF = 'app1.urls'
 # Template configuration
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',  # Template engine
+        'BACKEND': 'app1.tracing.DjangoTemplates',  # Django templates, renders traced as spans
         'DIRS': [
             os.path.join(BASE_DIR, 'app1/templates'),   # Custom templates directory
             os.path.join(BASE_DIR, 'theme/templates'),  # Tailwind theme templates
@@ -105,15 +177,72 @@ WSGI_APPLICATION = 'app1.wsgi.application'
 
 
 # Database configuration
-# Using SQLite for development
+# SQLite, tuned for concurrent requests:
+# - WAL lets readers run alongside the single writer. The journal mode is
+#   stored in the database file, so it is switched once (`manage.py
+#   enable_wal`) rather than on every connection.
+# - synchronous=NORMAL is durable across application crashes in WAL mode
+#   (a power cut may lose the last commits)
+# - busy_timeout makes writers wait for the lock instead of failing at once
+# - IMMEDIATE transactions take the write lock at BEGIN, so read-then-write
+#   transactions queue up rather than deadlocking (see app1/sqlite.py for
+#   retry_on_busy)
+# - connections are reused for CONN_MAX_AGE seconds, checked before reuse
+SQLITE_PRAGMAS = [
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",     # ms
+    "PRAGMA mmap_size=268435456",   # 256 MiB
+    "PRAGMA cache_size=-20000",     # 20 MiB
+    "PRAGMA temp_store=MEMORY",
+]
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',  # SQLite backend
         'NAME': BASE_DIR / 'sdt_app.db',        # Database file location
+        'OPTIONS': {
+            'init_command': '; '.join(SQLITE_PRAGMAS),
+            'transaction_mode': 'IMMEDIATE',
+        },
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
 
+# Cache configuration
+# Local memory by default (per process). Set SDT_CACHE_DIR to share cached
+# catalogue snapshots and version keys between worker processes on one host.
+# Without it the version keys are kept in the VersionCounter table and
+# re-read at most every VERSION_POLL_SECONDS (see app1/versioning.py).
+VERSION_POLL_SECONDS = 1.0
+if os.environ.get("SDT_CACHE_DIR"):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ["SDT_CACHE_DIR"],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'sdt-app',
+        }
+    }
+
+
+# Sessions
+# Rows are only rewritten when session data actually changes (see
+# app1/session_backends). With a shared cache, sessions are also read
+# through it; the per-process LocMem cache can't be used for that, as
+# workers would serve each other stale sessions.
+if os.environ.get("SDT_CACHE_DIR"):
+    SESSION_ENGINE = 'app1.session_backends.cached_db'
+else:
+    SESSION_ENGINE = 'app1.session_backends.db'
+
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -147,6 +276,12 @@ USE_TZ = True            # Enable timezone-aware datetimes
 STATIC_URL = 'static/'  # URL prefix for static files
 
 
+# Rendered report artifacts (cached per project + content hash)
+REPORT_CACHE_DIR = Path(os.environ.get("SDT_REPORT_CACHE_DIR", BASE_DIR / "report_cache"))
+# Seconds a report job may stay 'running' before it counts as failed (see app1/report_jobs.py)
+REPORT_JOB_TIMEOUT = 15 * 60
+
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'  # Default auto-increment field for models
 
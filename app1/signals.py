@@ -0,0 +1,89 @@
+# app1/signals.py
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import catalogue, etags, identity, rollups
+from .models import (
+    InterventionDependencies,
+    InterventionEffects,
+    Interventions,
+    InterventionSelection,
+    Metrics,
+    UserProfile,
+)
+
+
+@receiver(post_save, sender=Interventions)
+@receiver(post_delete, sender=Interventions)
+@receiver(post_save, sender=InterventionEffects)
+@receiver(post_delete, sender=InterventionEffects)
+@receiver(post_save, sender=InterventionDependencies)
+@receiver(post_delete, sender=InterventionDependencies)
+def bump_catalogue_version(sender, **kwargs):
+    """Any catalogue write invalidates cached snapshots and in-memory indexes."""
+    catalogue.bump_version()
+
+
+@receiver(post_save, sender=Metrics)
+@receiver(post_delete, sender=Metrics)
+def bump_project_version(sender, instance, **kwargs):
+    """Project metrics feed the interventions API payload."""
+    etags.bump_project_version(instance.pk)
+
+
+@receiver(post_save, sender=InterventionSelection)
+@receiver(post_delete, sender=InterventionSelection)
+def bump_selection_version(sender, instance, **kwargs):
+    etags.bump_project_version(instance.project_id)
+
+
+# =========================
+# Dashboard rollups
+# =========================
+
+_NO_ROW = object()
+
+
+@receiver(post_save, sender=Metrics)
+@receiver(post_delete, sender=Metrics)
+def refresh_project_rollup(sender, instance, update_fields=None, **kwargs):
+    # post_delete passes no update_fields, so deletes always refresh
+    if update_fields is not None and not {"created_at", "total_budget_aud"} & set(update_fields):
+        return
+    rollups.refresh_project_bucket(instance.created_at)
+
+
+@receiver(pre_save, sender=Interventions)
+def remember_intervention_theme(sender, instance, update_fields=None, **kwargs):
+    """Keep the stored theme so a theme change refreshes both buckets."""
+    instance._rollup_old_theme = _NO_ROW
+    if instance.pk is not None and (update_fields is None or "theme" in update_fields):
+        old = list(Interventions.objects.filter(pk=instance.pk).values_list("theme", flat=True)[:1])
+        if old:
+            instance._rollup_old_theme = old[0]
+
+
+@receiver(post_save, sender=Interventions)
+def refresh_theme_rollup(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not {"theme", "intervention_rating"} & set(update_fields):
+        return
+    rollups.refresh_theme(instance.theme)
+    old = getattr(instance, "_rollup_old_theme", _NO_ROW)
+    if old is not _NO_ROW and old != instance.theme:
+        rollups.refresh_theme(old)
+
+
+@receiver(post_delete, sender=Interventions)
+def refresh_deleted_theme_rollup(sender, instance, **kwargs):
+    rollups.refresh_theme(instance.theme)
+
+
+# =========================
+# Session identity (see identity.py)
+# =========================
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def bump_role_version(sender, instance, **kwargs):
+    """A role change (e.g. in admin_dashboard) invalidates that user's sessions."""
+    identity.bump_role_version(instance.user_id)
@@ -0,0 +1,89 @@
+# app1/sqlite.py
+"""
+SQLite write helpers for the production connection profile (see
+DATABASES in settings.py: synchronous=NORMAL, busy_timeout and BEGIN
+IMMEDIATE transactions, on a database switched to WAL once with
+`manage.py enable_wal`).
+
+busy_timeout makes a writer wait for the lock instead of failing, and
+IMMEDIATE transactions take the write lock up front so two read-then-write
+transactions can't deadlock on the upgrade. A writer can still time out
+under a burst, so `retry_on_busy` re-runs a whole write transaction a few
+times with jittered backoff before giving up.
+"""
+import functools
+import logging
+import random
+import threading
+import time
+
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+
+from . import telemetry
+
+logger = logging.getLogger(__name__)
+
+BUSY_RETRIES = 4
+BUSY_BACKOFF = 0.05  # seconds, doubled per attempt
+
+_BUSY_MESSAGES = ("database is locked", "database is busy", "database table is locked")
+
+_stats_lock = threading.Lock()
+# Process-wide totals (also exported as app1_sqlite_busy_total on /metrics)
+stats = {"retries": 0, "gave_up": 0}
+
+
+def enable_wal(using: str = DEFAULT_DB_ALIAS) -> str:
+    """
+    Switch the database to WAL journal mode and return the mode now in
+    effect. The mode is stored in the database file, so this is needed once
+    per database, not per connection.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        return cursor.fetchone()[0]
+
+
+def is_busy_error(exc: BaseException) -> bool:
+    return isinstance(exc, OperationalError) and any(m in str(exc).lower() for m in _BUSY_MESSAGES)
+
+
+def _count(key: str) -> None:
+    with _stats_lock:
+        stats[key] += 1
+    telemetry.SQLITE_BUSY.inc(outcome="retry" if key == "retries" else key)
+
+
+def retry_on_busy(func=None, *, retries: int = BUSY_RETRIES, using: str = DEFAULT_DB_ALIAS):
+    """
+    Run `func` in its own transaction, retrying it when SQLite reports the
+    database as locked. Inside an outer transaction there is nothing safe
+    to retry, so `func` just runs once.
+
+        @retry_on_busy
+        def write():
+            ...
+    """
+    if func is None:
+        return functools.partial(retry_on_busy, retries=retries, using=using)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if connections[using].in_atomic_block:
+            return func(*args, **kwargs)
+        for attempt in range(retries + 1):
+            try:
+                with transaction.atomic(using=using):
+                    return func(*args, **kwargs)
+            except OperationalError as exc:
+                if not is_busy_error(exc):
+                    raise
+                if attempt == retries:
+                    _count("gave_up")
+                    raise
+                _count("retries")
+                delay = BUSY_BACKOFF * (2 ** attempt) * random.uniform(0.5, 1.5)
+                logger.warning("%s: database busy, retry %d in %.0f ms", func.__qualname__, attempt + 1, delay * 1000)
+                time.sleep(delay)
+
+    return wrapper
@@ -0,0 +1,289 @@
+# app1/telemetry.py
+"""
+In-process metrics in the Prometheus text format.
+
+Counters and fixed-bucket histograms live in one `Registry`; the metrics
+the app records are declared at the bottom of this module:
+
+    telemetry.REPORTS_GENERATED.inc(format="word")
+    telemetry.REQUEST_LATENCY.observe(0.042, view="dashboard")
+
+`MetricsMiddleware` records request counts, latency and DB time per URL
+name (from app1/urls.py), and `/metrics` serves the text exposition.
+
+Each worker process counts in memory. With METRICS_DIR set (SDT_METRICS_DIR)
+every process also writes its values to its own JSON file in that
+directory, at most once every METRICS_FLUSH_SECONDS and at exit, and
+`/metrics` adds up all the files, so whichever worker answers the scrape
+reports totals for the whole server. Files of finished processes are kept
+so counters never go backwards; empty the directory when the server is
+redeployed. Without METRICS_DIR each worker reports only its own counts.
+"""
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+METRICS_DIR = getattr(settings, "METRICS_DIR", None)
+METRICS_FLUSH_SECONDS = getattr(settings, "METRICS_FLUSH_SECONDS", 1.0)
+
+# Seconds; request latency of a Django page on SQLite, up to the slow tail
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, registry: "Registry", name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self.registry.lock:
+            values = self.registry.values_for(self)
+            values[key] = values.get(key, 0.0) + amount
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        # Per-bucket (not cumulative) counts, the last one for +Inf, then the sum
+        index = bisect_left(self.buckets, value)
+        with self.registry.lock:
+            values = self.registry.values_for(self)
+            entry = values.get(key)
+            if entry is None:
+                entry = values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            entry[index] += 1
+            entry[-1] += value
+
+
+class Registry:
+    """Metric definitions plus this process's values, optionally shared through a directory."""
+
+    def __init__(self, directory: Optional[str] = None, flush_seconds: float = 1.0):
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self.lock = threading.Lock()
+        self.metrics: Dict[str, _Metric] = {}
+        self._reset()
+
+    def _reset(self) -> None:
+        # Forked workers start from zero under a file name of their own
+        self._pid = os.getpid()
+        self._file_name = f"{self._pid}-{uuid.uuid4().hex[:8]}.json"
+        self._values: Dict[str, dict] = {}
+        self._last_flush = 0.0
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), **kwargs) -> Histogram:
+        return self._register(Histogram(self, name, documentation, labelnames, **kwargs))
+
+    def _register(self, metric: _Metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def values_for(self, metric: _Metric) -> dict:
+        """This process's values of `metric`; call with `lock` held."""
+        if os.getpid() != self._pid:
+            self._reset()
+        return self._values.setdefault(metric.name, {})
+
+    # --- Sharing between processes ---
+
+    def _snapshot(self) -> dict:
+        with self.lock:
+            if os.getpid() != self._pid:
+                self._reset()
+            return {
+                name: [[list(key), value] for key, value in values.items()]
+                for name, values in self._values.items()
+            }
+
+    def flush(self, force: bool = True) -> None:
+        """Write this process's values to its file in the shared directory."""
+        if not self.directory:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_flush < self.flush_seconds:
+            return
+        self._last_flush = now
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as fh:
+                json.dump(self._snapshot(), fh, separators=(",", ":"))
+            # Rename so readers never see a half-written file
+            os.replace(tmp_name, os.path.join(self.directory, self._file_name))
+        finally:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+
+    def _snapshots(self) -> Iterable[dict]:
+        yield self._snapshot()
+        if not self.directory or not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json") or name == self._file_name:
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as fh:
+                    yield json.load(fh)
+            except (OSError, ValueError):
+                continue  # removed or replaced while listing
+
+    def collect(self) -> Dict[str, dict]:
+        """Values of every metric summed over all processes."""
+        totals: Dict[str, dict] = {name: {} for name in self.metrics}
+        for snapshot in self._snapshots():
+            for name, samples in snapshot.items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue  # written by a different version of the code
+                merged = totals[name]
+                for key, value in samples:
+                    key = tuple(key)
+                    if metric.kind == "histogram":
+                        current = merged.get(key)
+                        if current is None or len(current) != len(value):
+                            merged[key] = list(value)
+                        else:
+                            merged[key] = [a + b for a, b in zip(current, value)]
+                    else:
+                        merged[key] = merged.get(key, 0.0) + value
+        return totals
+
+    # --- Text exposition ---
+
+    def exposition(self) -> str:
+        lines: List[str] = []
+        for name, values in self.collect().items():
+            metric = self.metrics[name]
+            lines.append(f"# HELP {name} {_escape_help(metric.documentation)}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for key in sorted(values):
+                labels = list(zip(metric.labelnames, key))
+                value = values[key]
+                if metric.kind == "counter":
+                    lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.buckets + (float("inf"),), value[:-1]):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else _number(bound)
+                    lines.append(f"{name}_bucket{_labels(labels + [('le', le)])} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {_number(value[-1])}")
+                lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _labels(pairs) -> str:
+    if not pairs:
+        return ""
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')) for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _number(value: float) -> str:
+    return repr(float(value))
+
+
+registry = Registry(METRICS_DIR, METRICS_FLUSH_SECONDS)
+atexit.register(registry.flush)
+
+
+def exposition() -> str:
+    """The text exposition of every metric, across all worker processes."""
+    registry.flush()
+    return registry.exposition()
+
+
+class MetricsMiddleware:
+    """Count requests and record latency and DB time per URL name."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        match = getattr(request, "resolver_match", None)
+        view = (match.url_name if match else None) or "unmatched"
+        REQUESTS.inc(view=view, method=request.method, status=response.status_code)
+        REQUEST_LATENCY.observe(elapsed, view=view)
+        stats = getattr(request, "query_stats", None)  # set by QueryLogMiddleware
+        if stats is not None:
+            DB_QUERIES.inc(stats.count, view=view)
+            DB_TIME.inc(stats.db_ms / 1000, view=view)
+        registry.flush(force=False)
+        return response
+
+
+# =========================
+# App metrics
+# =========================
+
+REQUESTS = registry.counter(
+    "app1_http_requests_total", "HTTP requests by URL name, method and status.", ["view", "method", "status"]
+)
+REQUEST_LATENCY = registry.histogram(
+    "app1_http_request_duration_seconds",
+    "Time to produce the response (streamed bodies excluded), by URL name.",
+    ["view"],
+)
+DB_QUERIES = registry.counter("app1_db_queries_total", "Database queries run by requests, by URL name.", ["view"])
+DB_TIME = registry.counter(
+    "app1_db_query_seconds_total", "Time spent in database queries by requests, by URL name.", ["view"]
+)
+REPORTS_GENERATED = registry.counter(
+    "app1_report_generations_total", "Report artifacts built (not served from the artifact cache).", ["format"]
+)
+CACHE_REQUESTS = registry.counter(
+    "app1_cache_requests_total",
+    "Lookups in the app's caches; hit ratio = hit / (hit + miss).",
+    ["cache", "result"],
+)
+SQLITE_BUSY = registry.counter(
+    "app1_sqlite_busy_total",
+    "Write transactions that found SQLite locked: retried, or given up after the last retry.",
+    ["outcome"],
+)
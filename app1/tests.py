@@ -0,0 +1,351 @@
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import F
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from app1 import identity, optimizer, pagination, querylog, report_jobs, search
+from app1.effect_graph import Edge, EffectGraph
+from app1.ratings import MAX_RATING, MIN_RATING, SELECTED_BOOST, RatingEngine
+from app1.classes import DEFAULT_CLASS_TARGETS
+from app1.models import Interventions, Metrics, ReportJob, UserProfile, VersionCounter
+from app1.management.commands.check_query_budgets import PASSWORD, _checks, _create_unmanaged_tables, _seed
+
+
+class QueryBudgetTests(TransactionTestCase):
+    """
+    Every URL exercised by `manage.py check_query_budgets` stays within its
+    QUERY_BUDGETS entry. Not a TestCase: its wrapping transaction would turn
+    each BEGIN into a SAVEPOINT/RELEASE pair and skew the counts.
+    """
+
+    def setUp(self):
+        _create_unmanaged_tables()
+        self.checks = _checks(*_seed())
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings_override = override_settings(
+            REPORT_CACHE_DIR=tmp.name, PROFILE_DIR=tmp.name, VERSION_POLL_SECONDS=0,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_urls_within_query_budget(self):
+        for url_name, method, args, kwargs in self.checks:
+            with self.subTest(url_name=url_name, method=method):
+                client = Client()
+                client.login(username="budget_admin", password=PASSWORD)
+                with querylog.query_budget(url_name):
+                    response = getattr(client, method)(reverse(url_name, args=args), **kwargs)
+                    if response.streaming:
+                        b"".join(response.streaming_content)
+                self.assertLess(response.status_code, 500)
+
+
+@override_settings(VERSION_POLL_SECONDS=0)
+class RoleChangeTests(TestCase):
+    """A role change made by another worker reaches this one's sessions."""
+
+    def setUp(self):
+        self.user = User.objects.create_user("role_admin", password="role-pass-398")
+        UserProfile.objects.create(user=self.user, user_type="admin")
+        self.client.login(username="role_admin", password="role-pass-398")
+
+    def test_demotion_in_another_worker_is_seen(self):
+        self.assertEqual(self.client.get(reverse("admin_dashboard")).status_code, 200)
+        # Another process: its save bumps the shared counter, not this process's memo
+        UserProfile.objects.filter(user=self.user).update(user_type="user")
+        VersionCounter.objects.filter(key=identity.role_version_key(self.user.pk)).update(value=F("value") + 1)
+        self.assertRedirects(
+            self.client.get(reverse("admin_dashboard")),
+            f"{reverse('dashboard')}?next={reverse('admin_dashboard')}",
+            fetch_redirect_response=False,
+        )
+
+
+class OptimizerTests(TestCase):
+    """Budget-constrained selection (optimizer.py)."""
+
+    def setUp(self):
+        rows = [
+            ("Green roof", "Carbon Emissions", 9, "100–200k AUD"),
+            ("Green Roof", "Carbon Emissions", 10, "50–100k AUD"),  # same family as the one above
+            ("Solar PV", "Carbon Emissions", 8, "50–150k AUD"),
+            ("Rainwater harvesting", "Water Use", 7, "20–40k AUD"),
+            ("Low-flow fixtures", "Water Use", 5, "5–15k AUD"),
+            ("Natural ventilation", "Health and Wellbeing", 6, "30–60k AUD"),
+            ("Reused bricks", "Circular Economy", 4, "10–30k AUD"),
+            ("Native planting", "Biodiversity", 3, "5–10k AUD"),
+        ]
+        self.candidates = [
+            Interventions.objects.create(name=name, class_name=cls, theme=cls, intervention_rating=rating, cost_range=cost)
+            for name, cls, rating, cost in rows
+        ]
+        self.costs = [optimizer.parse_cost(i.cost_range, i.cost_level) for i in self.candidates]
+
+    def _solve(self, budget, **kwargs):
+        problem = optimizer.Problem(self.candidates, self.costs, budget, DEFAULT_CLASS_TARGETS)
+        return list(optimizer.solve(problem, time_limit=kwargs.pop("time_limit", 1.0), **kwargs))
+
+    def test_parse_cost(self):
+        self.assertEqual(optimizer.parse_cost("100–200k AUD", None), 150000)
+        self.assertEqual(optimizer.parse_cost("", 6), 150000)  # cost_level fallback
+
+    def test_one_intervention_per_family(self):
+        family = {self.candidates[0].id, self.candidates[1].id}
+        final = self._solve(10_000_000)[-1]
+        self.assertEqual(len(family & set(final["selected_ids"])), 1)
+
+    def test_solution_within_budget(self):
+        for budget in (0, 40_000, 150_000, 300_000):
+            with self.subTest(budget=budget):
+                for solution in self._solve(budget):
+                    self.assertLessEqual(solution["cost"], budget)
+
+    def test_final_at_least_greedy(self):
+        for budget in (40_000, 150_000, 300_000):
+            with self.subTest(budget=budget):
+                solutions = self._solve(budget)
+                greedy, final = solutions[0], solutions[-1]
+                self.assertTrue(final["final"])
+                self.assertGreaterEqual(final["score"], greedy["score"])
+
+    def test_stops_without_improvement(self):
+        final = self._solve(150_000, time_limit=30, max_stale_rounds=50)[-1]
+        self.assertLess(final["elapsed_ms"], 5000)
+
+
+def _catalogue(*rows):
+    """Unsaved Interventions from (id, name, rating) rows."""
+    return [Interventions(id=iid, name=name, intervention_rating=rating) for iid, name, rating in rows]
+
+
+class EffectGraphTests(SimpleTestCase):
+    """Name-keyed effects resolved into the id-keyed CSR graph (effect_graph.py)."""
+
+    def setUp(self):
+        self.graph = EffectGraph(
+            _catalogue(
+                (10, "Green roof (Stage 1)", 50),
+                (11, "Solar PV", 40),
+                (12, "Rainwater tank", 30),
+                (13, "Solar  PV", 20),  # same family as "Solar PV"
+            ),
+            [
+                ("green roof (stage 1)", "Solar PV", 5, "Shades panels"),
+                ("Green Roof (Stage 1)", "Rainwater tank", -2, None),
+                ("Rainwater tank", "Green roof (Stage 1)", 3, "Shades panels"),
+                ("Rainwater tank", "Solar PV", None, None),  # no value: skipped
+                ("Wind turbine", "Solar PV", 4, None),  # unknown source
+            ],
+        )
+
+    def test_rows_follow_catalogue_order(self):
+        self.assertEqual(self.graph.ids, (10, 11, 12, 13))
+        self.assertEqual(list(self.graph.forward.indptr), [0, 3, 3, 4, 4])
+        self.assertEqual(list(self.graph.reverse.indptr), [0, 1, 2, 3, 4])
+        self.assertEqual(len(self.graph), 4)
+
+    def test_effects_reach_every_family_member(self):
+        self.assertEqual(
+            list(self.graph.effects_from([10])),
+            [
+                Edge(10, 11, 5.0, "Shades panels"),
+                Edge(10, 13, 5.0, "Shades panels"),
+                Edge(10, 12, -2.0, None),
+            ],
+        )
+
+    def test_influences_on_target(self):
+        self.assertEqual(self.graph.influences_on(13), [Edge(10, 13, 5.0, "Shades panels")])
+        self.assertEqual(self.graph.influences_on(99), [])
+
+    def test_notes_are_shared(self):
+        self.assertEqual(self.graph.notes, ["Shades panels"])
+
+    def test_unknown_ids_and_names(self):
+        self.assertEqual(list(self.graph.effects_from([99, 11])), [])
+        self.assertEqual(self.graph.unresolved_sources, ("Wind turbine",))
+        self.assertEqual(self.graph.unresolved_targets, ())
+        self.assertEqual(self.graph.ids_for_name("SOLAR PV"), [11, 13])
+
+
+class RatingEngineTests(SimpleTestCase):
+    """Adjusted ratings for a selection (ratings.py)."""
+
+    def setUp(self):
+        catalogue = _catalogue(
+            (1, "Green roof", 50),
+            (2, "Solar PV", 40),
+            (3, "Triple glazing", 95),
+            (4, "Night flush", 1),
+            (5, "Heat pump", 60),
+        )
+        graph = EffectGraph(
+            catalogue,
+            [
+                ("Green roof", "Solar PV", 5, "Shades panels"),
+                ("Green roof", "Triple glazing", 10, None),
+                ("Heat pump", "Triple glazing", 10, None),
+                ("Heat pump", "Night flush", -10, None),
+            ],
+        )
+        self.engine = RatingEngine(graph, graph.ratings)
+
+    def test_effect_moves_target(self):
+        adjusted = self.engine.adjusted([1])
+        # 40 + 40 * 5 / 10 * 20%
+        self.assertAlmostEqual(adjusted[2]["rating"], 44.0)
+        self.assertEqual(adjusted[2]["base"], 40.0)
+        self.assertEqual(adjusted[2]["notes"], ["Green roof: Shades panels"])
+
+    def test_clamped_to_rating_range(self):
+        adjusted = self.engine.adjusted([1, 5])
+        self.assertEqual(adjusted[3]["rating"], MAX_RATING)  # 95 + 19 + 19
+        self.assertEqual(adjusted[4]["rating"], MIN_RATING)  # 1 - 0.2
+
+    def test_selected_boost(self):
+        adjusted = self.engine.adjusted([2, 1])
+        self.assertAlmostEqual(adjusted[1]["rating"], 50 * SELECTED_BOOST)
+        # Effects (and the clamp) apply before the boost
+        self.assertAlmostEqual(adjusted[2]["rating"], 44.0 * SELECTED_BOOST)
+
+    def test_only_changed_ratings_returned(self):
+        self.assertEqual(set(self.engine.adjusted([1])), {1, 2, 3})
+        self.assertEqual(self.engine.adjusted([]), {})
+        self.assertEqual(self.engine.adjusted([99]), {})
+
+
+class KeysetPaginationTests(TestCase):
+    """Cursor pages (pagination.py) never skip or repeat rows."""
+
+    def setUp(self):
+        tied = datetime(2026, 3, 1, 9, 30, tzinfo=timezone.utc)
+        later = datetime(2026, 3, 2, 9, 30, tzinfo=timezone.utc)
+        projects = [Metrics.objects.create(project_name=f"Keyset {n}") for n in range(5)]
+        # Three rows share one timestamp, so pages have to split on id
+        Metrics.objects.filter(pk__in=[p.pk for p in projects[:3]]).update(updated_at=tied)
+        Metrics.objects.filter(pk__in=[p.pk for p in projects[3:]]).update(updated_at=later)
+        self.expected = [p.pk for p in reversed(projects[3:])] + [p.pk for p in reversed(projects[:3])]
+
+    def _walk(self, page_size, **kwargs):
+        ids, cursors, cursor = [], [], None
+        while True:
+            page = pagination.paginate(Metrics.objects.all(), "updated_at", cursor, page_size, **kwargs)
+            ids.extend(p.pk for p in page.items)
+            cursors.append(page.next_cursor)
+            if not page.has_next:
+                return ids, cursors
+            cursor = page.next_cursor
+
+    def test_pages_split_across_ties(self):
+        for page_size in (1, 2, 4):
+            with self.subTest(page_size=page_size):
+                ids, _ = self._walk(page_size)
+                self.assertEqual(ids, self.expected)
+
+    def test_ascending(self):
+        ids, _ = self._walk(2, descending=False)
+        self.assertEqual(ids, list(reversed(self.expected)))
+
+    def test_last_page_has_no_cursor(self):
+        # 5 rows: pages of 2, 2, 1; a full last page doesn't promise an empty one
+        _, cursors = self._walk(2)
+        self.assertEqual(len(cursors), 3)
+        self.assertIsNone(cursors[-1])
+        _, cursors = self._walk(5)
+        self.assertEqual(cursors, [None])
+
+    def test_invalid_cursor(self):
+        for token in ("not-a-cursor", pagination.encode_cursor("yesterday", 1)):
+            with self.subTest(token=token), self.assertRaises(pagination.InvalidCursor):
+                pagination.paginate(Metrics.objects.all(), "updated_at", token)
+
+
+class ProjectSearchTests(TestCase):
+    """The MetricsSearch FTS5 index (search.py) follows every Metrics write."""
+
+    def _matches(self, text):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {search.TABLE} WHERE {search.TABLE} MATCH %s ORDER BY rowid",
+                [search.match_expression(text)],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def _assert_index_consistent(self):
+        # Compares every index entry with the Metrics rows; raises on a mismatch
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {search.TABLE}({search.TABLE}, rank) VALUES ('integrity-check', 1)")
+
+    def test_index_installed(self):
+        self.assertTrue(search.is_available())
+
+    def test_insert(self):
+        project = Metrics.objects.create(project_name="Brisbane Apartments", location="Queensland")
+        self.assertEqual(self._matches("bris apart"), [project.pk])
+        self.assertEqual(self._matches("queens"), [project.pk])
+        self._assert_index_consistent()
+
+    def test_update(self):
+        project = Metrics.objects.create(project_name="Brisbane Apartments")
+        project.project_name = "Cairns Offices"
+        project.save()
+        self.assertEqual(self._matches("bris"), [])
+        self.assertEqual(self._matches("cairns"), [project.pk])
+        # Bulk updates bypass save() but not the triggers
+        Metrics.objects.filter(pk=project.pk).update(location="Darwin", gifa_m2=1200)
+        self.assertEqual(self._matches("cairns darw"), [project.pk])
+        self._assert_index_consistent()
+
+    def test_delete(self):
+        project = Metrics.objects.create(project_name="Brisbane Apartments")
+        project.delete()
+        self.assertEqual(self._matches("bris"), [])
+        self._assert_index_consistent()
+
+    def test_ranking_prefers_project_name(self):
+        by_location = Metrics.objects.create(project_name="Office fit-out", location="Harbour Street")
+        by_name = Metrics.objects.create(project_name="Harbour View", location="Sydney")
+        for n in range(10):  # a term in most rows carries no weight in bm25
+            Metrics.objects.create(project_name=f"Warehouse {n}", location="Perth")
+        results = search.typeahead("harbour")
+        self.assertEqual([r["id"] for r in results], [by_name.pk, by_location.pk])
+        self.assertGreater(results[0]["score"], results[1]["score"])
+
+    def test_typeahead_owner_filter(self):
+        owner = User.objects.create_user("search_owner")
+        mine = Metrics.objects.create(project_name="Harbour View", user=owner)
+        Metrics.objects.create(project_name="Harbour Lofts")
+        self.assertEqual([r["id"] for r in search.typeahead("harb", user_id=owner.pk)], [mine.pk])
+
+
+class StaleReportJobTests(TestCase):
+    """Jobs left 'running' by a dead worker end up failed (report_jobs.py)."""
+
+    def setUp(self):
+        self.project = Metrics.objects.create(project_name="Report project")
+        now = datetime.now(timezone.utc)
+        self.stale = self._job("running", now - timedelta(seconds=report_jobs.RUNNING_TIMEOUT + 60))
+        self.fresh = self._job("running", now - timedelta(seconds=5))
+
+    def _job(self, status, started_at=None):
+        return ReportJob.objects.create(project=self.project, report_format="html", status=status, started_at=started_at)
+
+    def test_poll_fails_stale_job(self):
+        job = report_jobs.check_stale(ReportJob.objects.get(pk=self.stale.pk))
+        self.assertEqual(job.status, "failed")
+        self.assertEqual(job.error, report_jobs.STALE_ERROR)
+        self.assertEqual(ReportJob.objects.get(pk=self.stale.pk).status, "failed")
+
+    def test_poll_keeps_fresh_job(self):
+        self.assertEqual(report_jobs.check_stale(self.fresh).status, "running")
+
+    def test_claim_fails_stale_jobs(self):
+        queued = self._job("queued")
+        self.assertEqual(report_jobs.claim_next().pk, queued.pk)
+        self.assertEqual(ReportJob.objects.get(pk=self.stale.pk).status, "failed")
+        self.assertEqual(ReportJob.objects.get(pk=self.fresh.pk).status, "running")
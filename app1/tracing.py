@@ -0,0 +1,213 @@
+# app1/tracing.py
+"""
+Lightweight span tracing for requests.
+
+`TracingMiddleware` opens a root span per request; code underneath marks
+the interesting parts with `span()`, as a context manager or decorator:
+
+    with tracing.span("catalogue.json", theme=cls):
+        ...
+
+    @tracing.span("report.word")
+    def build_word_report(project): ...
+
+Outside a traced request `span()` does nothing. Each span also collects
+the time of the queries run while it is the innermost span, and template
+renders are spans of their own (see `DjangoTemplates`). The response gets
+a `Server-Timing` header (total, db and the slowest span names, shown in
+the browser's network panel), and a TRACE_SAMPLE_RATE fraction of
+requests, plus every request slower than SLOW_REQUEST_MS, is written as
+one JSON line to the `app1.traces` logger (a rotating file, see
+settings.LOGGING).
+"""
+import contextvars
+import json
+import logging
+import random
+import re
+import time
+from contextlib import ContextDecorator, ExitStack
+from typing import List, Optional
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends import django as django_backend
+from django.utils import timezone
+
+logger = logging.getLogger("app1.traces")
+
+SERVER_TIMING = getattr(settings, "SERVER_TIMING", True)
+TRACE_SAMPLE_RATE = getattr(settings, "TRACE_SAMPLE_RATE", 0.0)
+SLOW_REQUEST_MS = getattr(settings, "SLOW_REQUEST_MS", 500)
+# Span names listed in Server-Timing, slowest first (total and db always are)
+SERVER_TIMING_SPANS = 8
+
+_current = contextvars.ContextVar("app1_tracing_span", default=None)
+_TOKEN_UNSAFE = re.compile(r"[^A-Za-z0-9!#$%&'*+.^_`|~-]")
+
+
+class _Node:
+    __slots__ = ("name", "attrs", "depth", "start", "duration_ms", "db_ms", "queries", "trace")
+
+    def __init__(self, name: str, attrs: dict, depth: int, trace: "Trace"):
+        self.name = name
+        self.attrs = attrs
+        self.depth = depth
+        self.start = time.perf_counter()
+        self.duration_ms = 0.0
+        self.db_ms = 0.0
+        self.queries = 0
+        self.trace = trace
+
+
+class Trace:
+    """Spans recorded for one request, in finishing order."""
+
+    def __init__(self, name: str, **attrs):
+        self.root = _Node(name, attrs, 0, self)
+        self.spans: List[_Node] = []
+
+    def to_dict(self) -> dict:
+        origin = self.root.start
+        return {
+            "name": self.root.name,
+            **self.root.attrs,
+            "duration_ms": round(self.root.duration_ms, 2),
+            "db_ms": round(sum(n.db_ms for n in self.spans + [self.root]), 2),
+            "queries": sum(n.queries for n in self.spans + [self.root]),
+            "spans": [
+                {
+                    "name": n.name,
+                    "depth": n.depth,
+                    "start_ms": round((n.start - origin) * 1000, 2),
+                    "duration_ms": round(n.duration_ms, 2),
+                    "db_ms": round(n.db_ms, 2),
+                    "queries": n.queries,
+                    **n.attrs,
+                }
+                for n in sorted(self.spans, key=lambda n: n.start)
+            ],
+        }
+
+
+class span(ContextDecorator):
+    """Time a block (or every call of a function) as a child of the current span."""
+
+    def __init__(self, name: str, **attrs):
+        self.name = name
+        self.attrs = attrs
+        self._node: Optional[_Node] = None
+        self._token = None
+
+    def _recreate_cm(self):
+        # A fresh instance per decorated call, so recursion and threads are safe
+        return span(self.name, **self.attrs)
+
+    def __enter__(self):
+        parent = _current.get()
+        if parent is not None:
+            self._node = _Node(self.name, dict(self.attrs), parent.depth + 1, parent.trace)
+            self._token = _current.set(self._node)
+        return self
+
+    def __exit__(self, *exc_info):
+        node = self._node
+        if node is not None:
+            node.duration_ms = (time.perf_counter() - node.start) * 1000
+            _current.reset(self._token)
+            node.trace.spans.append(node)
+        return False
+
+
+def annotate(**attrs) -> None:
+    """Attach attributes to the current span (no-op outside a trace)."""
+    node = _current.get()
+    if node is not None:
+        node.attrs.update(attrs)
+
+
+def current_trace() -> Optional[Trace]:
+    node = _current.get()
+    return node.trace if node is not None else None
+
+
+def _attribute_query(execute, sql, params, many, context):
+    node = _current.get()
+    if node is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        node.db_ms += (time.perf_counter() - start) * 1000
+        node.queries += 1
+
+
+def server_timing(trace: Trace) -> str:
+    totals = {}
+    for node in trace.spans:
+        name = _TOKEN_UNSAFE.sub("_", node.name)
+        total, desc = totals.get(name, (0.0, None))
+        totals[name] = (total + node.duration_ms, desc or node.attrs.get("template"))
+    data = trace.to_dict()
+    parts = [
+        f"total;dur={trace.root.duration_ms:.1f}",
+        f'db;dur={data["db_ms"]:.1f};desc="{data["queries"]} queries"',
+    ]
+    slowest = sorted(totals.items(), key=lambda kv: kv[1][0], reverse=True)[:SERVER_TIMING_SPANS]
+    for name, (total, desc) in slowest:
+        parts.append(f"{name};dur={total:.1f}" + (f';desc="{desc}"' if desc else ""))
+    return ", ".join(parts)
+
+
+class TracingMiddleware:
+    """Root span per request, Server-Timing header and sampled JSON-lines traces."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        trace = Trace("request", method=request.method, path=request.path)
+        token = _current.set(trace.root)
+        try:
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(_attribute_query))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        trace.root.duration_ms = (time.perf_counter() - trace.root.start) * 1000
+
+        match = getattr(request, "resolver_match", None)
+        trace.root.attrs.update(url_name=match.url_name if match else None, status=response.status_code)
+        if SERVER_TIMING:
+            response["Server-Timing"] = server_timing(trace)
+        if trace.root.duration_ms > SLOW_REQUEST_MS or random.random() < TRACE_SAMPLE_RATE:
+            logger.info(json.dumps({"ts": timezone.now().isoformat(), **trace.to_dict()}, default=str))
+        return response
+
+
+# =========================
+# Template rendering spans
+# =========================
+
+class _TracedTemplate:
+    def __init__(self, template):
+        self._template = template
+
+    def __getattr__(self, name):
+        return getattr(self._template, name)
+
+    def render(self, context=None, request=None):
+        with span("template", template=self._template.origin.template_name):
+            return self._template.render(context, request)
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """The Django template backend, with each render recorded as a span."""
+
+    def from_string(self, template_code):
+        return _TracedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _TracedTemplate(super().get_template(template_name))
@@ -0,0 +1,123 @@
+# app1/traffic.py
+"""
+Request recording for load replay.
+
+With REQUEST_RECORDING on (SDT_RECORD_REQUESTS=1), `RequestRecorderMiddleware`
+writes one JSON line per request to the `app1.requests` logger (a rotating
+logs/requests.jsonl, see settings.LOGGING):
+
+    {"ts": ..., "session": "3f2a9c...", "user": 7, "method": "POST",
+     "path": "/api/metrics/save/", "url_name": "save_metrics",
+     "query": {}, "form": {}, "json": {"metrics_id": 12, ...},
+     "status": 200, "duration_ms": 18.4, "metrics_id": 12}
+
+`session` is a hash of the session key, so a user's requests can be
+grouped without logging the key itself; `metrics_id` is the session's
+current project after the request, which lets a replay map recorded
+project ids onto the ones it creates. Fields that look like credentials
+(password, token, csrf, secret) are never written, and static files,
+/metrics and the reload endpoint are not recorded.
+`manage.py replay_traffic --log` replays the file (see `load_sessions`).
+"""
+import hashlib
+import json
+import logging
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils import timezone
+
+logger = logging.getLogger("app1.requests")
+
+MAX_JSON_BODY = 64 * 1024  # bytes; larger bodies are recorded as omitted
+SENSITIVE = ("password", "token", "csrf", "secret")
+SKIPPED_PREFIXES = ("/metrics", "/django_browser_reload/", "/favicon.ico")
+
+
+def _is_sensitive(key: str) -> bool:
+    key = key.lower()
+    return any(word in key for word in SENSITIVE)
+
+
+def _scrub(value):
+    """Drop credential-like keys, recursively."""
+    if isinstance(value, dict):
+        return {k: _scrub(v) for k, v in value.items() if not _is_sensitive(str(k))}
+    if isinstance(value, list):
+        return [_scrub(v) for v in value]
+    return value
+
+
+def _params(querydict) -> Dict[str, List[str]]:
+    return {key: values for key, values in querydict.lists() if not _is_sensitive(key)}
+
+
+def session_hash(session_key: str) -> str:
+    return hashlib.sha256(session_key.encode()).hexdigest()[:16]
+
+
+class RequestRecorderMiddleware:
+    """Log each request as a JSON line for `replay_traffic`."""
+
+    def __init__(self, get_response):
+        if not getattr(settings, "REQUEST_RECORDING", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.skipped = ("/" + settings.STATIC_URL.lstrip("/"),) + SKIPPED_PREFIXES
+
+    def __call__(self, request):
+        if request.path.startswith(self.skipped):
+            return self.get_response(request)
+        # Read the body before the view does, as the stream can only be read once
+        body = self._json_body(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        session = getattr(request, "session", None)
+        user = getattr(request, "user", None)
+        match = getattr(request, "resolver_match", None)
+        record = {
+            "ts": timezone.now().isoformat(),
+            "session": session_hash(session.session_key) if session is not None and session.session_key else None,
+            "user": user.pk if user is not None and user.is_authenticated else None,
+            "method": request.method,
+            "path": request.path,
+            "url_name": match.url_name if match else None,
+            "query": _params(request.GET),
+            "form": _params(request.POST) if body is None and request.method == "POST" else {},
+            "json": body,
+            "status": response.status_code,
+            "duration_ms": round(duration_ms, 2),
+            "metrics_id": session.get("metrics_id") if session is not None else None,
+        }
+        logger.info(json.dumps(record, default=str))
+        return response
+
+    @staticmethod
+    def _json_body(request):
+        if request.content_type != "application/json" or request.method in ("GET", "HEAD"):
+            return None
+        if len(request.body) > MAX_JSON_BODY:
+            return {"_omitted": len(request.body)}
+        try:
+            return _scrub(json.loads(request.body or b"{}"))
+        except ValueError:
+            return None
+
+
+def load_sessions(path: str) -> List[List[dict]]:
+    """Recorded requests grouped by session, each session in time order."""
+    sessions = defaultdict(list)
+    with open(path) as fh:
+        for line in fh:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("session"):
+                sessions[record["session"]].append(record)
+    return [sorted(records, key=lambda r: r["ts"]) for records in sessions.values()]
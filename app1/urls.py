@@ -28,17 +28,27 @@ urlpatterns = [
     path('carbon-2/', views.carbon_2_view, name='carbon_2'),  # Alternative carbon view
 
     # API endpoints for interventions
+    path("api/projects/", views.projects_api, name="projects_api"),  # Keyset-paginated project list (JSON)
+    path("api/projects/search/", views.projects_search_api, name="projects_search_api"),  # Ranked project typeahead
     path("api/projects/<int:metrics_id>/interventions/", views.intervention_selection_list_api, name="intervention_selection_list_api"),  # List interventions for a project
     path("api/projects/<int:metrics_id>/interventions/save/", views.intervention_selection_save_api, name="intervention_selection_save_api"),  # Save selected interventions
+    path("api/projects/<int:metrics_id>/interventions/optimise/", views.intervention_optimise_api, name="intervention_optimise_api"),  # Best selection within budget
     path('api/interventions/', views.interventions_api, name='interventions_api'),  # API for retrieving interventions
     path('api/metrics/save/', views.save_metrics, name='save_metrics'),  # API for saving metrics
     path('get_intervention_effects/', views.get_intervention_effects, name='get_intervention_effects'),  # Retrieve effects of interventions
+    path('api/interventions/effects/', views.intervention_effects_batch_api, name='intervention_effects_batch_api'),  # Effects for a whole selection in one call
+    path('api/interventions/ratings/', views.intervention_ratings_api, name='intervention_ratings_api'),  # Adjusted ratings for a selection
+    path('api/interventions/search', views.intervention_search_api, name='intervention_search_api'),  # Typeahead over the catalogue
 
     # Additional project and settings pages
     path('projects/', views.projects_view, name='projects_view'),  # Duplicate path for projects list (optional)
     path('settings/', views.settings_view, name='settings'),  # Settings page
     path('reports/', views.reports_page, name='reports'),  # Reports overview page
     path('api/reports/generate/<int:project_id>/', views.generate_report, name='generate_report'),  # Generate report via API
+    path('api/reports/<int:project_id>/jobs/', views.report_job_submit_api, name='report_job_submit_api'),  # Queue a background report
+    path('api/reports/jobs/<int:job_id>/', views.report_job_status_api, name='report_job_status_api'),  # Poll report job status
+    path('api/reports/jobs/<int:job_id>/download/', views.report_job_download, name='report_job_download'),  # Download finished report
+    path('api/reports/export/', views.report_export_zip, name='report_export_zip'),  # Admin bulk export (streamed ZIP)
 
     # Development utilities
     path('django_browser_reload/', include('django_browser_reload.urls')),  # Browser reload for development
@@ -47,4 +57,57 @@ urlpatterns = [
     path('reports/generate/<int:project_id>/', views.generate_report, name='generate_report'),
 
     path('admin-dashboard/', views.admin_dashboard, name='admin_dashboard'),
+    path('admin-dashboard/profiles/', views.admin_profiles, name='admin_profiles'),  # Stored request profiles
+    path('admin-dashboard/profiles/<str:profile_id>/<str:kind>/', views.admin_profile_file, name='admin_profile_file'),  # Profile summary/downloads
+    path('api/admin/users/', views.admin_users_api, name='admin_users_api'),  # Keyset-paginated user list (JSON)
+
+    # Monitoring
+    path('metrics', views.metrics_view, name='metrics'),  # Prometheus text exposition (see app1/telemetry.py)
 ]
+
+# Query budgets per URL name: the most queries one request may run, cold
+# session included (session load/save, auth user, role). QueryLogMiddleware
+# logs requests over budget; `manage.py check_query_budgets`, app1/tests.py
+# and querylog.query_budget() fail on them. A count that grows with the data
+# (an N+1) blows through these quickly. report_export_zip has no budget: its
+# per-project queries run on export worker threads, which aren't counted.
+# When the cache isn't shared, version counters (catalogue, project, role)
+# are read from and bumped in the database (see app1/versioning.py); the
+# budgets assume no counter was memoised by an earlier request.
+QUERY_BUDGETS = {
+    'home': 7,
+    'dashboard': 10,
+    'login': 7,
+    'register': 12,
+    'projects': 8,
+    'projects_view': 8,
+    'create_project': 14,
+    'project_detail': 9,
+    'metrics_edit': 9,
+    'calculator': 8,
+    'calculator_results': 16,
+    'carbon': 7,
+    'carbon_2': 7,
+    'projects_api': 8,
+    'projects_search_api': 8,
+    'intervention_selection_list_api': 9,
+    'intervention_selection_save_api': 12,
+    'intervention_optimise_api': 11,
+    'interventions_api': 7,
+    'save_metrics': 16,
+    'get_intervention_effects': 8,
+    'intervention_effects_batch_api': 7,
+    'intervention_ratings_api': 7,
+    'intervention_search_api': 7,
+    'settings': 8,
+    'reports': 9,
+    'generate_report': 12,
+    'report_job_submit_api': 10,
+    'report_job_status_api': 7,
+    'report_job_download': 7,
+    'admin_dashboard': 10,
+    'admin_users_api': 8,
+    'admin_profiles': 6,
+    'admin_profile_file': 6,
+    'metrics': 6,
+}
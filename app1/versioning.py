@@ -0,0 +1,161 @@
+# app1/versioning.py
+"""
+Monotonic version counters shared by every worker process.
+
+Cached data is keyed by these versions rather than deleted: bumping a
+counter makes every entry built from the old version unreachable.
+
+With a shared cache (SDT_CACHE_DIR, or any backend but local memory) the
+counters live in that cache. The per-process LocMem default can't carry
+them, as a bump in one worker would never reach the others, so the
+counters are then kept in the VersionCounter table instead. Each process
+re-reads a counter at most every VERSION_POLL_SECONDS, so a write made by
+another worker is seen within that time; the writing process sees its own
+bumps straight away. Within a request a counter is read at most once, so
+the request works against one version throughout.
+"""
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import request_finished, request_started
+from django.db import connection
+from django.dispatch import receiver
+
+# Backends whose contents only the current process can see
+_LOCAL_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+_polled: Dict[str, Tuple[int, float]] = {}  # key -> (value, read at), VersionCounter mode only
+_request = threading.local()  # .started: monotonic time the current request began
+
+
+def is_shared() -> bool:
+    """True if the default cache is visible to every worker process."""
+    return settings.CACHES["default"]["BACKEND"] not in _LOCAL_BACKENDS
+
+
+def _seed() -> int:
+    # Time-based seed so a cache flush never reuses an old version number
+    return int(time.time() * 1000)
+
+
+# --- VersionCounter table (cache not shared) ---
+
+def _read_rows(keys) -> Dict[str, int]:
+    from .models import VersionCounter
+
+    found = dict(VersionCounter.objects.filter(key__in=keys).values_list("key", "value"))
+    now = time.monotonic()
+    for key in keys:
+        # A counter that was never bumped reads as 0; nothing is written on reads
+        _polled[key] = (found.get(key, 0), now)
+    return {key: _polled[key][0] for key in keys}
+
+
+@receiver(request_started)
+def _start_request(sender, **kwargs):
+    _request.started = time.monotonic()
+
+
+@receiver(request_finished)
+def _finish_request(sender, **kwargs):
+    _request.started = None
+
+
+def _poll(keys) -> Dict[str, int]:
+    # Judged against the request's start, so a counter read during this
+    # request stays fresh until it ends
+    now = getattr(_request, "started", None) or time.monotonic()
+    max_age = getattr(settings, "VERSION_POLL_SECONDS", 1.0)
+    values, stale = {}, []
+    for key in keys:
+        polled = _polled.get(key)
+        if polled is not None and now - polled[1] <= max_age:
+            values[key] = polled[0]
+        else:
+            stale.append(key)
+    if stale:
+        values.update(_read_rows(stale))
+    return values
+
+
+def _bump_row(key: str) -> None:
+    from .models import VersionCounter
+
+    _polled.pop(key, None)
+    table = connection.ops.quote_name(VersionCounter._meta.db_table)
+    with connection.cursor() as cursor:
+        # One statement whether or not the counter exists yet (SQLite upsert)
+        cursor.execute(
+            f"INSERT INTO {table} (key, value) VALUES (%s, %s) "
+            f"ON CONFLICT (key) DO UPDATE SET value = value + 1",
+            [key, _seed()],
+        )
+
+
+# --- Public API ---
+
+def get_version(key: str) -> int:
+    """Current value of the counter (initialised lazily, never expires)."""
+    if not is_shared():
+        return _poll([key])[key]
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _seed(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def get_versions(*keys: str) -> dict:
+    """Read several counters with one cache (or database) round trip."""
+    if not is_shared():
+        return _poll(keys)
+    found = cache.get_many(keys)
+    for key in keys:
+        if found.get(key) is None:
+            found[key] = get_version(key)
+    return found
+
+
+def bump(key: str) -> Optional[int]:
+    """
+    Advance the counter, invalidating everything keyed on it. Returns the
+    new value when the counter is in the cache.
+    """
+    if not is_shared():
+        _bump_row(key)
+        return None
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = _seed()
+        cache.set(key, version, timeout=None)
+        return version
+
+
+class VersionedLocal:
+    """
+    A process-local value rebuilt by `loader()` whenever the counter at
+    `key` moves (e.g. an in-memory index tied to the catalogue version).
+    """
+
+    def __init__(self, key: str, loader):
+        self.key = key
+        self.loader = loader
+        self._lock = threading.Lock()
+        self._value = None  # (version, value)
+
+    def get(self):
+        version = get_version(self.key)
+        cached = self._value
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        with self._lock:
+            if self._value is None or self._value[0] != version:
+                self._value = (version, self.loader())
+            return self._value[1]
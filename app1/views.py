@@ -1,44 +1,61 @@
 # app1/views.py
+import hmac
 import json
 import logging
 import re
+from collections import deque
 from datetime import timedelta
 from decimal import Decimal, InvalidOperation
 from typing import Optional, Any, List
 from django.contrib.auth.decorators import user_passes_test
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout, update_session_auth_hash
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.db import connection, transaction
-from django.db.models import Q, Avg, Count
-from django.db.models.functions import Coalesce, ExtractYear
+from django.db import transaction
 from django.http import (
+    FileResponse,
+    Http404,
     HttpRequest,
     HttpResponse,
     HttpResponseBadRequest,
     JsonResponse,
+    StreamingHttpResponse,
 )
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.text import slugify
-from django.views.decorators.http import require_GET, require_POST
-
-from docx import Document
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from io import BytesIO
-
+from django.views.decorators.http import etag, require_GET, require_POST
+
+from . import (
+    catalogue,
+    dependencies,
+    etags,
+    identity,
+    intervention_search,
+    optimizer,
+    pagination,
+    profiling,
+    ratings,
+    report_export,
+    report_jobs,
+    reports,
+    rollups,
+    search,
+    sqlite,
+    telemetry,
+    tracing,
+)
 from .models import (
     ClassTargets,
-    InterventionDependencies,
-    InterventionEffects,
-    Interventions,
     Metrics,
     User as AppUser,
     # NEW: table that stores selections per project (ensure this exists in models.py)
     InterventionSelection,
     InterventionSelection,
+    ReportJob,
     UserProfile,  # Stores selected interventions per project
 )
 
@@ -49,19 +66,11 @@ logger = logging.getLogger(__name__)
 # =========================
 
 def _resolve_app_user(request: HttpRequest) -> Optional[AppUser]:
-    """Map the Django auth user to your AppUser row (by username/email)."""
-    user = getattr(request, "user", None)
-    if not getattr(user, "is_authenticated", False):
-        return None
-    if getattr(user, "username", None):
-        hit = AppUser.objects.filter(username=user.username).first()
-        if hit:
-            return hit
-    if getattr(user, "email", None):
-        hit = AppUser.objects.filter(email=user.email).first()
-        if hit:
-            return hit
-    return None
+    """
+    The auth user owning the request's projects. This used to re-fetch the
+    logged-in user by username/email; it's the same row, so no query.
+    """
+    return identity.owner(request)
 
 
 def _num(value: Any, default: Optional[float] = None) -> Optional[float]:
@@ -154,7 +163,6 @@ def _get_current_metric(request) -> Metrics:
         m = Metrics.objects.create(user=app_user if app_user else None)
 
     request.session["metrics_id"] = m.id  # keep everyone in sync
-    request.session.modified = True
     return m
 
 
@@ -193,7 +201,6 @@ def create_project(request: HttpRequest):
             ids.append(m.id)
         request.session["my_project_ids"] = ids
         request.session["metrics_id"] = m.id
-        request.session.modified = True
 
         # >>> go to the Building Metrics page
         return redirect("carbon")
@@ -214,11 +221,10 @@ def metrics_edit(request, pk: int):
         m.project_name = (request.POST.get("project_name") or m.project_name or "").strip()
         m.location = (request.POST.get("location") or m.location or "").strip()
         m.building_type = (request.POST.get("project_type") or m.building_type or "").strip()
-        m.save()
+        m.save(update_fields=["project_name", "location", "building_type", "updated_at"])
 
         # keep active in session for calculator/interventions
         request.session["metrics_id"] = m.id
-        request.session.modified = True
 
         return redirect("projects")
 
@@ -229,17 +235,8 @@ def metrics_edit(request, pk: int):
 # Interventions API
 # =========================
 
-CLASS_ALIASES = {
-    "carbon": ["carbon", "carbon emissions", "operating carbon", "operational carbon", "embodied carbon"],
-    "health": ["health", "health & wellbeing", "health and wellbeing"],
-    "water": ["water", "water use", "water efficiency"],
-    "circular": ["circular", "circular economy"],
-    "resilience": ["resilience"],
-    "biodiversity": ["biodiversity"],
-    "value": ["value", "value & cost", "value and cost"],
-}
-
 @require_GET
+@etag(etags.interventions_api_etag)
 def interventions_api(request):
     """
     Returns interventions as JSON, optionally filtered by class/theme.
@@ -259,44 +256,18 @@ def interventions_api(request):
         except Exception:
             logger.exception("Error fetching metrics for metrics_id=%s", metrics_id)
 
-    # Fetch interventions (dynamic SQL to handle reserved column "class")
+    # Catalogue rows come from the shared versioned snapshot
     try:
-        with connection.cursor() as cur:
-            desc = connection.introspection.get_table_description(cur, "Interventions")
-            colnames = [getattr(c, "name", getattr(c, "column_name", "")) for c in desc]
-
-        select_cols = ", ".join(f'"{c}"' if c.lower() == "class" else c for c in colnames)
-        sql = f'SELECT {select_cols} FROM "Interventions"'
-        params = []
-
-        if ui_key:
-            terms = CLASS_ALIASES.get(ui_key, [ui_key])
-            like_parts = []
-            for t in terms:
-                like_parts.append('LOWER("class") LIKE LOWER(%s)')
-                params.append(f"%{t}%")
-            sql += " WHERE " + " OR ".join(like_parts)
-
-        sql += " ORDER BY theme, name"
-
-        items = []
-        with connection.cursor() as cur:
-            cur.execute(sql, params)
-            cols = [c[0] for c in cur.description]
-            for row in cur.fetchall():
-                obj = dict(zip(cols, row))
-                items.append(
-                    {
-                        "id": obj.get("id"),
-                        "name": obj.get("name") or f"Intervention #{obj.get('id')}",
-                        "theme": obj.get("theme") or "",
-                        "description": obj.get("description") or "",
-                        "cost_level": float(obj.get("cost_level") or 0),
-                        "intervention_rating": float(obj.get("intervention_rating") or 0),
-                        "gifa_m2": metrics.get("gifa_m2", 0),
-                        "building_footprint_m2": metrics.get("building_footprint_m2", 0),
-                    }
-                )
+        snapshot = catalogue.get_snapshot()
+        source = snapshot.items_for_class(ui_key) if ui_key else snapshot.api_items
+        items = [
+            {
+                **item,
+                "gifa_m2": metrics.get("gifa_m2", 0),
+                "building_footprint_m2": metrics.get("building_footprint_m2", 0),
+            }
+            for item in source
+        ]
     except Exception:
         logger.exception("Error fetching interventions from DB")
         items = []
@@ -366,16 +337,15 @@ def save_metrics(request: HttpRequest) -> JsonResponse:
     if not m.user:
         m.user = _resolve_app_user(request)
 
-    # Save with diagnostics (to avoid 500s)
+    # Save with diagnostics (to avoid 500s); retried if the database is busy
     try:
-        m.save()
+        sqlite.retry_on_busy(m.save)()
     except Exception as e:
         logger.exception("Failed to save Metrics")
         return JsonResponse({"ok": False, "error": f"{e.__class__.__name__}: {e}"}, status=400)
 
     # Persist session
     request.session["metrics_id"] = m.id
-    request.session.modified = True
 
     return JsonResponse({"ok": True, "metrics_id": m.id})
 
@@ -386,27 +356,7 @@ def save_metrics(request: HttpRequest) -> JsonResponse:
 
 @login_required(login_url='login')
 def carbon_view(request):
-    interventions = Interventions.objects.all()
-    interventions_dict = {}
-
-    CLASS_ALIASES_REVERSE = {}
-    for key, aliases in CLASS_ALIASES.items():
-        for a in aliases:
-            CLASS_ALIASES_REVERSE[a.lower()] = key
-
-    for i in interventions:
-        db_theme = (i.theme or "other").lower()
-        cls_key = CLASS_ALIASES_REVERSE.get(db_theme, "other")
-
-        interventions_dict.setdefault(cls_key, []).append(
-            {
-                "id": i.id,
-                "name": i.name or f"Intervention #{i.id}",
-                "cost": float(i.cost_level or 0),
-                "rating": float(i.intervention_rating or 0),
-                "badges": [i.theme.capitalize()] if i.theme else [],
-            }
-        )
+    snapshot = catalogue.get_snapshot()
 
     classes = [
         {"key": "carbon", "label": "Carbon", "target": 80},
@@ -422,43 +372,106 @@ def carbon_view(request):
     return render(
         request,
         "carbon.html",
-        {"interventions_json": json.dumps(interventions_dict), "classes": classes},
+        {"interventions_json": snapshot.carbon_json, "classes": classes},
     )
 
 
+def _effect_payload(engine, edges) -> dict:
+    """{"<source id>": [{"target", "target_id", "effect", "note"}, ...]} from the engine's graph edges."""
+    graph = engine.graph
+    data = {}
+    for edge in edges:
+        t = graph.position[edge.target_id]
+        adjusted_rating = engine.base[t] + ratings.effect_delta(engine.base[t], edge.effect_value)
+        data.setdefault(str(edge.source_id), []).append(
+            {
+                "target": graph.names[t],
+                "target_id": edge.target_id,
+                "effect": round(adjusted_rating, 2),
+                "note": edge.note,
+            }
+        )
+    return data
+
+
+def _id_list(request: HttpRequest, key: str = "ids") -> List[int]:
+    """Read ?ids=1,2,3 (or repeated ids=1&ids=2), keeping order and dropping junk."""
+    raw_ids = []
+    for chunk in request.GET.getlist(key):
+        raw_ids.extend(chunk.split(","))
+    return list(dict.fromkeys(i for i in (_to_int(x) for x in raw_ids) if i is not None))
+
+
 @login_required(login_url='login')
+@etag(etags.intervention_effects_etag)
 def get_intervention_effects(request):
     source_name = request.GET.get("source")
     if not source_name:
         return JsonResponse({"error": "No source provided"}, status=400)
 
-    effects = InterventionEffects.objects.filter(source_intervention_name=source_name)
-    data = []
+    # Same-named staged variants share their edges, so one source id is enough
+    engine = ratings.get_engine()
+    graph = engine.graph
+    by_source = _effect_payload(engine, graph.effects_from(graph.ids_for_name(source_name)[:1]))
+    data = [effect for effects in by_source.values() for effect in effects]
 
-    for e in effects:
-        target = Interventions.objects.filter(name=e.target_intervention_name).first()
-        if not target:
-            continue
-
-        base_rating = float(target.intervention_rating or 0)
-        max_effect_percent = 0.2  # ±20% max
-        if e.effect_value is not None:
-            effect_factor = float(e.effect_value) / 10 * max_effect_percent
-            adjusted_rating = base_rating * (1 + effect_factor)
-        else:
-            adjusted_rating = base_rating
+    return JsonResponse({"effects": data})
 
-        data.append(
-            {
-                "target": e.target_intervention_name,
-                "effect": round(adjusted_rating, 2),
-                "note": e.note,
-            }
-        )
 
+@require_GET
+@login_required(login_url='login')
+@etag(etags.intervention_effects_batch_etag)
+def intervention_effects_batch_api(request):
+    """
+    Effects for a whole selection set in one response.
+    Query: ?ids=1,2,3 (or repeated ids=1&ids=2)
+    Returns {"effects": {"<source id>": [{"target", "target_id", "effect", "note"}, ...]}}
+    straight from the in-memory effect graph.
+    """
+    engine = ratings.get_engine()
+    graph = engine.graph
+    ids = [i for i in _id_list(request) if i in graph.position]
+    data = {str(sid): [] for sid in ids}
+    data.update(_effect_payload(engine, graph.effects_from(ids)))
     return JsonResponse({"effects": data})
 
 
+@require_GET
+@login_required(login_url='login')
+@etag(etags.intervention_search_etag)
+def intervention_search_api(request):
+    """
+    Typeahead over the intervention catalogue (name, theme, description).
+    Params: q, limit (default 10, max 50). Served from an in-memory index.
+    """
+    q = (request.GET.get("q") or "").strip()
+    try:
+        limit = max(1, min(int(request.GET.get("limit") or 10), intervention_search.MAX_LIMIT))
+    except ValueError:
+        return JsonResponse({"ok": False, "error": "limit must be an integer"}, status=400)
+
+    results = intervention_search.get_index().search(q, limit=limit)
+    return JsonResponse({"ok": True, "query": q, "results": results})
+
+
+@require_GET
+@login_required(login_url='login')
+@etag(etags.intervention_ratings_etag)
+def intervention_ratings_api(request):
+    """
+    Adjusted ratings for a selection set, computed by the shared rating engine.
+    Query: ?ids=1,2,3
+    Returns {"ratings": {"<id>": {"rating", "base", "notes"}}} for every
+    intervention whose rating or notes differ from the catalogue.
+    """
+    adjusted = ratings.get_engine().adjusted(_id_list(request))
+    data = {
+        str(iid): {"rating": round(r["rating"], 2), "base": r["base"], "notes": r["notes"]}
+        for iid, r in adjusted.items()
+    }
+    return JsonResponse({"ratings": data})
+
+
 @login_required(login_url='login')
 def calculator(request: HttpRequest):
     if request.method == "GET":
@@ -467,11 +480,14 @@ def calculator(request: HttpRequest):
     return _process_calculator_post(request)
 
 
+@tracing.span("interventions.group")
 def intervention_effects(
     metric, interventions, selected_ids: Optional[List[int]] = None
 ):
     grouped_interventions = {}
     max_stage = 0
+    excluded_ids = dependencies.get_index().excluded_ids(metric)
+    adjusted = ratings.get_engine().adjusted(selected_ids or [])
 
     # Determine max stage among selected interventions
     if selected_ids:
@@ -487,28 +503,12 @@ def intervention_effects(
             continue
 
         # Dependency check: skip if metric thresholds not met
-        include = True
-        deps = InterventionDependencies.objects.filter(intervention_id=i.id)
-        for dep in deps:
-            val = getattr(metric, dep.metric_name, None)
-            if val is None:
-                continue
-            try:
-                val = Decimal(val)
-            except Exception:
-                continue
-            if (dep.min_value is not None and val < dep.min_value) or (
-                dep.max_value is not None and val > dep.max_value
-            ):
-                include = False
-                break
-        if not include:
+        if i.id in excluded_ids:
             continue
 
-        # Base rating logic
-        adjusted_rating = float(i.intervention_rating or 0)
-        if selected_ids and i.id in selected_ids:
-            adjusted_rating *= 1.1  # +10% rating for selected interventions
+        # Effects from the selection + selected boost (see ratings.py)
+        base_rating = float(i.intervention_rating or 0)
+        adjusted_rating = adjusted[i.id]["rating"] if i.id in adjusted else base_rating
 
         cls = i.theme or "Other"
         grouped_interventions.setdefault(cls, []).append(
@@ -517,6 +517,7 @@ def intervention_effects(
                 "name": i.name or f"Intervention #{i.id}",
                 "cost_level": float(i.cost_level or 0),
                 "intervention_rating": round(adjusted_rating, 2),
+                "base_rating": base_rating,
                 "description": i.description or "No description available",
                 "stage": stage_val,
                 "class_name": getattr(i, "class_name", ""),
@@ -544,7 +545,7 @@ def _process_calculator_post(request: HttpRequest) -> HttpResponse:
             selected_ids = []
     selected_ids = [int(x) for x in selected_ids if str(x).strip().isdigit()]
 
-    interventions_qs = list(Interventions.objects.all())
+    interventions_qs = list(catalogue.get_snapshot().interventions)
     if selected_ids:
         max_stage = max(
             [
@@ -587,6 +588,7 @@ def _process_calculator_post(request: HttpRequest) -> HttpResponse:
 
 @require_GET
 @login_required(login_url='login')
+@etag(etags.intervention_selection_list_etag)
 def intervention_selection_list_api(request, metrics_id: int):
     """
     Return all interventions with a boolean 'selected' for the given Metrics project.
@@ -599,17 +601,10 @@ def intervention_selection_list_api(request, metrics_id: int):
         .values_list("intervention_id", flat=True)
     )
 
-    items = []
-    for i in Interventions.objects.all().order_by("theme", "name"):
-        items.append({
-            "id": i.id,
-            "name": i.name or f"Intervention #{i.id}",
-            "theme": i.theme or "",
-            "description": i.description or "",
-            "cost_level": float(i.cost_level or 0),
-            "intervention_rating": float(i.intervention_rating or 0),
-            "selected": i.id in selected_ids,
-        })
+    items = [
+        {**item, "selected": item["id"] in selected_ids}
+        for item in catalogue.get_snapshot().api_items
+    ]
 
     return JsonResponse({"items": items, "project_id": project.id})
 
@@ -637,18 +632,18 @@ def intervention_selection_save_api(request, metrics_id: int):
     except Exception:
         return HttpResponseBadRequest("selected_ids must contain integers")
 
-    existing_ids = set(
-        InterventionSelection.objects
-        .filter(project=project)
-        .values_list("intervention_id", flat=True)
-    )
-
-    to_add = selected_ids - existing_ids
-    to_del = existing_ids - selected_ids
-
     app_user = _resolve_app_user(request)
 
-    with transaction.atomic():
+    @sqlite.retry_on_busy
+    def mirror():
+        # Diff inside the (IMMEDIATE) transaction so concurrent saves can't interleave
+        existing_ids = set(
+            InterventionSelection.objects
+            .filter(project=project)
+            .values_list("intervention_id", flat=True)
+        )
+        to_add = selected_ids - existing_ids
+        to_del = existing_ids - selected_ids
         if to_del:
             InterventionSelection.objects.filter(project=project, intervention_id__in=to_del).delete()
         if to_add:
@@ -662,7 +657,11 @@ def intervention_selection_save_api(request, metrics_id: int):
                     )
                 )
             InterventionSelection.objects.bulk_create(rows, ignore_conflicts=True)
+        # bulk_create skips post_save, so invalidate the list ETag explicitly
+        transaction.on_commit(lambda: etags.bump_project_version(project.id))
+        return to_add, to_del
 
+    to_add, to_del = mirror()
     return JsonResponse({
         "ok": True,
         "added": sorted(to_add),
@@ -672,10 +671,68 @@ def intervention_selection_save_api(request, metrics_id: int):
     })
 
 
+OPTIMISE_MAX_SECONDS = 10.0
+
+
+@require_POST
+@login_required(login_url='login')
+def intervention_optimise_api(request, metrics_id: int):
+    """
+    Best-scoring intervention selection for the project's budget.
+    Body (all optional): {"budget": 250000, "time_limit": 2, "seed": 0, "stream": false}
+    With "stream": true the response is NDJSON, one line per improved solution,
+    ending with the line that has "final": true.
+    """
+    project = get_object_or_404(Metrics, pk=metrics_id)
+
+    try:
+        payload = json.loads(request.body.decode("utf-8") or "{}")
+    except json.JSONDecodeError:
+        return HttpResponseBadRequest("Invalid JSON payload")
+    if not isinstance(payload, dict):
+        return HttpResponseBadRequest("JSON payload must be an object")
+
+    budget = _to_dec(payload.get("budget"))
+    time_limit = min(max(_num(payload.get("time_limit"), 2.0), 0.1), OPTIMISE_MAX_SECONDS)
+    seed = _to_int(payload.get("seed")) or 0
+
+    with tracing.span("optimizer.build_problem"):
+        problem = optimizer.build_problem(project, float(budget) if budget is not None else None)
+    if problem.budget <= 0:
+        return JsonResponse({"ok": False, "error": "Project has no budget set"}, status=400)
+
+    solutions = optimizer.solve(problem, time_limit=time_limit, seed=seed)
+    if payload.get("stream"):
+        return StreamingHttpResponse(
+            (json.dumps(s) + "\n" for s in solutions),
+            content_type="application/x-ndjson",
+        )
+    best = deque(solutions, maxlen=1)[0]
+    return JsonResponse({"ok": True, "project_id": project.id, **best})
+
+
 # =========================
 # Project List / Detail
 # =========================
 
+def _project_queryset(request: HttpRequest, q: str = ""):
+    """
+    Projects visible on the projects page: admins see all, regular users
+    only their own. `q` filters by name, building type or location.
+    """
+    if identity.is_admin(request):
+        # Admins can see all projects
+        qs = Metrics.objects.all()
+    else:
+        # Regular users see only their own projects
+        qs = Metrics.objects.filter(user=_resolve_app_user(request))
+
+    # Apply optional search filters (full-text index, see search.py)
+    if q:
+        qs = search.filter_projects(qs, q)
+    return qs
+
+
 @login_required(login_url='login')
 def projects_view(request: HttpRequest):
     """
@@ -683,31 +740,78 @@ def projects_view(request: HttpRequest):
     - Admins: see all projects
     - Regular users: see only projects they created
     Supports optional search filtering by name, type, or location.
+    Pages are keyset-paginated on (updated_at, id); see api/projects/ for JSON.
     """
     q = (request.GET.get("q") or "").strip()
+    cursor = request.GET.get("cursor")
+    try:
+        page = pagination.paginate(
+            _project_queryset(request, q), "updated_at", cursor, pagination.page_size_from(request)
+        )
+    except pagination.InvalidCursor:
+        return HttpResponseBadRequest("Invalid cursor")
+
+    return render(request, "projects.html", {
+        "projects": page.items,
+        "query": q,
+        "cursor": cursor,
+        "next_cursor": page.next_cursor,
+    })
 
-    # Determine if the current user is an admin
-    user_profile = getattr(request.user, "userprofile", None)
-    is_admin_user = user_profile and user_profile.user_type == "admin"
 
-    if is_admin_user:
-        # Admins can see all projects
-        qs = Metrics.objects.all().order_by("-updated_at", "-created_at")
-    else:
-        # Regular users see only their own projects
-        qs = Metrics.objects.filter(user=_resolve_app_user(request)).order_by(
-            "-updated_at", "-created_at"
+@login_required(login_url='login')
+@require_GET
+def projects_api(request: HttpRequest):
+    """
+    JSON page of the projects list for infinite scroll.
+    Params: q, cursor (from the previous page's next_cursor), page_size.
+    """
+    q = (request.GET.get("q") or "").strip()
+    try:
+        page = pagination.paginate(
+            _project_queryset(request, q), "updated_at", request.GET.get("cursor"), pagination.page_size_from(request)
         )
+    except pagination.InvalidCursor:
+        return JsonResponse({"ok": False, "error": "Invalid cursor"}, status=400)
+
+    items = [
+        {
+            "id": p.id,
+            "project_name": p.project_name,
+            "location": p.location,
+            "building_type": p.building_type,
+            "total_budget_aud": float(p.total_budget_aud) if p.total_budget_aud is not None else None,
+            "created_at": p.created_at.isoformat() if p.created_at else None,
+            "updated_at": p.updated_at.isoformat() if p.updated_at else None,
+            "url": reverse("project_detail", args=[p.id]),
+        }
+        for p in page.items
+    ]
+    return JsonResponse({"ok": True, "items": items, "next_cursor": page.next_cursor, "has_next": page.has_next})
 
-    # Apply optional search filters
-    if q:
-        qs = qs.filter(
-            Q(project_name__icontains=q)
-            | Q(building_type__icontains=q)
-            | Q(location__icontains=q)
-        )
 
-    return render(request, "projects.html", {"projects": qs, "query": q})
+@login_required(login_url='login')
+@require_GET
+def projects_search_api(request: HttpRequest):
+    """
+    Typeahead for the projects search box: best matches for `q`, ranked
+    by relevance. Params: q, limit (default 10, max 50).
+    """
+    q = (request.GET.get("q") or "").strip()
+    try:
+        limit = max(1, min(int(request.GET.get("limit") or 10), 50))
+    except ValueError:
+        limit = 10
+
+    if identity.is_admin(request):
+        results = search.typeahead(q, limit=limit)
+    else:
+        app_user = _resolve_app_user(request)
+        results = search.typeahead(q, user_id=app_user.id if app_user else None, limit=limit)
+
+    for item in results:
+        item["url"] = reverse("project_detail", args=[item["id"]])
+    return JsonResponse({"ok": True, "query": q, "results": results})
 
 
 @login_required(login_url='login')
@@ -725,7 +829,7 @@ def project_detail_view(request, pk: int):
         p.building_type = (request.POST.get("building_type") or p.building_type or "").strip()
 
         # decimals
-        for f in [
+        decimal_fields = [
             "gifa_m2",
             "external_wall_area_m2",
             "external_openings_m2",
@@ -734,10 +838,9 @@ def project_detail_view(request, pk: int):
             "roof_percent_gifa",
             "basement_size_m2",
             "basement_percent_gifa",
-            
-        ]:
-            if hasattr(p, f):
-                setattr(p, f, _to_dec(request.POST.get(f), default=Decimal("0")))
+        ]
+        for f in decimal_fields:
+            setattr(p, f, _to_dec(request.POST.get(f), default=Decimal("0")))
 
         # ints + bool
         p.num_apartments = _to_int(request.POST.get("num_apartments"))
@@ -745,11 +848,14 @@ def project_detail_view(request, pk: int):
         p.num_wcs = _to_int(request.POST.get("num_wcs"))
         p.basement_present = bool(request.POST.get("basement_present"))
 
-        p.save()
+        # Only the columns edited here, so the dashboard rollup isn't recomputed
+        p.save(update_fields=[
+            "project_name", "location", "building_type", *decimal_fields,
+            "num_apartments", "num_keys", "num_wcs", "basement_present", "updated_at",
+        ])
 
         # keep this project “active” for interventions page
         request.session["metrics_id"] = p.id
-        request.session.modified = True
 
         if request.POST.get("next") == "interventions":
             return redirect("carbon")
@@ -759,7 +865,6 @@ def project_detail_view(request, pk: int):
     # GET
     can_edit = request.GET.get("edit") == "1"
     request.session["metrics_id"] = p.id
-    request.session.modified = True
     return render(request, "project_detail.html", {"p": p, "can_edit": can_edit})
 
 
@@ -837,7 +942,6 @@ def settings_view(request):
             if 'theme_select' in request.POST:  # This matches your select name
                 new_theme = request.POST.get('theme_select', 'light')
                 request.session['theme'] = new_theme
-                request.session.modified = True
                 messages.success(request, f"Theme changed to {new_theme} mode!")
                 return redirect('settings')
 
@@ -916,29 +1020,15 @@ def home(request):
 @login_required(login_url='login')
 def calculator_results(request):
     cls = request.GET.get("cls", "carbon")
-    interventions_qs = Interventions.objects.filter(theme=cls).order_by(
-        "-intervention_rating", "cost_level"
-    )
-
-    interventions = []
-    for i in interventions_qs:
-        interventions.append(
-            {
-                "id": str(i.id),
-                "name": i.name,
-                "theme": i.theme,
-                "description": i.description,
-                "cost_level": float(i.cost_level or 0),
-                "intervention_rating": float(i.intervention_rating or 0),
-                "cost_range": getattr(i, "cost_range", ""),
-            }
-        )
+    metric = _get_current_metric(request)
+    with tracing.span("catalogue.results_json", cls=cls):
+        interventions_json = catalogue.get_snapshot().results_json_for_theme(cls)
 
     return render(
         request,
         "calculator_results.html",
         {
-            "interventions_json": json.dumps(interventions),
+            "interventions_json": interventions_json,
             "classes": [
                 {"key": "carbon", "label": "Carbon", "target": 80},
                 {"key": "health", "label": "Health & Wellbeing", "target": 60},
@@ -959,41 +1049,23 @@ def calculator_results(request):
 def dashboard_view(request: HttpRequest):
     # --- Projects / budgets ---
     latest_projects = Metrics.objects.order_by("-updated_at", "-created_at")[:3]
-    total_projects = Metrics.objects.count()
-
-    avg_budget = (
-        Metrics.objects.aggregate(avg_budget=Avg("total_budget_aud"))["avg_budget"]
-        or Decimal("0")
-    )
-
-    # --- Intervention stats ---
-    avg_intervention_rating = (
-        Interventions.objects.aggregate(avg_rating=Avg("intervention_rating"))["avg_rating"]
-        or 0
-    )
-
-    top_theme_data = (
-        Interventions.objects.values("theme")
-        .annotate(avg_rating=Avg("intervention_rating"))
-        .order_by("-avg_rating")
-        .first()
-    )
-    top_theme = top_theme_data["theme"] if top_theme_data else "N/A"
-    top_theme_rating = round(top_theme_data["avg_rating"], 2) if top_theme_data else 0
 
-    # --- YoY: number of projects created per year (last 6 years incl. current) ---
+    # --- Totals, averages and per-year counts come from the rollup tables ---
     now = timezone.now()
     start_year = now.year - 5
+    with tracing.span("dashboard.stats"):
+        stats = rollups.dashboard_stats(start_year, now.year)
 
-    yoy_raw = (
-        Metrics.objects.annotate(y=ExtractYear("created_at"))
-        .filter(y__gte=start_year, y__lte=now.year)
-        .values("y")
-        .annotate(n=Count("id"))
-        .order_by("y")
-    )
+    total_projects = stats["total_projects"]
+    avg_budget = stats["avg_budget"]
+
+    # --- Intervention stats ---
+    avg_intervention_rating = stats["avg_intervention_rating"]
+    top_theme = stats["top_theme"]
+    top_theme_rating = stats["top_theme_rating"]
 
-    yoy_map = {row["y"]: int(row["n"]) for row in yoy_raw}
+    # --- YoY: number of projects created per year (last 6 years incl. current) ---
+    yoy_map = stats["projects_per_year"]
     yoy_labels = [str(y) for y in range(start_year, now.year + 1)]
     yoy_counts = [yoy_map.get(int(lbl), 0) for lbl in yoy_labels]
 
@@ -1024,21 +1096,34 @@ def reports_page(request: HttpRequest):
     - Regular users: see only their own projects
     """
     user = _resolve_app_user(request)
-    user_profile = getattr(request.user, "userprofile", None)
-    is_admin = user_profile and user_profile.user_type == "admin"
+    is_admin = identity.is_admin(request)
 
     # Admin → show all projects
     if is_admin:
-        projects = Metrics.objects.all().order_by("-updated_at", "-created_at")
+        projects = Metrics.objects.select_related("user")
     # Regular user → show only own
     elif user:
-        projects = Metrics.objects.filter(user=user).order_by("-updated_at", "-created_at")
+        projects = Metrics.objects.filter(user=user)
     # Guest / anonymous session fallback
     else:
         session_ids = request.session.get("my_project_ids", [])
-        projects = Metrics.objects.filter(id__in=session_ids).order_by("-updated_at", "-created_at")
+        projects = Metrics.objects.filter(id__in=session_ids)
+
+    cursor = request.GET.get("cursor")
+    try:
+        page = pagination.paginate(projects, "updated_at", cursor, pagination.page_size_from(request))
+    except pagination.InvalidCursor:
+        return HttpResponseBadRequest("Invalid cursor")
 
-    return render(request, "reports.html", {"projects": projects})
+    # Admin totals come from the dashboard rollups instead of a full COUNT(*)
+    total_projects = rollups.project_total() if is_admin else projects.count()
+
+    return render(request, "reports.html", {
+        "projects": page.items,
+        "total_projects": total_projects,
+        "cursor": cursor,
+        "next_cursor": page.next_cursor,
+    })
 
 @login_required(login_url='login')
 def generate_report(request: HttpRequest, project_id: int):
@@ -1048,11 +1133,8 @@ def generate_report(request: HttpRequest, project_id: int):
     project = get_object_or_404(Metrics, id=project_id)
     
     # Check if user has access to this project
-    user = _resolve_app_user(request)
-    if user and project.user != user:
-        session_ids = request.session.get("my_project_ids", [])
-        if project.id not in session_ids:
-            return redirect("reports")
+    if not _can_access_project(request, project):
+        return redirect("reports")
     
     download_format = request.GET.get('download')
     
@@ -1065,254 +1147,111 @@ def generate_report(request: HttpRequest, project_id: int):
 
 def _generate_html_report(request: HttpRequest, project: Metrics):
     """
-    FINAL VERSION - All template variables covered
+    Serve the HTML report from the artifact cache (rebuilt only when the
+    project, its selections or the catalogue change).
     """
-    print("🔍 DEBUG: _generate_html_report STARTED")
-    
-    # Get interventions
-    selections = InterventionSelection.objects.filter(project_id=project.id)
-    intervention_ids = []
-    
-    for s in selections:
-        if hasattr(s, 'intervention_id') and s.intervention_id:
-            intervention_ids.append(s.intervention_id)
-    
-    if intervention_ids:
-        selected_interventions = list(Interventions.objects.filter(id__in=intervention_ids))
-    else:
-        selected_interventions = list(Interventions.objects.all()[:5])
-    
-    print(f"🔍 Found {len(selected_interventions)} interventions")
-    
-    # Calculate theme stats for the table
-    theme_stats = {}
-    for intervention in selected_interventions:
-        theme = intervention.theme or 'Other'
-        rating = float(intervention.intervention_rating or 0)
-        cost_level = float(intervention.cost_level or 0)
-        
-        if theme not in theme_stats:
-            theme_stats[theme] = {
-                'count': 0,
-                'total_rating': 0,
-                'total_cost': 0,
-                'interventions': []
-            }
-        
-        theme_stats[theme]['count'] += 1
-        theme_stats[theme]['total_rating'] += rating
-        theme_stats[theme]['total_cost'] += cost_level
-        theme_stats[theme]['interventions'].append(intervention)
-    
-    # Create table data
-    available_interventions_data = []
-    for theme, data in theme_stats.items():
-        avg_rating = data['total_rating'] / data['count'] if data['count'] > 0 else 0
-        avg_cost = data['total_cost'] / data['count'] if data['count'] > 0 else 0
-        
-        available_interventions_data.append({
-            'theme': theme,
-            'count': data['count'],
-            'avg_rating': round(avg_rating, 1),
-            'avg_cost': round(avg_cost, 1)
-        })
-    
-    # Create context with ALL possible variable names
-    context = {
-        'project': project,
-        
-        # Provide ALL possible variable names for the detailed interventions list
-        'selected_interventions': selected_interventions,
-        'interventions': selected_interventions,
-        'recommended_interventions': selected_interventions,
-        'interventions_list': selected_interventions,
-        'all_interventions': selected_interventions,
-        
-        # Table data (this is working correctly)
-        'available_interventions': available_interventions_data,
-        'intervention_stats': available_interventions_data,
-        
-        # Theme data
-        'theme_impacts': theme_stats,
-        
-        # Project summary
-        'metrics_summary': {
-            'building_type': project.building_type or 'Not specified',
-            'location': project.location or 'Not specified', 
-            'total_area': f"{project.gifa_m2 or 0} m²",
-            'total_budget': f"${project.total_budget_aud or 0:,.2f}",
-            'apartments': project.num_apartments or 0,
-            'basement': 'Yes' if project.basement_present else 'No',
-            'created_date': project.created_at.strftime("%B %d, %Y"),
-        },
-        
-        'report_date': timezone.now().strftime("%B %d, %Y"),
-        'total_selected': len(selected_interventions),
-    }
-    
-    print(f"🔍 Sending {len(selected_interventions)} interventions with multiple variable names")
-    print("🔍 DEBUG: _generate_html_report COMPLETED")
-    
-    return render(request, "report_template.html", context)
+    path = reports.get_artifact(project, "html")
+    return HttpResponse(path.read_bytes(), content_type=reports.REPORT_FORMATS["html"]["content_type"])
 
 def _generate_pdf_report(project: Metrics):
     """
-    Generate PDF report (placeholder - you'll need to implement PDF generation)
+    Serve the cached PDF if it is current; otherwise stream the report to the
+    client as it is rendered, storing it in the artifact cache on the way.
     """
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="project_{project.id}_report.pdf"'
-    
-    # Placeholder - using weasyprint
-    response.write(b'PDF report generation would go here')
+    content_type = reports.REPORT_FORMATS["pdf"]["content_type"]
+    filename = reports.download_name(project, "pdf")
+    path, chunks = reports.open_artifact(project, "pdf")
+    if path is not None:
+        return FileResponse(open(path, "rb"), as_attachment=True, filename=filename, content_type=content_type)
+
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
     return response
+
+
 def _generate_word_report(project: Metrics):
     """
-    Build a .docx report with the same data you show in the HTML report.
+    Build (or reuse the cached) .docx report and return it as a download.
     """
-    # ---- reuse your existing data builder (same as in _generate_html_report) ----
-    # Selected interventions
-    selections = InterventionSelection.objects.filter(project_id=project.id)
-    ids = [s.intervention_id for s in selections if getattr(s, "intervention_id", None)]
-    if ids:
-        selected = list(Interventions.objects.filter(id__in=ids))
-    else:
-        selected = list(Interventions.objects.all()[:5])
-
-    # Theme stats
-    theme_stats = {}
-    for iv in selected:
-        theme = iv.theme or "Other"
-        rating = float(iv.intervention_rating or 0)
-        cost   = float(iv.cost_level or 0)
-        bucket = theme_stats.setdefault(theme, {"count":0, "total_rating":0, "total_cost":0})
-        bucket["count"] += 1
-        bucket["total_rating"] += rating
-        bucket["total_cost"] += cost
-
-    # ---- build the document ----
-    doc = Document()
-
-    # Title
-    h = doc.add_heading('Environmental Impact Report', level=0)
-    h.alignment = WD_ALIGN_PARAGRAPH.LEFT
-
-    # Project meta
-    meta = doc.add_paragraph()
-    meta.add_run(f'Project: {project.project_name}').bold = True
-    meta.add_run(f'  •  Location: {project.location or "Not specified"}')
-    doc.add_paragraph(f'Building Type: {project.building_type or "Not specified"}')
-    doc.add_paragraph(f'Total Area: {project.gifa_m2 or 0} m²')
-    doc.add_paragraph(f'Total Budget: ${project.total_budget_aud or 0:,.2f}')
-    doc.add_paragraph()
-
-    # INTRODUCTION SECTION
-    doc.add_heading('INTRODUCTION', level=1)
-    
-    intro_para1 = doc.add_paragraph()
-    intro_para1.add_run('This Sustainability Impact Report forms part of the comprehensive environmental assessment for ')
-    intro_para1.add_run(f'{project.project_name}').bold = True
-    intro_para1.add_run(f' located in {project.location or "the specified location"}. ')
-    intro_para1.add_run(f'The {project.building_type or "development"} represents a significant opportunity to implement industry-leading sustainability practices and environmental stewardship.')
-    
-    doc.add_paragraph('Our assessment has focused on several key areas critical to the project\'s long-term environmental performance:')
-    
-    # Key areas list
-    key_areas = [
-        "Carbon emissions reduction strategies",
-        "Water efficiency and management", 
-        "Energy performance optimization",
-        "Material selection and lifecycle analysis",
-        "Indoor environmental quality",
-        "Waste management and circularity",
-        "Biodiversity enhancement",
-        "Community and social value"
-    ]
-    
-    for area in key_areas:
-        para = doc.add_paragraph(area, style='List Bullet')
-    
-    # Project scale paragraph
-    scale_para = doc.add_paragraph()
-    scale_para.add_run('With a total development area of ')
-    scale_para.add_run(f'{project.gifa_m2 or 0:,.0f} m²')
-    if project.total_budget_aud:
-        scale_para.add_run(f' and an estimated project budget of ${project.total_budget_aud or 0:,.0f}')
-    scale_para.add_run(', this project has the scale and significance to demonstrate leadership in sustainable development practices.')
-    
-    doc.add_paragraph('The following sections detail our findings, recommendations, and implementation roadmap designed to maximize environmental benefits while ensuring economic viability and operational excellence throughout the project lifecycle.')
-    
-    doc.add_paragraph()  # Spacing
-
-    # Project Overview
-    doc.add_heading('Project Overview', level=1)
-    overview_table = doc.add_table(rows=4, cols=2)
-    overview_data = [
-        ('Built Area', f'{project.gifa_m2 or 0:,.0f} m²'),
-        ('Project Budget', f'${project.total_budget_aud or 0:,.0f}'),
-        ('Residential Units', f'{project.num_apartments or 0:,}'),
-        ('Sustainability Measures', f'{len(selected)}')
-    ]
-    
-    for i, (label, value) in enumerate(overview_data):
-        overview_table.rows[i].cells[0].text = label
-        overview_table.rows[i].cells[1].text = value
-
-    doc.add_paragraph()
-
-    # Sustainability Action Plan (theme table)
-    doc.add_heading('Sustainability Action Plan', level=1)
-    table = doc.add_table(rows=1, cols=4)
-    hdr = table.rows[0].cells
-    hdr[0].text = 'Focus Area'
-    hdr[1].text = 'Actions'
-    hdr[2].text = 'Avg Impact'
-    hdr[3].text = 'Avg Investment'
-
-    for theme, agg in theme_stats.items():
-        count = max(1, agg["count"])
-        avg_rating = round(agg["total_rating"] / count, 1)
-        avg_cost   = round(agg["total_cost"] / count, 1)
-        row = table.add_row().cells
-        row[0].text = str(theme)
-        row[1].text = f'{agg["count"]} measures'
-        row[2].text = f'{avg_rating}/10'
-        row[3].text = f'Level {avg_cost}'
-
-    doc.add_paragraph()
-
-    # Recommended Implementation Plan
-    doc.add_heading('Recommended Implementation Plan', level=1)
-    if selected:
-        for iv in selected:
-            doc.add_heading(iv.name, level=2)
-            if getattr(iv, "description", None):
-                doc.add_paragraph(str(iv.description))
-            meta = doc.add_paragraph()
-            meta.add_run('Effectiveness: ').bold = True
-            meta.add_run(f'{getattr(iv, "intervention_rating", 0)}/10   ')
-            meta.add_run('Implementation Cost: ').bold = True
-            meta.add_run(f'Level {getattr(iv, "cost_level", 0)}/5')
-            doc.add_paragraph()
-    else:
-        doc.add_paragraph('No specific recommendations selected.')
-
-    # Footer
-    doc.add_paragraph()
-    doc.add_paragraph('Generated by CarbonBalance Sustainability Platform')
-    doc.add_paragraph('COSTPLAN GROUP • Kent TN24 OSY')
-    doc.add_paragraph('Contact: london@cpsqs.com • Phone: +44 (0) 1233 333532')
-
-    # ---- return as download ----
-    buffer = BytesIO()
-    doc.save(buffer)
-    buffer.seek(0)
-
-    response = HttpResponse(
-        buffer.getvalue(),
-        content_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+    path = reports.get_artifact(project, "word")
+    return FileResponse(
+        open(path, "rb"),
+        as_attachment=True,
+        filename=reports.download_name(project, "word"),
+        content_type=reports.REPORT_FORMATS["word"]["content_type"],
+    )
+
+
+def _can_access_project(request: HttpRequest, project: Metrics) -> bool:
+    """Owners, or sessions that created the project, may read its reports."""
+    user = _resolve_app_user(request)
+    if user and project.user_id != user.id:
+        return project.id in request.session.get("my_project_ids", [])
+    return True
+
+
+@require_POST
+@login_required(login_url='login')
+def report_job_submit_api(request: HttpRequest, project_id: int):
+    """
+    Queue a report for background rendering.
+    Body: {"format": "word" | "html"} (JSON or form field)
+    """
+    project = get_object_or_404(Metrics, id=project_id)
+    if not _can_access_project(request, project):
+        return JsonResponse({"ok": False, "error": "Not allowed"}, status=403)
+
+    try:
+        payload = json.loads(request.body.decode("utf-8") or "{}") if request.content_type == "application/json" else {}
+    except json.JSONDecodeError:
+        return HttpResponseBadRequest("Invalid JSON payload")
+    if not isinstance(payload, dict):
+        return HttpResponseBadRequest("JSON payload must be an object")
+    report_format = payload.get("format") or request.POST.get("format") or "word"
+    if report_format not in reports.REPORT_FORMATS:
+        return HttpResponseBadRequest("Unknown report format")
+
+    job = report_jobs.submit(project, report_format, user=_resolve_app_user(request))
+    return JsonResponse(_report_job_payload(job), status=202)
+
+
+def _report_job_payload(job) -> dict:
+    return {
+        "ok": True,
+        "job_id": job.id,
+        "project_id": job.project_id,
+        "format": job.report_format,
+        "status": job.status,
+        "error": job.error,
+        "status_url": reverse("report_job_status_api", args=[job.id]),
+        "download_url": reverse("report_job_download", args=[job.id]) if job.status == "done" else None,
+    }
+
+
+@require_GET
+@login_required(login_url='login')
+def report_job_status_api(request: HttpRequest, job_id: int):
+    job = get_object_or_404(ReportJob.objects.select_related("project"), id=job_id)
+    if not _can_access_project(request, job.project):
+        return JsonResponse({"ok": False, "error": "Not allowed"}, status=403)
+    return JsonResponse(_report_job_payload(report_jobs.check_stale(job)))
+
+
+@require_GET
+@login_required(login_url='login')
+def report_job_download(request: HttpRequest, job_id: int):
+    job = get_object_or_404(ReportJob.objects.select_related("project"), id=job_id)
+    if not _can_access_project(request, job.project):
+        return JsonResponse({"ok": False, "error": "Not allowed"}, status=403)
+    path = report_jobs.artifact_file(report_jobs.check_stale(job))
+    if path is None:
+        return JsonResponse({"ok": False, "status": job.status, "error": "Report not ready"}, status=409)
+    return FileResponse(
+        open(path, "rb"),
+        as_attachment=True,
+        filename=reports.download_name(job.project, job.report_format),
+        content_type=reports.REPORT_FORMATS[job.report_format]["content_type"],
     )
-    response['Content-Disposition'] = f'attachment; filename="project_{project.id}_report.docx"'
-    return response
 
 def is_admin(user):
     """Check if logged-in user is an admin"""
@@ -1328,8 +1267,6 @@ def admin_dashboard(request):
     Allows admin users to view all registered users
     and promote/demote them between 'user' and 'admin' roles.
     """
-    users = User.objects.all().order_by('username')
-
     if request.method == 'POST':
         user_id = request.POST.get('user_id')
         action = request.POST.get('action')
@@ -1350,4 +1287,136 @@ def admin_dashboard(request):
                 messages.error(request, "User not found.")
         return redirect('admin_dashboard')
 
-    return render(request, 'admin_dashboard.html', {'users': users})
+    cursor = request.GET.get("cursor")
+    try:
+        page = pagination.paginate(
+            User.objects.select_related("userprofile"), "username", cursor,
+            pagination.page_size_from(request), descending=False,
+        )
+    except pagination.InvalidCursor:
+        return HttpResponseBadRequest("Invalid cursor")
+
+    return render(request, 'admin_dashboard.html', {
+        'users': page.items,
+        'cursor': cursor,
+        'next_cursor': page.next_cursor,
+    })
+
+
+@login_required(login_url='login')
+@user_passes_test(is_admin, login_url='dashboard')
+def admin_profiles(request: HttpRequest):
+    """Stored request profiles (see app1/profiling.py); POST deletes one."""
+    if request.method == 'POST':
+        profile_id = request.POST.get('profile_id', '')
+        if profiling.PROFILE_ID.match(profile_id):
+            profiling.delete_profile(profile_id)
+        return redirect('admin_profiles')
+
+    return render(request, 'admin_profiles.html', {
+        'profiles': profiling.list_profiles(),
+        'query_flag': profiling.QUERY_FLAG,
+        'max_count': settings.PROFILE_MAX_COUNT,
+        'max_mb': settings.PROFILE_MAX_BYTES // (1024 * 1024),
+    })
+
+
+@login_required(login_url='login')
+@user_passes_test(is_admin, login_url='dashboard')
+@require_GET
+def admin_profile_file(request: HttpRequest, profile_id: str, kind: str):
+    """pstats summary (kind=summary) or a download of the stored .collapsed/.prof file."""
+    if kind == 'summary':
+        summary = profiling.pstats_summary(profile_id)
+        if summary is None:
+            raise Http404("No pstats dump for this profile")
+        return HttpResponse(summary, content_type="text/plain; charset=utf-8")
+    path = profiling.profile_file(profile_id, kind)
+    if path is None or kind == 'meta':
+        raise Http404("Profile file not found")
+    return FileResponse(open(path, "rb"), as_attachment=True, filename=path.name)
+
+
+@login_required(login_url='login')
+@user_passes_test(is_admin, login_url='dashboard')
+@require_GET
+def admin_users_api(request: HttpRequest):
+    """JSON page of users ordered by (username, id); params: cursor, page_size."""
+    try:
+        page = pagination.paginate(
+            User.objects.select_related("userprofile"), "username", request.GET.get("cursor"),
+            pagination.page_size_from(request), descending=False,
+        )
+    except pagination.InvalidCursor:
+        return JsonResponse({"ok": False, "error": "Invalid cursor"}, status=400)
+
+    items = []
+    for u in page.items:
+        profile = getattr(u, "userprofile", None)
+        items.append({
+            "id": u.id,
+            "username": u.username,
+            "email": u.email,
+            "role": profile.user_type if profile else "user",
+        })
+    return JsonResponse({"ok": True, "items": items, "next_cursor": page.next_cursor, "has_next": page.has_next})
+
+
+@login_required(login_url='login')
+@user_passes_test(is_admin, login_url='dashboard')
+@require_GET
+def report_export_zip(request: HttpRequest):
+    """
+    Admin bulk export: a ZIP of Word/HTML/PDF reports for every project
+    matching the filter, streamed as each report finishes.
+
+    Query params:
+        format  one or more of word/html/pdf (repeat or comma-separate; default word)
+        q       same search as the projects page (name, building type, location)
+        ids     comma-separated project ids
+        user    owner's user id
+    """
+    formats = []
+    for value in request.GET.getlist("format") or ["word"]:
+        formats.extend(f.strip() for f in value.split(",") if f.strip())
+    if not formats or any(f not in reports.REPORT_FORMATS for f in formats):
+        return HttpResponseBadRequest("Unknown report format")
+
+    qs = Metrics.objects.all()
+    q = (request.GET.get("q") or "").strip()
+    if q:
+        qs = search.filter_projects(qs, q)
+    try:
+        if request.GET.get("ids"):
+            qs = qs.filter(id__in=[int(x) for x in request.GET["ids"].split(",") if x.strip()])
+        if request.GET.get("user"):
+            qs = qs.filter(user_id=int(request.GET["user"]))
+    except ValueError:
+        return HttpResponseBadRequest("Invalid project filter")
+
+    project_ids = list(qs.order_by("id").values_list("id", flat=True))
+    response = StreamingHttpResponse(
+        report_export.stream_zip(project_ids, list(dict.fromkeys(formats))),
+        content_type="application/zip",
+    )
+    response['Content-Disposition'] = f'attachment; filename="{report_export.export_filename()}"'
+    return response
+
+
+# =========================
+# Metrics
+# =========================
+
+@require_GET
+def metrics_view(request: HttpRequest):
+    """
+    Prometheus text exposition of app1.telemetry, summed over all workers.
+    Scrapers send `Authorization: Bearer <METRICS_TOKEN>`; admins signed
+    in to the app can open it too.
+    """
+    token = settings.METRICS_TOKEN
+    header = request.headers.get("Authorization", "")
+    scraper = bool(token) and hmac.compare_digest(header.encode(), f"Bearer {token}".encode())
+    if not scraper and not (request.user.is_authenticated and identity.is_admin(request)):
+        return HttpResponse("Forbidden", status=403, content_type="text/plain")
+    return HttpResponse(telemetry.exposition(), content_type=telemetry.CONTENT_TYPE)